@@ -0,0 +1,97 @@
+"""
+Compare ``ZeepSoapClient`` and ``StaticSoapClient`` without network access.
+
+Measures creating a client (zeep parses the WSDL, here a local file) and
+building and signing an ``initTransaction`` envelope::
+
+    $ python benchmarks/static_client.py --calls 2000
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import time
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from tbk.soap.static_client import StaticSoapClient  # noqa: E402
+from tbk.soap.zeep_client import ZeepSoapClient  # noqa: E402
+
+from tests.utils import get_fixture_data, get_fixture_url  # noqa: E402
+
+ARGUMENTS = {
+    "wSTransactionType": "TR_NORMAL_WS",
+    "commerceId": "597020000541",
+    "buyOrder": "12341",
+    "sessionId": "",
+    "returnURL": "http://127.0.0.1:5000/return",
+    "finalURL": "http://127.0.0.1:5000/final",
+}
+# only used to find the schema module, nothing is downloaded
+STATIC_WSDL_URL = "https://127.0.0.1/WSWebpayTransaction/cxf/WSWebpayService?wsdl"
+DETAIL = {"amount": 10000, "commerceCode": "597020000541", "buyOrder": "12341"}
+
+
+def create_client(client_class, wsdl_url):
+    return client_class(
+        wsdl_url,
+        get_fixture_data("597020000547.key"),
+        get_fixture_data("597020000547.crt"),
+        get_fixture_data("tbk.pem"),
+    )
+
+
+def build_zeep(client):
+    detail = client.create_object("wsTransactionDetail", **DETAIL)
+    transaction_input = client.create_object(
+        "wsInitTransactionInput", transactionDetails=[detail], **ARGUMENTS
+    )
+    envelope = client.client.create_message(
+        client.client.service, "initTransaction", transaction_input
+    )
+    client.wsse.apply(envelope, {})
+
+
+def build_static(client):
+    detail = client.create_object("wsTransactionDetail", **DETAIL)
+    transaction_input = client.create_object(
+        "wsInitTransactionInput", transactionDetails=[detail], **ARGUMENTS
+    )
+    envelope = client.create_envelope(
+        client.schema.OPERATIONS["initTransaction"], (transaction_input,), {}
+    )
+    client.wsse.apply(envelope, {})
+
+
+def measure(function, *args):
+    started = time.time()
+    result = function(*args)
+    return result, time.time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+
+    print("{:<8} {:>12} {:>12}".format("client", "create ms", "call us"))
+    for name, client_class, wsdl_url, build in (
+        ("zeep", ZeepSoapClient, get_fixture_url("WsWebpayService.wsdl"), build_zeep),
+        ("static", StaticSoapClient, STATIC_WSDL_URL, build_static),
+    ):
+        _, elapsed = measure(
+            lambda: [create_client(client_class, wsdl_url) for _ in range(args.clients)]
+        )
+        create = elapsed / args.clients * 1000
+        client = create_client(client_class, wsdl_url)
+        _, elapsed = measure(lambda: [build(client) for _ in range(args.calls)])
+        call = elapsed / args.calls * 1000000
+        print("{:<8} {:>12.2f} {:>12.1f}".format(name, create, call))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Compare the per request overhead of the HTTP backends of ``ZeepSoapClient``.
+
+Starts a local TLS server answering every POST with a small SOAP envelope and
+posts to it through each transport::
+
+    $ python benchmarks/transports.py --requests 2000 --concurrency 8
+
+The server offers HTTP/2 through ALPN when ``h2`` is installed, the protocol
+each backend negotiated is printed with its results. Only the transports are
+measured, signing and parsing cost the same for every backend.
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import ssl
+import sys
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:  # pragma: no cover
+    h2 = None
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from tbk.concurrency import imap  # noqa: E402
+from tbk.soap.transports import TRANSPORTS  # noqa: E402
+
+from tests.utils import get_fixture_data  # noqa: E402
+
+CERT_FILE = os.path.join(HERE, "..", "tests", "fixtures", "597020000547.crt")
+KEY_FILE = os.path.join(HERE, "..", "tests", "fixtures", "597020000547.key")
+RESPONSE = get_fixture_data("acknowledgeTransaction.response.xml").encode("utf-8")
+MESSAGE = get_fixture_data("initTransaction.request.xml").encode("utf-8")
+
+
+class TLSStubServer(ThreadingMixIn, HTTPServer):
+    """Local TLS server answering every POST with a fixed body.
+
+    ``protocols`` keeps the ALPN protocols negotiated by the connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, response_body):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), StubRequestHandler)
+        self.response_body = response_body
+        self.protocols = set()
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(CERT_FILE, KEY_FILE)
+        context.set_alpn_protocols(["h2", "http/1.1"] if h2 else ["http/1.1"])
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.01,))
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return "https://127.0.0.1:{}/service".format(self.server_address[1])
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        protocol = self.request.selected_alpn_protocol() or "http/1.1"
+        self.server.protocols.add(protocol)
+        if protocol == "h2":
+            self.handle_h2()
+        else:
+            BaseHTTPRequestHandler.handle(self)
+
+    def handle_h2(self):
+        connection = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False)
+        )
+        connection.initiate_connection()
+        self.request.sendall(connection.data_to_send())
+        while True:
+            data = self.request.recv(65535)
+            if not data:
+                return
+            try:
+                events = connection.receive_data(data)
+            except h2.exceptions.ProtocolError:
+                # h2 queued a GOAWAY frame, the client retries on a new connection
+                self.request.sendall(connection.data_to_send())
+                return
+            for event in events:
+                if isinstance(event, h2.events.DataReceived):
+                    connection.acknowledge_received_data(
+                        event.flow_controlled_length, event.stream_id
+                    )
+                elif isinstance(event, h2.events.StreamEnded):
+                    self.respond_h2(connection, event.stream_id)
+                elif isinstance(event, h2.events.ConnectionTerminated):
+                    return
+            self.request.sendall(connection.data_to_send())
+
+    def respond_h2(self, connection, stream_id):
+        body = self.server.response_body
+        connection.send_headers(
+            stream_id,
+            [
+                (":status", "200"),
+                ("content-type", "text/xml; charset=utf-8"),
+                ("content-length", str(len(body))),
+            ],
+        )
+        size = connection.max_outbound_frame_size
+        for start in range(0, len(body), size):
+            connection.send_data(stream_id, body[start : start + size])
+        connection.end_stream(stream_id)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.server.response_body)))
+        self.end_headers()
+        self.wfile.write(self.server.response_body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(transport, url, requests, concurrency):
+    # open the pooled connections before measuring
+    list(
+        imap(
+            lambda _: transport.post(url, MESSAGE, {}), range(concurrency), concurrency
+        )
+    )
+    latencies = []
+    lock = threading.Lock()
+
+    def post(_):
+        started = time.time()
+        transport.post(url, MESSAGE, {"Content-Type": "text/xml; charset=utf-8"})
+        with lock:
+            latencies.append(time.time() - started)
+
+    started = time.time()
+    for outcome in imap(post, range(requests), concurrency=concurrency):
+        if not outcome.ok:
+            raise outcome.error
+    elapsed = time.time() - started
+    latencies.sort()
+    return {
+        "throughput": requests / elapsed,
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p99": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    # requests prefers these over ``session.verify = False``
+    os.environ.pop("REQUESTS_CA_BUNDLE", None)
+    os.environ.pop("CURL_CA_BUNDLE", None)
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("backends", nargs="*", default=sorted(TRANSPORTS))
+    args = parser.parse_args()
+
+    print(
+        "{:<10} {:>12} {:>10} {:>10} {:>10}".format(
+            "backend", "requests/s", "p50 ms", "p99 ms", "protocol"
+        )
+    )
+    with TLSStubServer(RESPONSE) as server:
+        for backend in args.backends:
+            try:
+                transport = TRANSPORTS[backend](
+                    pool_maxsize=args.concurrency, verify=False
+                )
+            except ImportError as error:
+                print("{:<10} skipped: {}".format(backend, error))
+                continue
+            server.protocols.clear()
+            try:
+                result = run(transport, server.url, args.requests, args.concurrency)
+            finally:
+                transport.close()
+            print(
+                "{:<10} {throughput:>12.1f} {p50:>10.3f} {p99:>10.3f} {:>10}".format(
+                    backend, ",".join(sorted(server.protocols)), **result
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
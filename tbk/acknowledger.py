@@ -0,0 +1,250 @@
+"""
+Acknowledge Webpay transactions in the background.
+
+    >>> acknowledger = Acknowledger(WebpayService(commerce), workers=4)
+    >>> acknowledger.start()
+    >>> result = webpay.get_transaction_result(token)
+    >>> acknowledgement = acknowledger.submit(token)
+
+Transbank reverses transactions not acknowledged within ``window`` seconds of
+getting their result. Tokens are processed by a pool of worker threads in
+deadline order, the earliest to expire first, and failed requests are retried
+while the window lasts. ``submit`` returns ``None`` when ``maxsize`` tokens
+are already waiting, the caller should then acknowledge inline.
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+
+from .soap.deadline import Deadline, clock
+from .soap.exceptions import DeadlineExceeded, SoapRequestException
+
+
+class Acknowledgement(object):
+    """State of a token submitted to an ``Acknowledger``.
+
+    ``missed`` is set when the window expired before the token could be
+    acknowledged, ``abandoned`` when the acknowledger was stopped before
+    processing it, ``error`` holds the last exception raised by the service.
+    """
+
+    def __init__(self, token, deadline):
+        self.token = token
+        self.deadline = deadline
+        self.attempts = 0
+        self.result = None
+        self.error = None
+        self.missed = False
+        self.abandoned = False
+        self.not_before = 0.0
+        self._event = threading.Event()
+
+    @property
+    def done(self):
+        return self._event.is_set() and not self.abandoned
+
+    @property
+    def ok(self):
+        return self.done and self.error is None and not self.missed
+
+    def wait(self, timeout=None):
+        """Wait until the token is processed, return whether it was.
+
+        Return ``False`` as soon as it is ``abandoned``.
+        """
+        self._event.wait(timeout)
+        return self.done
+
+    def __repr__(self):
+        return "<Acknowledgement {} attempts={} done={}>".format(
+            self.token, self.attempts, self.done
+        )
+
+
+class Acknowledger(object):
+    def __init__(self, service, workers=4, maxsize=1000, window=30, retry_delay=0.5):
+        self.service = service
+        self.workers = workers
+        self.maxsize = maxsize
+        self.window = window
+        self.retry_delay = retry_delay
+        self.acknowledged = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+        self.deadline_misses = 0
+        self.in_flight = 0
+        self.logger = logging.getLogger("tbk.acknowledger")
+        self._queue = []
+        self._delayed = []  # retries waiting for their ``not_before``
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._threads = [
+            threading.Thread(
+                target=self._work, name="tbk-acknowledger-{}".format(number)
+            )
+            for number in range(workers)
+        ]
+        for thread in self._threads:
+            thread.daemon = True
+
+    def __len__(self):
+        return len(self._queue) + len(self._delayed)
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=None):
+        """Stop taking tokens and wait up to ``timeout`` for the queue to drain.
+
+        Return the acknowledgements still queued when the time is up, they are
+        left unprocessed and marked ``abandoned``, which wakes their waiters.
+        """
+        expires_at = None if timeout is None else clock() + timeout
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            if thread.is_alive():
+                thread.join(
+                    None if expires_at is None else max(0, expires_at - clock())
+                )
+        with self._condition:
+            pending = [item[2] for item in sorted(self._queue + self._delayed)]
+            del self._queue[:], self._delayed[:]
+            self._condition.notify_all()
+        for acknowledgement in pending:
+            self.logger.error("Acknowledgement of %s abandoned", acknowledgement.token)
+            acknowledgement.abandoned = True
+            acknowledgement._event.set()
+        return pending
+
+    def submit(self, token, deadline=None):
+        """Queue ``token``, by default it must be acknowledged within ``window``.
+
+        Return its ``Acknowledgement`` or ``None`` if the queue is full.
+        """
+        acknowledgement = Acknowledgement(token, deadline or Deadline(self.window))
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("Acknowledger is stopped")
+            if len(self) >= self.maxsize:
+                self.rejected += 1
+                self.logger.warning("Acknowledgement queue full, rejected %s", token)
+                return None
+            self._push(acknowledgement)
+        return acknowledgement
+
+    def stats(self):
+        with self._condition:
+            return {
+                "queued": len(self),
+                "in_flight": self.in_flight,
+                "acknowledged": self.acknowledged,
+                "failed": self.failed,
+                "retried": self.retried,
+                "rejected": self.rejected,
+                "deadline_misses": self.deadline_misses,
+            }
+
+    def _push(self, acknowledgement):
+        if acknowledgement.not_before > clock():
+            heapq.heappush(
+                self._delayed,
+                (acknowledgement.not_before, next(self._counter), acknowledgement),
+            )
+        else:
+            heapq.heappush(
+                self._queue,
+                (
+                    acknowledgement.deadline.expires_at,
+                    next(self._counter),
+                    acknowledgement,
+                ),
+            )
+        self._condition.notify()
+
+    def _take(self):
+        """Return the ready acknowledgement with the earliest deadline."""
+        with self._condition:
+            while True:
+                now = clock()
+                while self._delayed and self._delayed[0][0] <= now:
+                    _, count, acknowledgement = heapq.heappop(self._delayed)
+                    heapq.heappush(
+                        self._queue,
+                        (acknowledgement.deadline.expires_at, count, acknowledgement),
+                    )
+                if self._queue:
+                    self.in_flight += 1
+                    return heapq.heappop(self._queue)[2]
+                if self._stopped and not self._delayed:
+                    return None
+                # wake up when the first retry is due
+                self._condition.wait(
+                    self._delayed[0][0] - now if self._delayed else None
+                )
+
+    def _work(self):
+        while True:
+            acknowledgement = self._take()
+            if acknowledgement is None:
+                return
+            try:
+                self._acknowledge(acknowledgement)
+            finally:
+                with self._condition:
+                    self.in_flight -= 1
+
+    def _acknowledge(self, acknowledgement):
+        token = acknowledgement.token
+        if acknowledgement.deadline.expired:
+            return self._finish(acknowledgement, missed=True)
+        acknowledgement.attempts += 1
+        try:
+            acknowledgement.result = self.service.acknowledge_transaction(
+                token, deadline=acknowledgement.deadline
+            )
+        except DeadlineExceeded as error:
+            acknowledgement.error = error
+            return self._finish(acknowledgement, missed=True)
+        except SoapRequestException as error:
+            acknowledgement.error = error
+            retry_at = clock() + self.retry_delay
+            if retry_at < acknowledgement.deadline.expires_at:
+                self.logger.warning(
+                    "Acknowledgement of %s failed, retrying (attempt %d)",
+                    token,
+                    acknowledgement.attempts,
+                )
+                acknowledgement.not_before = retry_at
+                with self._condition:
+                    self.retried += 1
+                    self._push(acknowledgement)
+                return
+            return self._finish(acknowledgement, missed=True)
+        except Exception as error:
+            # rejected by Transbank, retrying won't help
+            self.logger.exception("Acknowledgement of %s failed", token)
+            acknowledgement.error = error
+            return self._finish(acknowledgement)
+        acknowledgement.error = None
+        self._finish(acknowledgement)
+
+    def _finish(self, acknowledgement, missed=False):
+        acknowledgement.missed = missed
+        with self._condition:
+            if missed:
+                self.deadline_misses += 1
+                self.logger.error(
+                    "Acknowledgement window of %s expired", acknowledgement.token
+                )
+            elif acknowledgement.error is not None:
+                self.failed += 1
+            else:
+                self.acknowledged += 1
+        acknowledgement._event.set()
@@ -0,0 +1,52 @@
+"""
+ASGI adapter for ``tbk.handlers`` (python 3.6+).
+
+    >>> handler = WebpayReturnHandler(WebpayService(commerce))
+    >>> return_app = ASGIAdapter(handler.handle_return, max_workers=32)
+
+The blocking SOAP calls run on a thread pool of ``max_workers`` threads (or
+the given ``executor``), so many return posts are handled concurrently by a
+single event loop.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .handlers import Response, parse_form
+
+
+class ASGIAdapter(object):
+    def __init__(self, handle, executor=None, max_workers=16, max_body_size=64 * 1024):
+        self.handle = handle
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers)
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError("Unsupported scope type {}".format(scope["type"]))
+        if scope["method"] not in ("GET", "POST"):
+            response = Response(405, body="Method not allowed")
+        else:
+            body = await self.read_body(receive)
+            form = parse_form(body, scope.get("query_string", b""))
+            loop = asyncio.get_event_loop()
+            response = await loop.run_in_executor(self.executor, self.handle, form)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status,
+                "headers": [
+                    (name.lower().encode("latin-1"), value.encode("latin-1"))
+                    for name, value in response.headers
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": response.body})
+
+    async def read_body(self, receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")[: self.max_body_size - len(body)]
+            if not message.get("more_body"):
+                return body
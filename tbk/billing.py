@@ -0,0 +1,269 @@
+"""
+Resumable OneClick recurring billing.
+
+    >>> journal = CheckpointJournal("billing-2019-10.journal")
+    >>> runner = BillingRunner(OneClickPaymentService(commerce), journal, concurrency=16)
+    >>> for result in runner.run(charges):
+    ...     print(result.buy_order, result.status)
+    >>> journal.close()
+
+Every charge is journaled as ``started`` (and the record fsync'd) before
+``authorize`` is called, and with its outcome afterwards. Running again with the
+same journal skips the buy orders that already have an entry, charges left
+``started`` by a crash are reported as ``uncertain`` and never retried, they
+must be checked against Transbank before being charged again.
+"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+
+from .concurrency import imap
+from .soap.deadline import clock
+from .soap.exceptions import (
+    AdmissionRejected,
+    DeadlineExceeded,
+    RequestorClosed,
+    SoapServerException,
+)
+
+STARTED = "started"
+AUTHORIZED = "authorized"
+REJECTED = "rejected"
+FAILED = "failed"
+UNCERTAIN = "uncertain"
+NOT_SENT = "not_sent"
+SKIPPED = "skipped"
+
+# states which allow charging the buy order again
+RETRYABLE_STATES = (NOT_SENT,)
+
+# errors raised by the requestor before anything is sent to Transbank
+NOT_SENT_ERRORS = (DeadlineExceeded, AdmissionRejected, RequestorClosed)
+
+
+class CheckpointJournal(object):
+    """Append-only JSON lines journal with group commit.
+
+    Records are written immediately but fsync'd in batches: ``append`` with
+    ``durable=True`` blocks until the record is on disk, which happens as soon
+    as ``fsync_every`` records are pending or ``fsync_interval`` seconds after
+    the first one, so concurrent writers share the cost of a single fsync.
+
+    A durable ``append`` raises ``IOError`` when the record is not on disk
+    after ``durable_timeout`` seconds or the fsync failed, every later
+    ``append`` raises it too once the fsync thread stopped on an error.
+    """
+
+    def __init__(self, path, fsync_every=100, fsync_interval=0.05, durable_timeout=30):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.durable_timeout = durable_timeout
+        self.fsyncs = 0
+        self.states = self._load()
+        self._file = open(path, "a")
+        if self._file.tell() and not self._ends_with_newline():
+            # terminate a line left half written by a crash
+            self._file.write("\n")
+        self._written = 0
+        self._synced = 0
+        self._closed = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._sync, name="tbk-billing-journal")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def get_state(self, buy_order):
+        return self.states.get(str(buy_order))
+
+    def append(self, buy_order, state, durable=False, **data):
+        data.update(
+            buy_order=str(buy_order),
+            state=state,
+            timestamp=datetime.datetime.utcnow().isoformat(),
+        )
+        line = json.dumps(data, default=str) + "\n"
+        with self._condition:
+            if self._closed:
+                raise ValueError("Journal is closed")
+            self._check_error()
+            self._file.write(line)
+            self._file.flush()
+            self._written += 1
+            sequence = self._written
+            self.states[data["buy_order"]] = state
+            if self._written - self._synced >= self.fsync_every:
+                self._condition.notify_all()
+            if durable:
+                expires_at = clock() + self.durable_timeout
+                while self._synced < sequence:
+                    self._check_error()
+                    remaining = expires_at - clock()
+                    if remaining <= 0:
+                        raise IOError(
+                            "Journal {} not synced after {}s".format(
+                                self.path, self.durable_timeout
+                            )
+                        )
+                    self._condition.wait(remaining)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._file.close()
+
+    def _check_error(self):
+        if self._error is not None:
+            raise IOError("Cannot sync journal {}: {!r}".format(self.path, self._error))
+
+    def _sync(self):
+        try:
+            self._sync_forever()
+        except Exception as error:
+            logging.getLogger("tbk.billing").exception("Cannot sync %s", self.path)
+            with self._condition:
+                self._error = error
+                self._condition.notify_all()
+
+    def _sync_forever(self):
+        while True:
+            with self._condition:
+                if self._written == self._synced:
+                    if self._closed:
+                        return
+                    self._condition.wait(self.fsync_interval)
+                    continue
+                if not self._closed and self._written - self._synced < self.fsync_every:
+                    # give concurrent writers a chance to join this fsync
+                    self._condition.wait(self.fsync_interval)
+                written = self._written
+            os.fsync(self._file.fileno())
+            with self._condition:
+                self._synced = written
+                self.fsyncs += 1
+                self._condition.notify_all()
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as journal:
+            journal.seek(-1, os.SEEK_END)
+            return journal.read(1) == b"\n"
+
+    def _load(self):
+        states = {}
+        if not os.path.exists(self.path):
+            return states
+        with open(self.path, "r") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # a line left half written by a crash
+                    continue
+                states[record["buy_order"]] = record["state"]
+        return states
+
+
+class Charge(object):
+    def __init__(self, buy_order, tbk_user, username, amount):
+        self.buy_order = buy_order
+        self.tbk_user = tbk_user
+        self.username = username
+        self.amount = amount
+
+    @classmethod
+    def from_data(cls, data):
+        if isinstance(data, cls):
+            return data
+        return cls(
+            data["buy_order"], data["tbk_user"], data["username"], data["amount"]
+        )
+
+
+class ChargeResult(object):
+    def __init__(self, charge, status, response=None, error=None):
+        self.charge = charge
+        self.status = status
+        self.response = response
+        self.error = error
+
+    @property
+    def buy_order(self):
+        return self.charge.buy_order
+
+
+class BillingRunner(object):
+    def __init__(self, service, journal, concurrency=8):
+        self.service = service
+        self.journal = journal
+        self.concurrency = concurrency
+        self.logger = logging.getLogger("tbk.billing")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def run(self, charges):
+        """Charge every item and yield a ``ChargeResult`` as each completes."""
+        charges = (Charge.from_data(data) for data in charges)
+        for outcome in imap(self.charge, charges, concurrency=self.concurrency):
+            if outcome.ok:
+                yield outcome.result
+            else:
+                self.logger.error(
+                    "Cannot journal charge %s: %r",
+                    outcome.item.buy_order,
+                    outcome.error,
+                )
+                yield ChargeResult(outcome.item, FAILED, error=outcome.error)
+
+    def charge(self, charge):
+        buy_order = str(charge.buy_order)
+        with self._lock:
+            if buy_order in self._in_flight:
+                return ChargeResult(charge, SKIPPED)
+            state = self.journal.get_state(buy_order)
+            if state is not None and state not in RETRYABLE_STATES:
+                if state in (STARTED, UNCERTAIN):
+                    self.logger.warning(
+                        "Charge %s was interrupted, check it before retrying", buy_order
+                    )
+                    return ChargeResult(charge, UNCERTAIN)
+                return ChargeResult(charge, SKIPPED)
+            self._in_flight.add(buy_order)
+        try:
+            self.journal.append(buy_order, STARTED, durable=True)
+            return self._authorize(charge)
+        finally:
+            with self._lock:
+                self._in_flight.discard(buy_order)
+
+    def _authorize(self, charge):
+        try:
+            response = self.service.authorize(
+                charge.buy_order, charge.tbk_user, charge.username, charge.amount
+            )
+        except NOT_SENT_ERRORS as error:
+            self.journal.append(charge.buy_order, NOT_SENT, error=repr(error))
+            return ChargeResult(charge, NOT_SENT, error=error)
+        except SoapServerException as error:
+            self.journal.append(
+                charge.buy_order, FAILED, error=error.error, code=error.code
+            )
+            return ChargeResult(charge, FAILED, error=error)
+        except Exception as error:
+            self.journal.append(charge.buy_order, UNCERTAIN, error=repr(error))
+            return ChargeResult(charge, UNCERTAIN, error=error)
+        result = response.result
+        status = AUTHORIZED if result.get("responseCode") == 0 else REJECTED
+        self.journal.append(
+            charge.buy_order,
+            status,
+            response_code=result.get("responseCode"),
+            authorization_code=result.get("authorizationCode"),
+            transaction_id=result.get("transactionId"),
+        )
+        return ChargeResult(charge, status, response=response)
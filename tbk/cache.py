@@ -0,0 +1,234 @@
+"""
+Cache backends for services and clients.
+
+* ``TTLCache``: in-memory LRU, local to the process.
+* ``FileCache``: one file per entry in a directory, shared by the processes
+  of a node (or by nodes mounting the same volume).
+* ``RedisCache``: entries in any server speaking the Redis protocol, shared
+  by every node, through a ``redis.Redis``-like client.
+
+Services take a backend per operation::
+
+    >>> caches = {"getTransactionResult": RedisCache(redis.Redis(), ttl=600)}
+    >>> webpay = WebpayService(commerce, caches=caches)
+
+Shared backends pickle their values, they must only be used with storage
+trusted as much as the code itself.
+"""
+
+import abc
+import errno
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from .soap.deadline import clock
+from .soap.soap_client import AbstractBaseClass
+
+# readable by python 2 and 3
+PICKLE_PROTOCOL = 2
+
+
+class CacheBackend(AbstractBaseClass):
+    """Interface of every cache.
+
+    Keys are tuples of strings and numbers, ``ttl`` is in seconds and
+    defaults to the ``ttl`` of the backend. ``hits`` and ``misses`` count the
+    lookups made through the instance.
+    """
+
+    hits = 0
+    misses = 0
+
+    @abc.abstractmethod
+    def get(self, key, default=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def make_key(key):
+    """Return ``key`` as a stable string, the same in every process."""
+    data = json.dumps(list(key), default=str, sort_keys=True)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+class TTLCache(CacheBackend):
+    """Thread safe LRU cache whose entries expire ``ttl`` seconds after set.
+
+    ``hits`` and ``misses`` count the lookups since the cache was created.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at <= clock():
+                del self._data[key]
+                self.misses += 1
+                return default
+            # move to the end as most recently used
+            del self._data[key]
+            self._data[key] = expires_at, value
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = clock() + ttl, value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+
+class FileCache(CacheBackend):
+    """Cache keeping each entry in its own file under ``directory``.
+
+    Files are replaced atomically so concurrent readers never see partial
+    entries, expired ones are removed when read.
+    """
+
+    def __init__(self, directory, ttl=300):
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        try:
+            os.makedirs(directory)
+        except OSError as error:
+            if error.errno != errno.EEXIST:
+                raise
+
+    def get_path(self, key):
+        return os.path.join(self.directory, make_key(key))
+
+    def get(self, key, default=None):
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as file:
+                expires_at, value = pickle.load(file)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        if expires_at <= time.time():
+            self._remove(path)
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump((time.time() + ttl, value), file, PICKLE_PROTOCOL)
+            _replace(temporary_path, self.get_path(key))
+        except Exception:
+            self._remove(temporary_path)
+            raise
+
+    def delete(self, key):
+        self._remove(self.get_path(key))
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            self._remove(os.path.join(self.directory, name))
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError as error:
+            if error.errno != errno.ENOENT:
+                raise
+
+
+def _replace(source, destination):
+    try:
+        os.replace(source, destination)
+    except AttributeError:  # pragma: no cover
+        os.rename(source, destination)
+
+
+class RedisCache(CacheBackend):
+    """Cache stored through ``client``, a ``redis.Redis`` compatible client.
+
+    Entries expire on the server, keys are namespaced by ``prefix``.
+    """
+
+    def __init__(self, client, ttl=300, prefix="tbk:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get_name(self, key):
+        return self.prefix + make_key(key)
+
+    def get(self, key, default=None):
+        data = self.client.get(self.get_name(key))
+        if data is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return pickle.loads(data)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(
+            self.get_name(key),
+            pickle.dumps(value, PICKLE_PROTOCOL),
+            px=max(1, int(ttl * 1000)),
+        )
+
+    def delete(self, key):
+        self.client.delete(self.get_name(key))
+
+    def clear(self):
+        names = list(self.client.scan_iter(match=self.prefix + "*"))
+        if names:
+            self.client.delete(*names)
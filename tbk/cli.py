@@ -0,0 +1,228 @@
+"""
+Run bulk operations read as JSON lines::
+
+    $ tbk --commerce-code 597020000541 --key-file commerce.key \\
+          --cert-file commerce.crt --tbk-cert-file tbk.pem \\
+          --environment CERTIFICATION --concurrency 8 --rate 20 operations.jsonl
+
+Every input line is an operation like::
+
+    {"service": "commerce_integration", "method": "capture",
+     "kwargs": {"authorization_code": "1213", "capture_amount": 1000,
+                "buy_order": "12345"}}
+
+Results are written to stdout as JSON lines in completion order and a
+summary with throughput and latency percentiles is written to stderr.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+import threading
+
+from . import environments
+from .commerce import Commerce
+from .concurrency import imap
+from .services import SERVICES, TBKWebService
+from .soap.deadline import clock
+from .soap.ratelimit import RateLimiter
+from .soap.utils import string_types
+
+
+class InvalidOperation(ValueError):
+    pass
+
+
+class Operation(object):
+    def __init__(self, line_number, service_name, method_name, args, kwargs):
+        self.line_number = line_number
+        self.service_name = service_name
+        self.method_name = method_name
+        self.args = args
+        self.kwargs = kwargs
+
+    @classmethod
+    def parse(cls, line_number, line, default_service=None):
+        try:
+            data = json.loads(line)
+        except ValueError as error:
+            raise InvalidOperation("Invalid JSON: {}".format(error))
+        if not isinstance(data, dict):
+            raise InvalidOperation("Operation must be a JSON object")
+        service_name = data.get("service", default_service)
+        service_class = SERVICES.get(service_name)
+        if service_class is None:
+            raise InvalidOperation("Unknown service {!r}".format(service_name))
+        method_name = data.get("method")
+        if not is_operation(service_class, method_name):
+            raise InvalidOperation(
+                "Unknown method {!r} for service {}".format(method_name, service_name)
+            )
+        return cls(
+            line_number,
+            service_name,
+            method_name,
+            data.get("args", []),
+            data.get("kwargs", {}),
+        )
+
+
+class Runner(object):
+    """Run operations concurrently with one service instance per service type."""
+
+    def __init__(self, commerce, concurrency=8, rate=None, requestor_kwargs=None):
+        self.commerce = commerce
+        self.concurrency = concurrency
+        self.requestor_kwargs = dict(requestor_kwargs or {})
+        if rate:
+            self.requestor_kwargs.setdefault("rate_limiter", RateLimiter(rate=rate))
+        self.services = {}
+        self.latencies = []
+        self._lock = threading.Lock()
+
+    def get_service(self, service_name):
+        with self._lock:
+            service = self.services.get(service_name)
+            if service is None:
+                service = self.services[service_name] = SERVICES[service_name](
+                    self.commerce, requestor_kwargs=self.requestor_kwargs
+                )
+            return service
+
+    def run(self, lines, default_service=None):
+        """Yield a result dict per input line in completion order."""
+        operations = (
+            (line_number, line)
+            for line_number, line in enumerate(lines, 1)
+            if line.strip()
+        )
+        for outcome in imap(
+            lambda item: self.execute(item[0], item[1], default_service),
+            operations,
+            concurrency=self.concurrency,
+        ):
+            yield outcome.result
+
+    def execute(self, line_number, line, default_service=None):
+        result = {"line": line_number}
+        try:
+            operation = Operation.parse(line_number, line, default_service)
+            result.update(service=operation.service_name, method=operation.method_name)
+            service = self.get_service(operation.service_name)
+            method = getattr(service, operation.method_name)
+            started = clock()
+            try:
+                response = method(*operation.args, **operation.kwargs)
+            finally:
+                elapsed = clock() - started
+                result["elapsed"] = elapsed
+                with self._lock:
+                    self.latencies.append(elapsed)
+        except Exception as error:
+            result.update(ok=False, error=repr(error))
+        else:
+            result.update(ok=True, result=response.result)
+        return result
+
+
+def is_operation(service_class, method_name):
+    return (
+        isinstance(method_name, string_types)
+        and not method_name.startswith("_")
+        and not hasattr(TBKWebService, method_name)
+        and callable(getattr(service_class, method_name, None))
+    )
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(results_count, errors_count, duration, latencies):
+    latencies = sorted(latencies)
+    return {
+        "operations": results_count,
+        "errors": errors_count,
+        "duration": duration,
+        "throughput": results_count / duration if duration else None,
+        "latency": {
+            "p50": percentile(latencies, 0.5),
+            "p90": percentile(latencies, 0.9),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(
+        prog="tbk", description="Run TBK operations in bulk from JSON lines."
+    )
+    parser.add_argument(
+        "input",
+        nargs="?",
+        type=argparse.FileType("r"),
+        default=sys.stdin,
+        help="JSON lines file with operations (default: stdin)",
+    )
+    parser.add_argument("--commerce-code", required=True)
+    parser.add_argument("--key-file", required=True)
+    parser.add_argument("--cert-file", required=True)
+    parser.add_argument("--tbk-cert-file", required=True)
+    parser.add_argument(
+        "--key-password",
+        default=os.environ.get("TBK_KEY_PASSWORD"),
+        help="defaults to the TBK_KEY_PASSWORD environment variable",
+    )
+    parser.add_argument(
+        "--environment",
+        default=environments.DEVELOPMENT,
+        choices=[
+            environments.DEVELOPMENT,
+            environments.CERTIFICATION,
+            environments.PRODUCTION,
+        ],
+    )
+    parser.add_argument(
+        "--service",
+        choices=sorted(SERVICES),
+        help="service used by operations without a `service` key",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--rate", type=float, help="maximum operations per second (default: no limit)"
+    )
+    return parser
+
+
+def main(argv=None, stdout=None, stderr=None):
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    args = create_parser().parse_args(argv)
+    commerce = Commerce.init_from_files(
+        args.commerce_code,
+        args.key_file,
+        args.cert_file,
+        args.tbk_cert_file,
+        args.environment,
+        key_password=args.key_password,
+    )
+    runner = Runner(commerce, concurrency=args.concurrency, rate=args.rate)
+    started = clock()
+    results_count = errors_count = 0
+    for result in runner.run(args.input, default_service=args.service):
+        results_count += 1
+        errors_count += 0 if result["ok"] else 1
+        stdout.write(json.dumps(result, default=str) + "\n")
+    stdout.flush()
+    summary = summarize(
+        results_count, errors_count, clock() - started, runner.latencies
+    )
+    print(json.dumps(summary), file=stderr)
+    return 1 if errors_count else 0
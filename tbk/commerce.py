@@ -1,6 +1,23 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import logging
+import os
+import threading
+import weakref
+
+from lxml import etree
+
+from .soap.utils import load_key_from_data
+from .soap.wsse import sign_envelope, verify_envelope
+from .soap.zeep_client import ZeepWsseSignature
+
+# signed with new credentials to check the key matches the certificate
+CHECK_ENVELOPE = (
+    b'<soap:Envelope xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/">'
+    b"<soap:Header/><soap:Body><check/></soap:Body></soap:Envelope>"
+)
+
 
 class Commerce(object):
     def __init__(
@@ -18,6 +35,7 @@ class Commerce(object):
         self.tbk_cert_data = tbk_cert_data
         self.environment = environment
         self.key_password = key_password
+        self.credentials_watcher = None
 
     @classmethod
     def init_from_files(
@@ -28,13 +46,170 @@ class Commerce(object):
         tbk_cert_file,
         environment,
         key_password=None,
+        watch_interval=None,
     ):
+        """Load credentials from files.
+
+        With a ``watch_interval`` (in seconds) the files are watched and the
+        clients created for this commerce pick up new credentials without
+        being rebuilt, see ``CredentialsWatcher``.
+        """
         key_data = _read_file(key_file)
         cert_data = _read_file(cert_file)
         tbk_cert_data = _read_file(tbk_cert_file)
-        return cls(
+        commerce = cls(
             commerce_code, key_data, cert_data, tbk_cert_data, environment, key_password
         )
+        if watch_interval is not None:
+            commerce.credentials_watcher = CredentialsWatcher(
+                commerce, key_file, cert_file, tbk_cert_file, interval=watch_interval
+            )
+            commerce.credentials_watcher.start()
+        return commerce
+
+
+class CredentialsWatcher(object):
+    """Reload commerce credentials when their files change.
+
+    Files are checked by modification time and size every ``interval`` seconds
+    (or on ``check()``). Changes are only loaded once no file changed for a
+    whole interval, so a rotation in progress (e.g. the new key written but
+    not the new certificate yet) is not picked up half done. New credentials
+    must load into a ``ZeepWsseSignature`` with a key matching the
+    certificate, then they are set on the commerce and passed to the
+    ``update_credentials`` method of every subscribed client. When they are
+    invalid or a client rejects them the clients already updated are rolled
+    back to the previous credentials and the change is retried on the next
+    check.
+    """
+
+    def __init__(self, commerce, key_file, cert_file, tbk_cert_file, interval=60):
+        self.commerce = commerce
+        self.files = (key_file, cert_file, tbk_cert_file)
+        self.interval = interval
+        self.reloads = 0
+        self.logger = logging.getLogger("tbk.commerce.CredentialsWatcher")
+        self._clients = weakref.WeakSet()
+        self._signature = self._get_signature()
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, client):
+        self._clients.add(client)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="tbk-credentials-watcher"
+            )
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def check(self):
+        """Reload the credentials if the files changed and are stable.
+
+        Return if they were reloaded.
+        """
+        with self._lock:
+            signature = self._get_signature()
+            if signature == self._signature:
+                self._pending = None
+                return False
+            if signature != self._pending:
+                # wait for a check that finds the files unchanged
+                self._pending = signature
+                return False
+            key_data, cert_data, tbk_cert_data = [
+                _read_file(f_name) for f_name in self.files
+            ]
+            if self._get_signature() != signature:
+                self._pending = None
+                return False
+            try:
+                validate_credentials(
+                    key_data,
+                    cert_data,
+                    tbk_cert_data,
+                    password=self.commerce.key_password,
+                )
+            except Exception:
+                self.logger.exception(
+                    "Invalid credentials for commerce %s", self.commerce.commerce_code
+                )
+                return False
+            if not self._update_clients(key_data, cert_data, tbk_cert_data):
+                return False
+            self.commerce.key_data = key_data
+            self.commerce.cert_data = cert_data
+            self.commerce.tbk_cert_data = tbk_cert_data
+            self._signature = signature
+            self.reloads += 1
+            self.logger.info(
+                "Credentials reloaded for commerce %s", self.commerce.commerce_code
+            )
+            return True
+
+    def _update_clients(self, key_data, cert_data, tbk_cert_data):
+        password = self.commerce.key_password
+        updated = []
+        try:
+            for client in list(self._clients):
+                client.update_credentials(
+                    key_data, cert_data, tbk_cert_data, password=password
+                )
+                updated.append(client)
+        except Exception:
+            self.logger.exception(
+                "Cannot reload credentials for commerce %s, rolling back",
+                self.commerce.commerce_code,
+            )
+            for client in updated:
+                try:
+                    client.update_credentials(
+                        self.commerce.key_data,
+                        self.commerce.cert_data,
+                        self.commerce.tbk_cert_data,
+                        password=password,
+                    )
+                except Exception:
+                    self.logger.exception("Cannot roll back credentials of %r", client)
+            return False
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                self.logger.exception("Cannot check credential files")
+
+    def _get_signature(self):
+        signature = []
+        for f_name in self.files:
+            stat = os.stat(f_name)
+            signature.append((stat.st_mtime, stat.st_size))
+        return signature
+
+
+def validate_credentials(key_data, cert_data, tbk_cert_data, password=None):
+    """Raise an exception unless the credentials load and the key matches."""
+    signature = ZeepWsseSignature.init_from_data(
+        key_data, cert_data, tbk_cert_data, password
+    )
+    envelope = etree.fromstring(CHECK_ENVELOPE)
+    sign_envelope(envelope, signature.key)
+    if not verify_envelope(
+        envelope, load_key_from_data(cert_data, key_format="CERT_PEM")
+    ):
+        raise ValueError("The key does not match the certificate")
 
 
 def _read_file(f_name):
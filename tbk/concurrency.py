@@ -0,0 +1,130 @@
+import threading
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+
+_DONE = object()
+
+
+class Outcome(object):
+    """Result of calling a function with one item of a batch.
+
+    ``error`` holds the exception raised by the call, ``result`` is ``None``
+    in that case.
+    """
+
+    __slots__ = ("index", "item", "result", "error")
+
+    def __init__(self, index, item, result=None, error=None):
+        self.index = index
+        self.item = item
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return "<Outcome {} item={!r} ok={}>".format(self.index, self.item, self.ok)
+
+
+class _FeedFinished(object):
+    def __init__(self, count, error=None):
+        self.count = count
+        self.error = error
+
+
+def imap(function, iterable, concurrency=8, ordered=False, window=None):
+    """Call ``function`` for every item of ``iterable`` on a pool of threads.
+
+    Yield an ``Outcome`` per item as soon as it is ready, or in input order
+    when ``ordered`` is true. Items are pulled from ``iterable`` lazily and at
+    most ``window`` (default ``4 * concurrency``) of them are held at any time,
+    so memory stays constant no matter how long the input is.
+
+    Exceptions raised by ``function`` are reported in the outcomes, exceptions
+    raised by ``iterable`` are raised by the generator.
+    """
+    window = window or 4 * concurrency
+    tasks = queue.Queue()
+    outcomes = queue.Queue()
+    condition = threading.Condition()
+    state = {"pending": 0, "stopped": False}
+
+    def feed():
+        count = 0
+        error = None
+        try:
+            for index, item in enumerate(iterable):
+                with condition:
+                    while state["pending"] >= window and not state["stopped"]:
+                        condition.wait(0.1)
+                    if state["stopped"]:
+                        break
+                    state["pending"] += 1
+                tasks.put((index, item))
+                count += 1
+        except Exception as feed_error:
+            error = feed_error
+        finally:
+            for _ in range(concurrency):
+                tasks.put(_DONE)
+            outcomes.put(_FeedFinished(count, error))
+
+    def work():
+        while True:
+            task = tasks.get()
+            if task is _DONE:
+                return
+            index, item = task
+            if state["stopped"]:
+                continue
+            try:
+                outcome = Outcome(index, item, result=function(item))
+            except Exception as error:
+                outcome = Outcome(index, item, error=error)
+            outcomes.put(outcome)
+
+    def release():
+        with condition:
+            state["pending"] -= 1
+            condition.notify()
+
+    threads = [threading.Thread(target=feed, name="tbk-imap-feeder")]
+    threads.extend(
+        threading.Thread(target=work, name="tbk-imap-worker-{}".format(number))
+        for number in range(concurrency)
+    )
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    total = None
+    yielded = 0
+    buffered = {}
+    try:
+        while total is None or yielded < total:
+            outcome = outcomes.get()
+            if isinstance(outcome, _FeedFinished):
+                if outcome.error is not None:
+                    raise outcome.error
+                total = outcome.count
+                continue
+            if not ordered:
+                release()
+                yielded += 1
+                yield outcome
+                continue
+            buffered[outcome.index] = outcome
+            while yielded in buffered:
+                release()
+                yielded += 1
+                yield buffered.pop(yielded - 1)
+    finally:
+        with condition:
+            state["stopped"] = True
+            condition.notify_all()
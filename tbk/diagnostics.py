@@ -0,0 +1,104 @@
+"""
+Memory footprint of services and requests, measured with ``tracemalloc``.
+
+    >>> report = service_footprint(WebpayService, commerce)
+    >>> report.retained  # bytes kept by one service instance
+    >>> report = request_footprint(webpay, "get_transaction_result", token)
+    >>> report.peak  # bytes allocated while the request was in flight
+
+Measurements run with the global ``tracemalloc`` tracer: it is started and
+stopped around the call unless it was already tracing. Its peak is reset before
+the call (python >= 3.9) so it covers the call only; on older versions ``peak``
+is ``None`` when the tracer was already running. Allocations made by other
+threads during the call are counted as well.
+"""
+
+import gc
+
+try:
+    import tracemalloc
+except ImportError:  # pragma: no cover
+    tracemalloc = None
+
+# allocations of the tracer itself are not accounted
+IGNORED_FILES = (getattr(tracemalloc, "__file__", "<unknown>"),)
+
+
+class Footprint(object):
+    """Memory cost of a call.
+
+    ``retained`` are the bytes still allocated after the call returned (and
+    its result is alive), ``peak`` the maximum bytes allocated during the call
+    or ``None`` when the tracer was running before and its peak can't be reset.
+    ``statistics`` lists the ``(filename, size)`` pairs retaining most memory.
+    """
+
+    def __init__(self, retained, peak, statistics):
+        self.retained = retained
+        self.peak = peak
+        self.statistics = statistics
+
+    def as_dict(self):
+        return {
+            "retained": self.retained,
+            "peak": self.peak,
+            "statistics": self.statistics,
+        }
+
+    def __repr__(self):
+        return "<Footprint retained={} peak={}>".format(self.retained, self.peak)
+
+
+def is_available():
+    return tracemalloc is not None
+
+
+def footprint(function, *args, **kwargs):
+    """Call ``function`` and return its ``Footprint``."""
+    if tracemalloc is None:
+        raise RuntimeError("tracemalloc is not available")
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        gc.collect()
+        before = tracemalloc.take_snapshot()
+        current, _ = tracemalloc.get_traced_memory()
+        peak_available = started or hasattr(tracemalloc, "reset_peak")
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        result = function(*args, **kwargs)
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        del result
+    finally:
+        if started:
+            tracemalloc.stop()
+    return Footprint(
+        retained - current,
+        peak - current if peak_available else None,
+        get_statistics(before, after),
+    )
+
+
+def get_statistics(before, after, limit=10):
+    filters = [tracemalloc.Filter(False, filename) for filename in IGNORED_FILES]
+    differences = after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), "filename"
+    )
+    return [
+        (difference.traceback[0].filename, difference.size_diff)
+        for difference in differences[:limit]
+        if difference.size_diff > 0
+    ]
+
+
+def service_footprint(service_class, commerce, **kwargs):
+    """Measure creating a ``service_class`` instance for ``commerce``."""
+    return footprint(service_class, commerce, **kwargs)
+
+
+def request_footprint(service, method_name, *args, **kwargs):
+    """Measure calling ``method_name`` of ``service``."""
+    return footprint(getattr(service, method_name), *args, **kwargs)
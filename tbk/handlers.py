@@ -0,0 +1,226 @@
+"""
+Framework agnostic handlers for the Webpay return and final URLs.
+
+    >>> handler = WebpayReturnHandler(WebpayService(commerce))
+    >>> return_app = WSGIAdapter(handler.handle_return)
+    >>> final_app = WSGIAdapter(handler.handle_final)
+
+``handle_return`` gets the transaction result and acknowledges it once per
+token: repeated posts of the same ``token_ws`` (reloads, double submits)
+share the call in flight or reuse its outcome. ``tbk.asgi.ASGIAdapter`` runs
+the same handlers on a thread pool so the event loop is never blocked.
+
+Pages are rendered by the ``render_return`` and ``render_final`` callables,
+which receive a ``ReturnOutcome`` and return a ``Response``. By default an
+approved transaction is redirected to the Webpay voucher.
+"""
+
+import logging
+
+try:
+    from urllib.parse import parse_qs
+except ImportError:  # pragma: no cover
+    from urlparse import parse_qs
+
+from .cache import TTLCache
+from .soap.exceptions import SoapServerException
+from .soap.singleflight import SingleFlight
+
+try:
+    from html import escape
+except ImportError:  # pragma: no cover
+    from cgi import escape
+
+STATUS_REASONS = {
+    200: "OK",
+    303: "See Other",
+    400: "Bad Request",
+    405: "Method Not Allowed",
+}
+
+
+class Response(object):
+    def __init__(self, status=200, headers=None, body=b""):
+        self.status = status
+        self.headers = list(headers or [("Content-Type", "text/html; charset=utf-8")])
+        self.body = body.encode("utf-8") if not isinstance(body, bytes) else body
+
+    @property
+    def status_line(self):
+        return "{} {}".format(self.status, STATUS_REASONS.get(self.status, ""))
+
+
+class ReturnOutcome(object):
+    """State of a transaction posted back by Webpay.
+
+    ``aborted`` is set when the user cancelled the payment (Webpay posts
+    ``TBK_TOKEN`` instead of ``token_ws``), ``error`` when getting the result
+    or acknowledging it failed. An outcome with neither result nor error is
+    unknown, e.g. the final URL was reached after the outcome expired or was
+    handled by another process.
+    """
+
+    def __init__(
+        self, token, result=None, acknowledged=False, error=None, aborted=False
+    ):
+        self.token = token
+        self.result = result
+        self.acknowledged = acknowledged
+        self.error = error
+        self.aborted = aborted
+
+    @property
+    def ok(self):
+        return self.acknowledged and self.error is None
+
+    @property
+    def definitive(self):
+        """Whether the state is known, connection errors may succeed on a retry."""
+        return self.aborted or self.ok or isinstance(self.error, SoapServerException)
+
+    @property
+    def approved(self):
+        if not self.ok:
+            return False
+        details = self.result.get("detailOutput") or [{}]
+        return all(detail.get("responseCode") == 0 for detail in details)
+
+    @property
+    def buy_order(self):
+        return self.result.get("buyOrder") if self.result else None
+
+
+def default_render_return(outcome):
+    if outcome.approved and outcome.result.get("urlRedirection"):
+        # the voucher is shown by Webpay, the browser has to post the token back
+        return Response(
+            body=(
+                '<html><body onload="document.forms[0].submit()">'
+                '<form method="POST" action="{url}">'
+                '<input type="hidden" name="token_ws" value="{token}">'
+                '<button type="submit">Continue</button>'
+                "</form></body></html>"
+            ).format(
+                url=escape(outcome.result["urlRedirection"], True),
+                token=escape(outcome.token, True),
+            )
+        )
+    return default_render_final(outcome)
+
+
+def default_render_final(outcome):
+    if outcome.approved:
+        message = "Payment approved"
+    elif outcome.aborted:
+        message = "Payment cancelled"
+    elif not outcome.definitive:
+        message = "Payment pending, check the status of your order"
+    else:
+        message = "Payment rejected"
+    return Response(
+        body="<html><body><h1>{}</h1><p>{}</p></body></html>".format(
+            message, escape(str(outcome.buy_order or ""))
+        )
+    )
+
+
+class WebpayReturnHandler(object):
+    def __init__(
+        self,
+        service,
+        render_return=None,
+        render_final=None,
+        maxsize=10000,
+        ttl=1800,
+    ):
+        self.service = service
+        self.render_return = render_return or default_render_return
+        self.render_final = render_final or default_render_final
+        self.outcomes = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.single_flight = SingleFlight()
+        self.logger = logging.getLogger("tbk.handlers")
+
+    def handle_return(self, form):
+        """Return the ``Response`` for the data posted to the return URL."""
+        token = form.get("token_ws")
+        if token:
+            return self.render_return(self.finish(token))
+        return self._handle_aborted(form, self.render_return)
+
+    def handle_final(self, form):
+        """Return the ``Response`` for the data posted to the final URL."""
+        token = form.get("token_ws")
+        if token:
+            outcome = self.outcomes.get(token)
+            if outcome is None:
+                # not a rejection, the payment may have been approved elsewhere
+                self.logger.warning("No outcome for token %s at final url", token)
+                outcome = ReturnOutcome(token)
+            return self.render_final(outcome)
+        return self._handle_aborted(form, self.render_final)
+
+    def finish(self, token):
+        """Get the result of ``token`` and acknowledge it, at most once."""
+        outcome = self.outcomes.get(token)
+        if outcome is not None:
+            return outcome
+        return self.single_flight.do(token, self._finish, token)
+
+    def _finish(self, token):
+        outcome = self.outcomes.get(token)
+        if outcome is not None:
+            return outcome
+        outcome = ReturnOutcome(token)
+        try:
+            outcome.result = self.service.get_transaction_result(token).result
+            self.service.acknowledge_transaction(token)
+            outcome.acknowledged = True
+        except Exception as error:
+            self.logger.exception("Cannot finish transaction %s", token)
+            outcome.error = error
+        if outcome.definitive:
+            # a repeated post retries transient errors
+            self.outcomes.set(token, outcome)
+        return outcome
+
+    def _handle_aborted(self, form, render):
+        token = form.get("TBK_TOKEN")
+        if not token:
+            return Response(400, body="Missing token")
+        return render(ReturnOutcome(token, aborted=True))
+
+
+def parse_form(body, query_string=""):
+    """Return the first value of every field of an urlencoded body and query."""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    if isinstance(query_string, bytes):
+        query_string = query_string.decode("latin-1")
+    form = {}
+    for data in (body, query_string):
+        for key, values in parse_qs(data).items():
+            form.setdefault(key, values[0])
+    return form
+
+
+class WSGIAdapter(object):
+    """WSGI application calling ``handle`` with the posted form."""
+
+    def __init__(self, handle, max_body_size=64 * 1024):
+        self.handle = handle
+        self.max_body_size = max_body_size
+
+    def __call__(self, environ, start_response):
+        if environ.get("REQUEST_METHOD") not in ("GET", "POST"):
+            response = Response(405, body="Method not allowed")
+        else:
+            try:
+                length = min(
+                    int(environ.get("CONTENT_LENGTH") or 0), self.max_body_size
+                )
+            except ValueError:
+                length = 0
+            body = environ["wsgi.input"].read(length) if length else b""
+            response = self.handle(parse_form(body, environ.get("QUERY_STRING", "")))
+        start_response(response.status_line, response.headers)
+        return [response.body]
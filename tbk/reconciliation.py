@@ -0,0 +1,162 @@
+"""
+Bulk reconciliation of Webpay transactions against Transbank.
+
+    >>> reconciliation = Reconciliation(WebpayService(commerce), concurrency=16)
+    >>> with open("tokens.txt") as tokens, open("report.jsonl", "w") as output:
+    ...     summary = reconciliation.write(
+    ...         (line.strip() for line in tokens), JSONLinesWriter(output)
+    ...     )
+"""
+
+import csv
+import json
+import logging
+
+from .concurrency import imap
+from .soap.deadline import Deadline
+from .soap.utils import string_types
+
+
+class ReconciliationRecord(object):
+    """Outcome of looking up a single transaction.
+
+    ``expected_buy_order`` is the buy order the caller has for the token, when
+    given ``matches`` tells whether Transbank reports the same one.
+    """
+
+    def __init__(self, token, expected_buy_order=None, result=None, error=None):
+        self.token = token
+        self.expected_buy_order = expected_buy_order
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def matches(self):
+        if self.result is None or self.expected_buy_order is None:
+            return None
+        return str(self.result.get("buyOrder")) == str(self.expected_buy_order)
+
+    def as_row(self):
+        result = self.result or {}
+        details = result.get("detailOutput") or [{}]
+        detail = details[0] or {}
+        card_detail = result.get("cardDetail") or {}
+        return {
+            "token": self.token,
+            "expected_buy_order": self.expected_buy_order,
+            "buy_order": result.get("buyOrder"),
+            "matches": self.matches,
+            "status": "ok" if self.ok else "error",
+            "response_code": detail.get("responseCode"),
+            "amount": detail.get("amount"),
+            "authorization_code": detail.get("authorizationCode"),
+            "payment_type_code": detail.get("paymentTypeCode"),
+            "shares_number": detail.get("sharesNumber"),
+            "card_number": card_detail.get("cardNumber"),
+            "transaction_date": result.get("transactionDate"),
+            "accounting_date": result.get("accountingDate"),
+            "vci": result.get("VCI"),
+            "error": None if self.ok else repr(self.error),
+        }
+
+
+class Reconciliation(object):
+    """Fetch transaction results concurrently through a single service.
+
+    Items are tokens or ``{"token": ..., "buy_order": ...}`` mappings, they
+    are read lazily so any iterator can be used regardless of its size.
+    """
+
+    def __init__(self, service, concurrency=8, timeout=None):
+        self.service = service
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.logger = logging.getLogger("tbk.reconciliation")
+
+    def run(self, items, ordered=False):
+        """Yield a ``ReconciliationRecord`` per item as results arrive."""
+        for outcome in imap(
+            self._fetch, items, concurrency=self.concurrency, ordered=ordered
+        ):
+            token, buy_order = _parse_item(outcome.item)
+            if outcome.ok:
+                yield ReconciliationRecord(token, buy_order, result=outcome.result)
+            else:
+                self.logger.warning(
+                    "Cannot get transaction result for token %s: %r",
+                    token,
+                    outcome.error,
+                )
+                yield ReconciliationRecord(token, buy_order, error=outcome.error)
+
+    def write(self, items, writer, ordered=False):
+        """Stream the records to ``writer`` and return a summary of the run."""
+        summary = {"total": 0, "ok": 0, "errors": 0, "mismatches": 0}
+        for record in self.run(items, ordered=ordered):
+            writer.write(record)
+            summary["total"] += 1
+            summary["ok" if record.ok else "errors"] += 1
+            if record.matches is False:
+                summary["mismatches"] += 1
+        writer.flush()
+        return summary
+
+    def _fetch(self, item):
+        token, _ = _parse_item(item)
+        deadline = None if self.timeout is None else Deadline(self.timeout)
+        return self.service.get_transaction_result(token, deadline=deadline).result
+
+
+class JSONLinesWriter(object):
+    def __init__(self, output):
+        self.output = output
+
+    def write(self, record):
+        row = record.as_row()
+        row["result"] = record.result
+        self.output.write(json.dumps(row, default=str) + "\n")
+
+    def flush(self):
+        self.output.flush()
+
+
+class CSVWriter(object):
+
+    FIELDS = (
+        "token",
+        "expected_buy_order",
+        "buy_order",
+        "matches",
+        "status",
+        "response_code",
+        "amount",
+        "authorization_code",
+        "payment_type_code",
+        "shares_number",
+        "card_number",
+        "transaction_date",
+        "accounting_date",
+        "vci",
+        "error",
+    )
+
+    def __init__(self, output):
+        self.output = output
+        self.writer = csv.DictWriter(output, fieldnames=self.FIELDS)
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record.as_row())
+
+    def flush(self):
+        self.output.flush()
+
+
+def _parse_item(item):
+    if isinstance(item, string_types):
+        return item, None
+    return item["token"], item.get("buy_order")
@@ -1,10 +1,24 @@
 import logging
 
+from .cache import TTLCache
 from .soap import create_soap_requestor
+from .soap.deadline import clock
+from .soap.utils import get_field
 
 
 class TBKWebService(object):
-    def __init__(self, commerce, soap_requestor=None, **client_kwargs):
+
+    # read only operations, concurrent identical calls share a single request
+    IDEMPOTENT_METHODS = ()
+
+    def __init__(
+        self,
+        commerce,
+        soap_requestor=None,
+        requestor_kwargs=None,
+        caches=None,
+        **client_kwargs
+    ):
         self.logger = logging.getLogger(
             "tbk.services.{}".format(self.__class__.__name__)
         )
@@ -14,12 +28,71 @@ class TBKWebService(object):
             commerce.environment,
         )
         self.commerce = commerce
+        # ``tbk.cache`` backends by operation name
+        self.caches = dict(caches or {})
+        requestor_kwargs = dict(requestor_kwargs or {})
+        requestor_kwargs.setdefault("idempotent_methods", self.IDEMPOTENT_METHODS)
         self.soap_requestor = soap_requestor or create_soap_requestor(
             wsdl_url=self.get_wsdl_url_for_environment(commerce.environment),
             commerce=commerce,
+            requestor_kwargs=requestor_kwargs,
             **client_kwargs
         )
 
+    def warmup(self, connections=1):
+        """Open connections to the service before the first request."""
+        return self.soap_requestor.warmup(connections)
+
+    def close(self, drain_timeout=None):
+        """Stop taking requests and close the connections of the service.
+
+        Return the requests cut off, see ``SoapRequestor.close``.
+        """
+        return self.soap_requestor.close(drain_timeout)
+
+    def request_many(self, calls, concurrency=8, ordered=False, deadline=None):
+        """Send raw ``(method_name, args[, kwargs])`` calls concurrently.
+
+        See ``SoapRequestor.request_many``.
+        """
+        return self.soap_requestor.request_many(
+            calls, concurrency=concurrency, ordered=ordered, deadline=deadline
+        )
+
+    def batch(self, method, items, concurrency=8, ordered=False, deadline=None):
+        """Call the service ``method`` (e.g. ``"remove_user"``) for every item.
+
+        Items are argument tuples, keyword argument dicts or single arguments.
+        Yield a ``tbk.concurrency.Outcome`` per item, the calls are sent by
+        ``request_many``.
+        """
+
+        def call(method_name, *args, **kwargs):
+            return getattr(self, method_name)(*args, **kwargs)
+
+        return self.soap_requestor.request_many(
+            (get_call(method, item) for item in items),
+            concurrency=concurrency,
+            ordered=ordered,
+            deadline=deadline,
+            request=call,
+        )
+
+    def cached(self, method_name, key, function, *args, **kwargs):
+        """Return ``function(*args, **kwargs)`` through the cache of ``method_name``.
+
+        ``key`` identifies the call within the operation of this commerce.
+        """
+        cache = self.caches.get(method_name)
+        if cache is None:
+            return function(*args, **kwargs)
+        cache_key = (self.commerce.commerce_code, method_name) + tuple(key)
+        response = cache.get(cache_key)
+        if response is None:
+            response = function(*args, **kwargs)
+            cache.set(cache_key, response)
+        return response
+
     @classmethod
     def get_wsdl_url_for_environment(cls, environment):
         try:
@@ -28,30 +101,39 @@ class TBKWebService(object):
             raise ValueError("Invalid environment {}".format(environment))
 
 
+def get_call(method, item):
+    """Return the ``request_many`` call of ``method`` with a ``batch`` item."""
+    if isinstance(item, dict):
+        return method, (), item
+    if isinstance(item, tuple):
+        return method, item
+    return method, (item,)
+
+
 class OneClickPaymentService(TBKWebService):
 
     WSDL_DEVELOPMENT = "https://webpay3gint.transbank.cl/webpayserver/wswebpay/OneClickPaymentService?wsdl"
     WSDL_CERTIFICATION = "https://webpay3gint.transbank.cl/webpayserver/wswebpay/OneClickPaymentService?wsdl"
     WSDL_PRODUCTION = "https://webpay3g.transbank.cl/webpayserver/wswebpay/OneClickPaymentService?wsdl"
 
-    def init_inscription(self, username, email, response_url):
+    def init_inscription(self, username, email, response_url, deadline=None):
         arguments = {"username": username, "email": email, "responseURL": response_url}
         one_click_inscription_input = self.soap_requestor.create_object(
             "oneClickInscriptionInput", **arguments
         )
         return self.soap_requestor.request(
-            "initInscription", one_click_inscription_input
+            "initInscription", one_click_inscription_input, deadline=deadline
         )
 
-    def finish_inscription(self, token):
+    def finish_inscription(self, token, deadline=None):
         finish_inscription_input = self.soap_requestor.create_object(
             "oneClickFinishInscriptionInput", token=token
         )
         return self.soap_requestor.request(
-            "finishInscription", finish_inscription_input
+            "finishInscription", finish_inscription_input, deadline=deadline
         )
 
-    def authorize(self, buy_order, tbk_user, username, amount):
+    def authorize(self, buy_order, tbk_user, username, amount, deadline=None):
         arguments = {
             "buyOrder": buy_order,
             "tbkUser": tbk_user,
@@ -59,20 +141,24 @@ class OneClickPaymentService(TBKWebService):
             "amount": amount,
         }
         pay_input = self.soap_requestor.create_object("oneClickPayInput", **arguments)
-        return self.soap_requestor.request("authorize", pay_input)
+        return self.soap_requestor.request("authorize", pay_input, deadline=deadline)
 
-    def code_reverse_oneclick(self, buyorder):
+    def code_reverse_oneclick(self, buyorder, deadline=None):
         reverse_input = self.soap_requestor.create_object(
             "oneClickReverseInput", buyorder=buyorder
         )
-        return self.soap_requestor.request("codeReverseOneClick", reverse_input)
+        return self.soap_requestor.request(
+            "codeReverseOneClick", reverse_input, deadline=deadline
+        )
 
-    def remove_user(self, tbk_user, username):
+    def remove_user(self, tbk_user, username, deadline=None):
         arguments = {"tbkUser": tbk_user, "username": username}
         one_click_remove_user_input = self.soap_requestor.create_object(
             "oneClickRemoveUserInput", **arguments
         )
-        return self.soap_requestor.request("removeUser", one_click_remove_user_input)
+        return self.soap_requestor.request(
+            "removeUser", one_click_remove_user_input, deadline=deadline
+        )
 
 
 class WebpayService(TBKWebService):
@@ -87,8 +173,10 @@ class WebpayService(TBKWebService):
         "https://webpay3g.transbank.cl/WSWebpayTransaction/cxf/WSWebpayService?wsdl"
     )
 
+    IDEMPOTENT_METHODS = ("getTransactionResult",)
+
     def init_transaction(
-        self, amount, buy_order, return_url, final_url, session_id=None
+        self, amount, buy_order, return_url, final_url, session_id=None, deadline=None
     ):
         transaction_type = self.soap_requestor.get_enum_value(
             "wsTransactionType", "TR_NORMAL_WS"
@@ -112,13 +200,36 @@ class WebpayService(TBKWebService):
         init_transaction_input = self.soap_requestor.create_object(
             "wsInitTransactionInput", **arguments
         )
-        return self.soap_requestor.request("initTransaction", init_transaction_input)
+        return self.soap_requestor.request(
+            "initTransaction", init_transaction_input, deadline=deadline
+        )
 
-    def get_transaction_result(self, token):
-        return self.soap_requestor.request("getTransactionResult", token)
+    def get_transaction_result(self, token, deadline=None):
+        return self.cached(
+            "getTransactionResult",
+            (token,),
+            self.soap_requestor.request,
+            "getTransactionResult",
+            token,
+            deadline=deadline,
+        )
+
+    def acknowledge_transaction(self, token, deadline=None):
+        return self.soap_requestor.request(
+            "acknowledgeTransaction", token, deadline=deadline
+        )
 
-    def acknowledge_transaction(self, token):
-        return self.soap_requestor.request("acknowledgeTransaction", token)
+    def get_transaction_results(
+        self, tokens, concurrency=8, ordered=False, deadline=None
+    ):
+        """Get the results of many ``tokens``, see ``batch``."""
+        return self.batch(
+            "get_transaction_result",
+            tokens,
+            concurrency=concurrency,
+            ordered=ordered,
+            deadline=deadline,
+        )
 
 
 class CommerceIntegrationService(TBKWebService):
@@ -127,7 +238,14 @@ class CommerceIntegrationService(TBKWebService):
     WSDL_CERTIFICATION = "https://webpay3gint.transbank.cl/WSWebpayTransaction/cxf/WSCommerceIntegrationService?wsdl"
     WSDL_PRODUCTION = "https://webpay3g.transbank.cl/WSWebpayTransaction/cxf/WSCommerceIntegrationService?wsdl"
 
-    def nullify(self, authorization_code, authorized_amount, buy_order, nullify_amount):
+    def nullify(
+        self,
+        authorization_code,
+        authorized_amount,
+        buy_order,
+        nullify_amount,
+        deadline=None,
+    ):
         arguments = {
             "authorizationCode": authorization_code,
             "authorizedAmount": authorized_amount,
@@ -138,9 +256,11 @@ class CommerceIntegrationService(TBKWebService):
         nullification_input = self.soap_requestor.create_object(
             "nullificationInput", **arguments
         )
-        return self.soap_requestor.request("nullify", nullification_input)
+        return self.soap_requestor.request(
+            "nullify", nullification_input, deadline=deadline
+        )
 
-    def capture(self, authorization_code, capture_amount, buy_order):
+    def capture(self, authorization_code, capture_amount, buy_order, deadline=None):
         arguments = {
             "commerceId": self.commerce.commerce_code,
             "authorizationCode": authorization_code,
@@ -148,7 +268,7 @@ class CommerceIntegrationService(TBKWebService):
             "captureAmount": capture_amount,
         }
         capture_input = self.soap_requestor.create_object("captureInput", **arguments)
-        return self.soap_requestor.request("capture", capture_input)
+        return self.soap_requestor.request("capture", capture_input, deadline=deadline)
 
 
 class CompleteWebpayService(TBKWebService):
@@ -157,8 +277,50 @@ class CompleteWebpayService(TBKWebService):
     WSDL_CERTIFICATION = "https://webpay3gint.transbank.cl/WSWebpayTransaction/cxf/WSCompleteWebpayService?wsdl"
     WSDL_PRODUCTION = "https://webpay3g.transbank.cl/WSWebpayTransaction/cxf/WSCompleteWebpayService?wsdl"
 
+    IDEMPOTENT_METHODS = ("queryShare",)
+
+    # seconds a transaction token can be used after initCompleteTransaction
+    TOKEN_TTL = 300
+
+    def __init__(
+        self,
+        commerce,
+        soap_requestor=None,
+        queryshare_cache=None,
+        token_ttl=None,
+        **kwargs
+    ):
+        """``queryshare_cache`` (e.g. ``tbk.cache.TTLCache``) keeps ``queryshare``
+        responses by token, buy order and share number.
+
+        Entries of a token are evicted by ``authorize`` and
+        ``acknowledge_transaction`` and never outlive it: they expire when the
+        token does if it was issued by this service, after ``token_ttl``
+        seconds otherwise (and never after the ttl of the cache)."""
+        super(CompleteWebpayService, self).__init__(commerce, soap_requestor, **kwargs)
+        if queryshare_cache is not None:
+            self.queryshare_cache = queryshare_cache
+        self.token_ttl = self.TOKEN_TTL if token_ttl is None else token_ttl
+        # expiration time of the tokens issued by this service
+        self._token_expirations = TTLCache(maxsize=10000, ttl=self.token_ttl)
+
+    @property
+    def queryshare_cache(self):
+        return self.caches.get("queryShare")
+
+    @queryshare_cache.setter
+    def queryshare_cache(self, cache):
+        self.caches["queryShare"] = cache
+
     def init_complete_transaction(
-        self, amount, buy_order, card_expiration_date, cvv, card_number, session_id=None
+        self,
+        amount,
+        buy_order,
+        card_expiration_date,
+        cvv,
+        card_number,
+        session_id=None,
+        deadline=None,
     ):
         transaction_type = self.soap_requestor.get_enum_value(
             "wsCompleteTransactionType", "TR_COMPLETA_WS"
@@ -193,18 +355,60 @@ class CompleteWebpayService(TBKWebService):
             "wsCompleteInitTransactionInput", **transaction_input_arguments
         )
 
-        return self.soap_requestor.request("initCompleteTransaction", transaction_input)
-
-    def queryshare(self, token, buy_order, share_number):
+        response = self.soap_requestor.request(
+            "initCompleteTransaction", transaction_input, deadline=deadline
+        )
+        token = get_field(response.result, ("token",))
+        if token is not None:
+            self._token_expirations.set(token, clock() + self.token_ttl)
+        return response
+
+    def queryshare(self, token, buy_order, share_number, deadline=None):
+        cache = self.queryshare_cache
+        if cache is None:
+            return self._queryshare(token, buy_order, share_number, deadline)
+        # a single entry per token holds every share, it is evicted at once
+        cache_key = self._get_queryshare_key(token)
+        share_key = (str(buy_order), share_number)
+        responses = cache.get(cache_key) or {}
+        response = responses.get(share_key)
+        if response is None:
+            response = self._queryshare(token, buy_order, share_number, deadline)
+            ttl = self._token_expirations.get(token, clock() + self.token_ttl) - clock()
+            if getattr(cache, "ttl", None) is not None:
+                ttl = min(ttl, cache.ttl)
+            if ttl > 0:
+                responses = dict(responses)
+                responses[share_key] = response
+                cache.set(cache_key, responses, ttl)
+        return response
+
+    def _get_queryshare_key(self, token):
+        return (self.commerce.commerce_code, "queryShare", token)
+
+    def _evict_queryshare(self, token):
+        cache = self.queryshare_cache
+        if cache is not None:
+            cache.delete(self._get_queryshare_key(token))
+
+    def _queryshare(self, token, buy_order, share_number, deadline):
         arguments = {"token": token, "buyOrder": buy_order, "shareNumber": share_number}
         queryshare_input = self.soap_requestor.create_object(
             "wsCompleteQueryShareInput", **arguments
         )
 
-        return self.soap_requestor.request("queryShare", queryshare_input)
+        return self.soap_requestor.request(
+            "queryShare", queryshare_input, deadline=deadline
+        )
 
     def authorize(
-        self, token, buy_order, grace_period, id_query_share, deferred_period_index
+        self,
+        token,
+        buy_order,
+        grace_period,
+        id_query_share,
+        deferred_period_index,
+        deadline=None,
     ):
         query_share_input_arguments = {
             "idQueryShare": id_query_share,
@@ -229,7 +433,23 @@ class CompleteWebpayService(TBKWebService):
             "authorize", **authorize_arguments
         )
 
-        return self.soap_requestor.request("authorize", authorize_input)
+        # the shares were chosen, they are not queried again for this token
+        self._evict_queryshare(token)
+        return self.soap_requestor.request(
+            "authorize", authorize_input, deadline=deadline
+        )
+
+    def acknowledge_transaction(self, token, deadline=None):
+        self._evict_queryshare(token)
+        return self.soap_requestor.request(
+            "acknowledgeTransaction", token, deadline=deadline
+        )
+
 
-    def acknowledge_transaction(self, token):
-        return self.soap_requestor.request("acknowledgeTransaction", token)
+# services by the names used in specs and the command line
+SERVICES = {
+    "webpay": WebpayService,
+    "oneclick": OneClickPaymentService,
+    "commerce_integration": CommerceIntegrationService,
+    "complete_webpay": CompleteWebpayService,
+}
@@ -4,7 +4,9 @@ from .zeep_client import ZeepSoapClient
 default_client_class = ZeepSoapClient
 
 
-def create_soap_requestor(wsdl_url, commerce, client_class=None, **client_kwargs):
+def create_soap_requestor(
+    wsdl_url, commerce, client_class=None, requestor_kwargs=None, **client_kwargs
+):
     soap_client_class = default_client_class if client_class is None else client_class
     soap_client = soap_client_class(
         wsdl_url=wsdl_url,
@@ -14,4 +16,9 @@ def create_soap_requestor(wsdl_url, commerce, client_class=None, **client_kwargs
         password=commerce.key_password,
         **client_kwargs
     )
-    return SoapRequestor(soap_client)
+    credentials_watcher = getattr(commerce, "credentials_watcher", None)
+    if credentials_watcher is not None:
+        credentials_watcher.subscribe(soap_client)
+    requestor_kwargs = dict(requestor_kwargs or {})
+    requestor_kwargs.setdefault("commerce_code", commerce.commerce_code)
+    return SoapRequestor(soap_client, **requestor_kwargs)
@@ -0,0 +1,125 @@
+import threading
+
+LOW = 0
+NORMAL = 1
+CRITICAL = 2
+
+
+class _Waiter(object):
+    __slots__ = ("method_name", "priority", "sequence", "event", "admitted")
+
+    def __init__(self, method_name, priority, sequence):
+        self.method_name = method_name
+        self.priority = priority
+        self.sequence = sequence
+        self.event = threading.Event()
+        self.admitted = False
+
+    def sort_key(self):
+        return -self.priority, self.sequence
+
+
+class AdmissionController(object):
+    """Concurrency limits for the requests of a ``SoapRequestor``.
+
+    At most ``limit`` requests run at a time, and at most ``limits[method]``
+    of a given operation. Up to ``queue_size`` requests wait for a free slot,
+    admitted by priority and then in arrival order; a request arriving with
+    the queue full takes the place of the lowest priority waiter, which is
+    rejected, or is rejected itself. ``priorities`` maps operations to their
+    default priority, ``NORMAL`` if missing::
+
+        >>> admission = AdmissionController(
+        ...     limit=32, queue_size=64, priorities={"getTransactionResult": CRITICAL}
+        ... )
+    """
+
+    def __init__(self, limit=None, limits=None, queue_size=0, priorities=None):
+        self.limit = limit
+        self.limits = dict(limits or {})
+        self.queue_size = queue_size
+        self.priorities = dict(priorities or {})
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.shed = 0
+        self.timed_out = 0
+        self._running_by_method = {}
+        self._waiters = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def get_priority(self, method_name, priority=None):
+        if priority is not None:
+            return priority
+        return self.priorities.get(method_name, NORMAL)
+
+    def acquire(self, method_name, priority=None, timeout=None):
+        """Wait up to ``timeout`` seconds for a slot, return whether one was got.
+
+        Every successful ``acquire`` must be followed by a ``release``.
+        """
+        priority = self.get_priority(method_name, priority)
+        with self._lock:
+            if self._has_room(method_name):
+                self._admit(method_name)
+                return True
+            if timeout is not None and timeout <= 0:
+                self.rejected += 1
+                return False
+            if len(self._waiters) >= self.queue_size:
+                lowest = self._waiters and max(self._waiters, key=_Waiter.sort_key)
+                if not lowest or lowest.priority >= priority:
+                    self.rejected += 1
+                    return False
+                self._waiters.remove(lowest)
+                self.shed += 1
+                lowest.event.set()
+            self._sequence += 1
+            waiter = _Waiter(method_name, priority, self._sequence)
+            self._waiters.append(waiter)
+        waiter.event.wait(timeout)
+        with self._lock:
+            if waiter.admitted:
+                return True
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self.timed_out += 1
+            return False
+
+    def release(self, method_name):
+        with self._lock:
+            self.running -= 1
+            self._running_by_method[method_name] -= 1
+            for waiter in sorted(self._waiters, key=_Waiter.sort_key):
+                if self._has_room(waiter.method_name):
+                    self._waiters.remove(waiter)
+                    self._admit(waiter.method_name)
+                    waiter.admitted = True
+                    waiter.event.set()
+
+    def _has_room(self, method_name):
+        if self.limit is not None and self.running >= self.limit:
+            return False
+        method_limit = self.limits.get(method_name)
+        return (
+            method_limit is None
+            or self._running_by_method.get(method_name, 0) < method_limit
+        )
+
+    def _admit(self, method_name):
+        self.running += 1
+        self.admitted += 1
+        self._running_by_method[method_name] = (
+            self._running_by_method.get(method_name, 0) + 1
+        )
+
+    def stats(self):
+        return {
+            "running": self.running,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+        }
@@ -0,0 +1,245 @@
+"""
+Append-only archive of the SOAP envelopes exchanged with TBK.
+
+Responses, including those of failed requests, are handed to a background
+writer thread as they are. Envelopes are only redacted and encoded when they
+reach the writer, so the request thread never pays for parsing,
+serialization, compression or disk access, and card data never reaches the
+disk.
+"""
+
+import datetime
+import gzip
+import json
+import logging
+import os
+import threading
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    import Queue as queue
+
+from .redaction import Redactor
+from .utils import get_response_identifiers
+
+_STOP = object()
+
+
+class EnvelopeAuditLog(object):
+    """Write every recorded response to rotated gzip files.
+
+    Records are stored one per line as JSON inside
+    ``<prefix>-<timestamp>-<pid>-<n>.jsonl.gz`` files, a new file is started
+    once ``max_bytes`` (uncompressed) have been written to the current one.
+    Every record also appends a line to ``<prefix>.index`` so envelopes can be
+    found by buy order or token without decompressing the archive.
+
+    ``record`` never blocks longer than ``full_timeout`` seconds: when the
+    queue is still full after that the response is dropped and counted in
+    ``dropped``. **With the default ``full_timeout=0`` responses are dropped
+    as soon as the queue is full**, set a timeout to apply backpressure
+    instead and watch ``stats()["dropped"]`` either way.
+
+    Envelopes are archived as redacted by ``redactor`` (by default the card
+    data and OneClick user token fields are masked).
+    """
+
+    def __init__(
+        self,
+        directory,
+        prefix="envelopes",
+        max_bytes=64 * 1024 * 1024,
+        max_queue_size=10000,
+        full_timeout=0,
+        compress_level=6,
+        redactor=None,
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.full_timeout = full_timeout
+        self.compress_level = compress_level
+        self.redactor = redactor or Redactor()
+        self.logger = logging.getLogger("tbk.soap.audit")
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._file = None
+        self._file_name = None
+        self._file_bytes = 0
+        self._file_lines = 0
+        self._file_count = 0
+        self._index = None
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._thread = threading.Thread(target=self._run, name="tbk-envelope-audit-log")
+        self._thread.daemon = True
+        self._thread.start()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, "{}.index".format(self.prefix))
+
+    @property
+    def queue_size(self):
+        return self._queue.qsize()
+
+    def record(self, response, error=None):
+        """Queue ``response`` and the ``error`` of its request if it failed.
+
+        Return whether it was queued.
+        """
+        entry = (response, error)
+        try:
+            if self.full_timeout:
+                self._queue.put(entry, timeout=self.full_timeout)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            self.logger.error(
+                "Audit queue full, envelopes for `%s` were not archived",
+                response.request.method_name,
+            )
+            return False
+        with self._lock:
+            self.recorded += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "written": self.written,
+                "queued": self.queue_size,
+            }
+
+    def close(self, timeout=None):
+        """Stop the writer once every queued response has been written."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def lookup(self, buy_order=None, token=None):
+        """Yield the records matching the given buy order and/or token."""
+        if buy_order is None and token is None:
+            raise ValueError("buy_order or token is required")
+        buy_order = None if buy_order is None else str(buy_order)
+        matches = {}
+        with open(self.index_path, "r") as index:
+            for line in index:
+                record_buy_order, record_token, file_name, line_number = line.rstrip(
+                    "\n"
+                ).split("\t")
+                if buy_order is not None and buy_order != record_buy_order:
+                    continue
+                if token is not None and token != record_token:
+                    continue
+                matches.setdefault(file_name, set()).add(int(line_number))
+        for file_name in sorted(matches):
+            for line_number, line in _read_lines(
+                os.path.join(self.directory, file_name)
+            ):
+                if line_number in matches[file_name]:
+                    yield json.loads(line.decode("utf-8"))
+
+    def _run(self):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [entry for entry in batch if entry is not _STOP]
+            try:
+                self._write(batch)
+            except Exception:
+                self.logger.exception("Cannot archive %d envelopes", len(batch))
+        self._close_files()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        for response, error in batch:
+            buy_order, token = get_response_identifiers(response)
+            line = (
+                json.dumps(
+                    {
+                        "timestamp": datetime.datetime.utcnow().isoformat(),
+                        "method": response.request.method_name,
+                        "buy_order": buy_order,
+                        "token": token,
+                        "error": None if error is None else repr(error),
+                        "envelope_sent": self.redactor.redact_xml(
+                            response.raw_envelope_sent
+                        ),
+                        "envelope_received": self.redactor.redact_xml(
+                            response.raw_envelope_received
+                        ),
+                    },
+                    default=str,
+                )
+                + "\n"
+            ).encode("utf-8")
+            if self._file is None or self._file_bytes >= self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._index.write(
+                "{}\t{}\t{}\t{}\n".format(
+                    "" if buy_order is None else buy_order,
+                    "" if token is None else token,
+                    self._file_name,
+                    self._file_lines,
+                )
+            )
+            self._file_bytes += len(line)
+            self._file_lines += 1
+            with self._lock:
+                self.written += 1
+        self._file.flush()
+        self._index.flush()
+
+    def _rotate(self):
+        self._close_files()
+        self._file_count += 1
+        self._file_name = "{}-{}-{}-{}.jsonl.gz".format(
+            self.prefix,
+            datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S"),
+            os.getpid(),
+            self._file_count,
+        )
+        self._file = gzip.open(
+            os.path.join(self.directory, self._file_name),
+            "ab",
+            compresslevel=self.compress_level,
+        )
+        self._index = open(self.index_path, "a")
+        self._file_bytes = 0
+        self._file_lines = 0
+
+    def _close_files(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+
+def _read_lines(path):
+    with gzip.open(path, "rb") as archive:
+        try:
+            for line_number, line in enumerate(archive):
+                yield line_number, line
+        except EOFError:
+            # the file is still being written and has no gzip trailer yet
+            pass
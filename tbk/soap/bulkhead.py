@@ -0,0 +1,139 @@
+import threading
+
+from .deadline import clock
+
+
+class _Compartment(object):
+    def __init__(self):
+        self.in_flight = 0
+        self.waiting = 0
+        self.last_seen = None
+        self.admitted = 0
+        self.borrowed = 0
+        self.rejected = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def stats(self):
+        requests = self.admitted + self.rejected
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "borrowed": self.borrowed,
+            "rejected": self.rejected,
+            "waited": self.waited,
+            "total_wait": self.total_wait,
+            "max_wait": self.max_wait,
+            # fraction of requests which found the compartment full
+            "saturation": (
+                (self.waited + self.rejected) / float(requests) if requests else 0.0
+            ),
+        }
+
+
+class Bulkheads(object):
+    """Concurrency compartments per commerce sharing a ``capacity``.
+
+    Every commerce is guaranteed ``share`` concurrent requests (``shares``
+    overrides it per commerce code) and may run up to ``limit`` by borrowing
+    idle capacity: slots are only lent while enough remain free for the unused
+    shares of the other active commerces, those with requests in the last
+    ``idle_after`` seconds. A burst of one commerce can only make an idle one
+    wait for the first released slot, from then on its share is kept. Pass the
+    same instance to the requestors of every commerce::
+
+        >>> bulkheads = Bulkheads(capacity=64, share=8, limit=32)
+        >>> requestor_kwargs = {"bulkheads": bulkheads}
+
+    Only concurrency is partitioned, connection pools are not: each
+    requestor keeps its own pool, whose ``pool_maxsize`` should be ``limit``.
+    """
+
+    def __init__(self, capacity, share=1, limit=None, shares=None, idle_after=60):
+        self.capacity = capacity
+        self.share = share
+        self.limit = capacity if limit is None else limit
+        self.shares = dict(shares or {})
+        self.idle_after = idle_after
+        self.in_flight = 0
+        self.compartments = {}
+        self._condition = threading.Condition()
+
+    def get_share(self, commerce_code):
+        return self.shares.get(commerce_code, self.share)
+
+    def acquire(self, commerce_code, timeout=None):
+        """Wait up to ``timeout`` seconds for a slot, return whether one was got.
+
+        Every successful ``acquire`` must be followed by a ``release``.
+        """
+        started = clock()
+        with self._condition:
+            compartment = self.compartments.get(commerce_code)
+            if compartment is None:
+                compartment = self.compartments[commerce_code] = _Compartment()
+            compartment.last_seen = started
+            admission = self._get_admission(commerce_code, compartment, started)
+            if admission is None:
+                if timeout is not None and timeout <= 0:
+                    compartment.rejected += 1
+                    return False
+                compartment.waiting += 1
+                try:
+                    while admission is None:
+                        remaining = None
+                        if timeout is not None:
+                            remaining = started + timeout - clock()
+                            if remaining <= 0:
+                                compartment.rejected += 1
+                                return False
+                        self._condition.wait(remaining)
+                        admission = self._get_admission(
+                            commerce_code, compartment, clock()
+                        )
+                finally:
+                    compartment.waiting -= 1
+                wait = clock() - started
+                compartment.waited += 1
+                compartment.total_wait += wait
+                compartment.max_wait = max(compartment.max_wait, wait)
+            self.in_flight += 1
+            compartment.in_flight += 1
+            compartment.admitted += 1
+            if admission == "borrowed":
+                compartment.borrowed += 1
+            return True
+
+    def release(self, commerce_code):
+        with self._condition:
+            compartment = self.compartments[commerce_code]
+            compartment.in_flight -= 1
+            compartment.last_seen = clock()
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def _get_admission(self, commerce_code, compartment, now):
+        if self.in_flight >= self.capacity:
+            return None
+        if compartment.in_flight < self.get_share(commerce_code):
+            return "share"
+        if compartment.in_flight >= self.limit:
+            return None
+        reserved = 0
+        for other_code, other in self.compartments.items():
+            if other_code == commerce_code:
+                continue
+            if other.waiting or now - other.last_seen < self.idle_after:
+                reserved += max(0, self.get_share(other_code) - other.in_flight)
+        if self.capacity - self.in_flight > reserved:
+            return "borrowed"
+        return None
+
+    def stats(self):
+        with self._condition:
+            return {
+                commerce_code: compartment.stats()
+                for commerce_code, compartment in self.compartments.items()
+            }
@@ -0,0 +1,145 @@
+"""
+Record SOAP exchanges to a cassette file and replay them offline.
+
+    >>> cassette = Cassette("webpay.jsonl", mode="record")
+    >>> webpay = WebpayService(commerce, http_backend=cassette.transport)
+    ...
+    >>> cassette = Cassette("webpay.jsonl", latency=1.0)
+    >>> webpay = WebpayService(commerce, http_backend=cassette.transport)
+
+Only the posted envelopes go through the cassette, envelopes are still signed
+and the recorded responses verified, so replays run the whole library stack.
+Requests are matched by address, SOAP action and body, ignoring the signature
+and the ids that change on every request; identical requests replay their
+recorded responses in order, starting over when they run out. Replays are
+instant unless ``latency`` is given, a factor applied to the recorded times.
+
+WSDL documents are not recorded: for offline runs use ``StaticSoapClient``,
+a local WSDL file or a ``wsdl_cache``.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+import threading
+import time
+
+from lxml import etree
+from requests import RequestException
+
+from .deadline import clock
+from .transports import HttpResponse, RequestsTransport
+from .wsse import SOAP_NS
+
+
+class CassetteMiss(Exception):
+    """No recorded exchange matches a request."""
+
+    def __init__(self, address, action):
+        super(CassetteMiss, self).__init__(
+            "No recorded response for {} {}".format(address, action)
+        )
+        self.address = address
+        self.action = action
+
+
+class Cassette(object):
+    def __init__(self, path, mode="replay", latency=None):
+        if mode not in ("record", "replay"):
+            raise ValueError("Invalid cassette mode {}".format(mode))
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.interactions = {}
+        self._positions = {}
+        self._lock = threading.Lock()
+        if mode == "record":
+            io.open(path, "w", encoding="utf-8").close()
+        else:
+            self.load()
+
+    @property
+    def recording(self):
+        return self.mode == "record"
+
+    def load(self):
+        with io.open(self.path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self.interactions.setdefault(interaction["key"], []).append(
+                        interaction
+                    )
+
+    def record(self, key, address, action, response, elapsed):
+        interaction = {
+            "key": key,
+            "address": address,
+            "action": action,
+            "status": response.status_code,
+            "headers": dict(response.headers),
+            # latin-1 maps every byte, whatever the encoding of the envelope
+            "content": response.content.decode("latin-1"),
+            "elapsed": elapsed,
+        }
+        line = json.dumps(interaction, sort_keys=True)
+        with self._lock:
+            self.interactions.setdefault(key, []).append(interaction)
+            with io.open(self.path, "a", encoding="utf-8") as file:
+                file.write("{}\n".format(line))
+
+    def play(self, key, address, action):
+        with self._lock:
+            interactions = self.interactions.get(key)
+            if not interactions:
+                raise CassetteMiss(address, action)
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return interactions[position % len(interactions)]
+
+    def transport(self, **kwargs):
+        """Create a ``CassetteTransport``, usable as ``http_backend``."""
+        return CassetteTransport(self, **kwargs)
+
+
+def get_request_key(address, action, message):
+    """Return what identifies a request regardless of its signature."""
+    envelope = etree.fromstring(message)
+    body = envelope.find("{%s}Body" % SOAP_NS)
+    digest = hashlib.sha1()
+    digest.update("{} {}".format(address, action).encode("utf-8"))
+    for child in body if body is not None else ():
+        digest.update(etree.tostring(child, method="c14n", exclusive=True))
+    return digest.hexdigest()
+
+
+class CassetteTransport(RequestsTransport):
+
+    errors = (RequestException, CassetteMiss)
+
+    def __init__(self, cassette, **kwargs):
+        super(CassetteTransport, self).__init__(**kwargs)
+        self.cassette = cassette
+
+    def post(self, address, message, headers):
+        action = headers.get("SOAPAction")
+        key = get_request_key(address, action, message)
+        if self.cassette.recording:
+            started = clock()
+            response = super(CassetteTransport, self).post(address, message, headers)
+            self.cassette.record(key, address, action, response, clock() - started)
+            return response
+        interaction = self.cassette.play(key, address, action)
+        if self.cassette.latency:
+            time.sleep(interaction["elapsed"] * self.cassette.latency)
+        return HttpResponse(
+            interaction["status"],
+            interaction["headers"],
+            interaction["content"].encode("latin-1"),
+        )
+
+    def ping(self, address, timeout=10):
+        if self.cassette.recording:
+            return super(CassetteTransport, self).ping(address, timeout)
@@ -0,0 +1,191 @@
+"""
+Compile a WSDL into a schema module for ``StaticSoapClient``::
+
+    $ python -m tbk.soap.codegen \\
+        "https://webpay3g.transbank.cl/WSWebpayTransaction/cxf/WSWebpayService?wsdl" \\
+        tbk/soap/schemas/webpay.py
+
+zeep is only needed to run the generator. The module declares a
+``ComplexObject`` subclass per complex type used by the SOAP binding, the
+enumerations of the schema and the operations with their soap actions.
+"""
+
+import argparse
+import collections
+import json
+import sys
+
+import zeep
+from lxml import etree
+from zeep.xsd import ComplexType
+
+XSD_NS = "http://www.w3.org/2001/XMLSchema"
+
+# generated modules are formatted as black would
+MAX_LINE_LENGTH = 88
+
+HEADER = '''"""
+Generated by ``python -m tbk.soap.codegen`` from {source}, do not edit.
+"""
+
+from ..static_client import ComplexObject, Field, Operation
+
+TARGET_NAMESPACE = {namespace}
+ADDRESS = {address}
+'''
+
+
+def quote(value):
+    return json.dumps(value)
+
+
+def get_type_name(xsd_type, default=None):
+    if isinstance(xsd_type, ComplexType):
+        return xsd_type.name or default
+    # restrictions of builtin types are parsed as their base type
+    qname = getattr(type(xsd_type), "_default_qname", None) or xsd_type.qname
+    return etree.QName(qname).localname
+
+
+def collect_types(xsd_type, name, types):
+    if name in types:
+        return
+    types[name] = xsd_type
+    for element_name, element in xsd_type.elements:
+        if isinstance(element.type, ComplexType):
+            collect_types(
+                element.type, get_type_name(element.type, element_name), types
+            )
+
+
+def get_enumerations(document):
+    enumerations = collections.OrderedDict()
+    for simple_type in document.iterfind(".//{%s}simpleType[@name]" % XSD_NS):
+        values = [
+            enumeration.get("value")
+            for enumeration in simple_type.iterfind(
+                "{%s}restriction/{%s}enumeration" % (XSD_NS, XSD_NS)
+            )
+        ]
+        if values:
+            enumerations[simple_type.get("name")] = values
+    return enumerations
+
+
+def render_type(name, xsd_type):
+    lines = ["", "", "class {}(ComplexObject):".format(name)]
+    fields = []
+    for element_name, element in xsd_type.elements:
+        arguments = [
+            quote(element_name),
+            quote(get_type_name(element.type, element_name)),
+        ]
+        if element.max_occurs == "unbounded" or element.max_occurs > 1:
+            arguments.append("many=True")
+        if not element.min_occurs:
+            arguments.append("required=False")
+        fields.append((element_name, "Field({})".format(", ".join(arguments))))
+    if not fields:
+        lines.extend(["    __slots__ = ()", "    FIELDS = ()"])
+        return lines
+    if len(fields) == 1:
+        slots = "    __slots__ = ({},)".format(quote(fields[0][0]))
+        field = "    FIELDS = ({},)".format(fields[0][1])
+        if len(field) <= MAX_LINE_LENGTH:
+            lines.extend([slots, field])
+            return lines
+    lines.append("    __slots__ = (")
+    lines.extend("        {},".format(quote(field_name)) for field_name, _ in fields)
+    lines.extend(["    )", "    FIELDS = ("])
+    lines.extend("        {},".format(field) for _, field in fields)
+    lines.append("    )")
+    return lines
+
+
+def generate(wsdl_url, source=None):
+    """Return the source code of the schema module for ``wsdl_url``."""
+    client = zeep.Client(wsdl_url)
+    binding = next(iter(client.wsdl.bindings.values()))
+    service = next(iter(client.wsdl.services.values()))
+    port = next(iter(service.ports.values()))
+    namespace = binding.name.namespace
+
+    types = collections.OrderedDict()
+    operations = []
+    for name, operation in sorted(binding._operations.items()):
+        input_type = get_type_name(operation.input.body.type, operation.input.body.name)
+        output_type = get_type_name(
+            operation.output.body.type, operation.output.body.name
+        )
+        collect_types(operation.input.body.type, input_type, types)
+        collect_types(operation.output.body.type, output_type, types)
+        operations.append(
+            (
+                name,
+                operation.soapaction or "",
+                operation.input.body.name,
+                input_type,
+                operation.output.body.name,
+                output_type,
+            )
+        )
+
+    lines = HEADER.format(
+        source=source or wsdl_url,
+        namespace=quote(namespace),
+        address=quote(port.binding_options["address"]),
+    ).splitlines()
+    for name, xsd_type in types.items():
+        lines.extend(render_type(name, xsd_type))
+
+    lines.extend(["", "", "TYPES = {"])
+    lines.extend("    {}: {},".format(quote(name), name) for name in types)
+    lines.extend(["}", "", "ENUMS = {"])
+    document = etree.fromstring(client.transport.load(wsdl_url))
+    for name, values in get_enumerations(document).items():
+        lines.append("    {}: (".format(quote(name)))
+        lines.extend("        {},".format(quote(value)) for value in values)
+        lines.append("    ),")
+    lines.extend(["}", "", "OPERATIONS = {"])
+    for operation in operations:
+        lines.append("    {}: Operation(".format(quote(operation[0])))
+        lines.extend(
+            "        {},".format(value)
+            for value in (
+                quote(operation[0]),
+                quote(operation[1]),
+                quote(operation[2]),
+                operation[3],
+                quote(operation[4]),
+                operation[5],
+            )
+        )
+        lines.append("    ),")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m tbk.soap.codegen",
+        description="Generate a StaticSoapClient schema module from a WSDL.",
+    )
+    parser.add_argument("wsdl_url")
+    parser.add_argument(
+        "output",
+        nargs="?",
+        type=argparse.FileType("w"),
+        default=sys.stdout,
+        help="python module to write (default: stdout)",
+    )
+    parser.add_argument(
+        "--source", help="WSDL name written in the module docstring (default: url)"
+    )
+    args = parser.parse_args(argv)
+    args.output.write(generate(args.wsdl_url, source=args.source))
+    args.output.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import time
+
+try:
+    clock = time.monotonic
+except AttributeError:  # pragma: no cover
+    clock = time.time
+
+
+class Deadline(object):
+    """Time budget shared by every request of a multi-call flow.
+
+    Pass the same instance to each service call, the timeouts of every request
+    are taken from whatever is left of the budget::
+
+        >>> deadline = Deadline(20)
+        >>> result = webpay.get_transaction_result(token, deadline=deadline)
+        >>> webpay.acknowledge_transaction(token, deadline=deadline)
+    """
+
+    def __init__(self, budget, connect_timeout=None):
+        self.budget = budget
+        self.connect_timeout = connect_timeout
+        self.expires_at = clock() + budget
+
+    def remaining(self):
+        return max(0.0, self.expires_at - clock())
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
+
+    def get_timeout(self, timeout=None):
+        """Return the ``(connect, read)`` timeouts for the next request.
+
+        ``timeout`` is an upper bound for both values, it usually comes from
+        a per call timeout.
+        """
+        read_timeout = self.remaining()
+        if timeout is not None:
+            read_timeout = min(read_timeout, timeout)
+        connect_timeout = read_timeout
+        if self.connect_timeout is not None:
+            connect_timeout = min(connect_timeout, self.connect_timeout)
+        return connect_timeout, read_timeout
+
+    def __repr__(self):
+        return "<Deadline remaining={:.3f}s of {}s>".format(
+            self.remaining(), self.budget
+        )
@@ -4,6 +4,9 @@ class SoapRequestException(Exception):
         self.request = request
         super(SoapRequestException, self).__init__(error)
 
+    def __reduce__(self):
+        return self.__class__, (self.error, self.request)
+
 
 class SoapServerException(Exception):
     def __init__(self, error, code, request):
@@ -12,6 +15,9 @@ class SoapServerException(Exception):
         self.code = code
         self.request = request
 
+    def __reduce__(self):
+        return self.__class__, (self.error, self.code, self.request)
+
 
 class SoapClientException(Exception):
     pass
@@ -33,3 +39,15 @@ class InvalidSignatureResponse(SoapClientException):
     def __init__(self, envelope):
         super(InvalidSignatureResponse, self).__init__(envelope)
         self.envelope = envelope
+
+
+class DeadlineExceeded(SoapRequestException):
+    pass
+
+
+class AdmissionRejected(SoapRequestException):
+    pass
+
+
+class RequestorClosed(SoapRequestException):
+    pass
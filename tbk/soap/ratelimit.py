@@ -0,0 +1,131 @@
+import threading
+import time
+
+from .deadline import clock
+
+
+class TokenBucket(object):
+    """Token bucket refilled at ``rate`` tokens per second up to ``capacity``.
+
+    Tokens are reserved in arrival order, a caller that finds the bucket empty
+    books the next free token and sleeps until it is due, so waiting callers
+    are served first come first served without busy waiting.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1, rate))
+        self.acquired = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, timeout=None):
+        """Book a token and return the seconds to wait before using it.
+
+        Return ``None`` without booking anything when the wait would be longer
+        than ``timeout``.
+        """
+        with self._lock:
+            now = clock()
+            tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            wait = max(0.0, (1 - tokens) / self.rate)
+            if timeout is not None and wait > timeout:
+                self._tokens = tokens
+                self.rejected += 1
+                return None
+            self._tokens = tokens - 1
+            self.acquired += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self, timeout=None):
+        wait = self.reserve(timeout)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    def acquire_async(self, timeout=None):
+        """Awaitable version of ``acquire``, it never blocks the event loop."""
+        import asyncio
+
+        wait = self.reserve(timeout)
+        return asyncio.sleep(wait or 0, result=wait is not None)
+
+    def stats(self):
+        return {
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "total_wait": self.total_wait,
+            "max_wait": self.max_wait,
+            "mean_wait": self.total_wait / self.acquired if self.acquired else 0.0,
+        }
+
+
+class RateLimiter(object):
+    """Token buckets per commerce code and operation.
+
+    ``rates`` maps ``(commerce_code, method_name)`` to a rate or a
+    ``(rate, capacity)`` pair, any of both may be ``None`` to match every
+    commerce or every operation. The most specific entry is used and every key
+    gets its own bucket, ``rate`` and ``capacity`` are the default applied to
+    each commerce as a whole::
+
+        >>> limiter = RateLimiter(rate=20, rates={(None, "authorize"): 5})
+    """
+
+    def __init__(self, rate=None, capacity=None, rates=None):
+        self.rates = dict(rates or {})
+        if rate is not None:
+            self.rates.setdefault((None, None), (rate, capacity))
+        self.buckets = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, commerce_code, method_name):
+        for config_key in (
+            (commerce_code, method_name),
+            (commerce_code, None),
+            (None, method_name),
+            (None, None),
+        ):
+            if config_key in self.rates:
+                break
+        else:
+            return None
+        bucket_key = (
+            commerce_code if config_key[0] is None else config_key[0],
+            config_key[1],
+        )
+        with self._lock:
+            bucket = self.buckets.get(bucket_key)
+            if bucket is None:
+                rate = self.rates[config_key]
+                rate, capacity = rate if isinstance(rate, tuple) else (rate, None)
+                bucket = self.buckets[bucket_key] = TokenBucket(rate, capacity)
+            return bucket
+
+    def acquire(self, commerce_code, method_name, timeout=None):
+        bucket = self.get_bucket(commerce_code, method_name)
+        return True if bucket is None else bucket.acquire(timeout)
+
+    def acquire_async(self, commerce_code, method_name, timeout=None):
+        import asyncio
+
+        bucket = self.get_bucket(commerce_code, method_name)
+        if bucket is None:
+            return asyncio.sleep(0, result=True)
+        return bucket.acquire_async(timeout)
+
+    def stats(self):
+        return {key: bucket.stats() for key, bucket in self.buckets.items()}
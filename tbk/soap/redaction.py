@@ -0,0 +1,176 @@
+"""
+Redacted and lazily rendered log records of requests and responses.
+
+``SoapRequestor`` logs ``RedactedRequest`` and ``RedactedResponse`` records at
+debug level: nothing is redacted nor formatted unless a handler emits them,
+and ``as_dict()`` gives structured handlers the redacted fields. Only the
+fraction of requests chosen by its ``LogSampler`` is logged.
+
+zeep logs the raw HTTP bodies it posts and receives at debug level, the
+requestor adds a ``RedactingFilter`` to those loggers.
+"""
+
+import json
+import logging
+import random
+
+from lxml import etree
+
+from .utils import string_types
+
+# card data sent by CompleteWebpay and the OneClick card token
+SENSITIVE_FIELDS = frozenset(["cardNumber", "cardExpirationDate", "cvv", "tbkUser"])
+
+MASK = "********"
+
+# loggers of zeep emitting the raw envelopes
+RAW_ENVELOPE_LOGGERS = ("zeep.transports",)
+
+
+class Redactor(object):
+    """Mask the values of ``fields`` in arguments, results and envelopes."""
+
+    def __init__(self, fields=SENSITIVE_FIELDS, mask=MASK):
+        self.fields = frozenset(fields)
+        self.mask = mask
+
+    def redact(self, value):
+        """Return a copy of ``value`` made of dicts, lists and scalars."""
+        values = get_values(value)
+        if values is not None:
+            return dict(
+                (key, self.mask if key in self.fields else self.redact(item))
+                for key, item in values
+            )
+        if isinstance(value, (list, tuple)):
+            return [self.redact(item) for item in value]
+        return value
+
+    def redact_xml(self, envelope):
+        """Return ``envelope`` (bytes, text or element) as redacted text."""
+        if envelope is None:
+            return None
+        if isinstance(envelope, string_types + (bytes,)):
+            if isinstance(envelope, bytes):
+                text = envelope
+            else:
+                text = envelope.encode("utf-8")
+            try:
+                tree = etree.fromstring(
+                    text, parser=etree.XMLParser(resolve_entities=False)
+                )
+            except etree.XMLSyntaxError:
+                return "<invalid xml>"
+        else:
+            tree = etree.fromstring(etree.tostring(envelope))
+        for element in tree.iter():
+            if (
+                isinstance(element.tag, string_types)
+                and etree.QName(element).localname in self.fields
+            ):
+                element.text = self.mask
+        return etree.tostring(tree).decode("utf-8")
+
+
+def get_values(value):
+    """Return the ``(name, value)`` pairs of mappings and SOAP objects."""
+    if isinstance(value, dict):
+        return value.items()
+    fields = getattr(value, "FIELDS", None)  # StaticSoapClient objects
+    if fields is not None:
+        return ((field.name, getattr(value, field.name)) for field in fields)
+    values = getattr(value, "__values__", None)  # zeep objects
+    if isinstance(values, dict):
+        return values.items()
+    return None
+
+
+class RedactingFilter(logging.Filter):
+    """Redact the XML arguments of the records of a logger."""
+
+    def __init__(self, redactor):
+        super(RedactingFilter, self).__init__()
+        self.redactor = redactor
+
+    def filter(self, record):
+        if isinstance(record.args, tuple):
+            record.args = tuple(self._redact(arg) for arg in record.args)
+        return True
+
+    def _redact(self, value):
+        if isinstance(value, bytes):
+            is_xml = value.lstrip().startswith(b"<")
+        else:
+            is_xml = isinstance(value, string_types) and value.lstrip().startswith("<")
+        return self.redactor.redact_xml(value) if is_xml else value
+
+
+def redact_loggers(redactor, names=RAW_ENVELOPE_LOGGERS):
+    """Add a ``RedactingFilter`` of ``redactor`` to the loggers ``names``.
+
+    Loggers already redacting the same fields with the same mask are left as
+    they are, so building many requestors does not pile up filters.
+    """
+    for name in names:
+        logger = logging.getLogger(name)
+        if not any(
+            isinstance(log_filter, RedactingFilter)
+            and log_filter.redactor.fields == redactor.fields
+            and log_filter.redactor.mask == redactor.mask
+            for log_filter in logger.filters
+        ):
+            logger.addFilter(RedactingFilter(redactor))
+
+
+class LogSampler(object):
+    """Choose a ``rate`` fraction of requests to be logged in detail."""
+
+    def __init__(self, rate=1.0):
+        self.rate = rate
+
+    def sample(self):
+        if self.rate >= 1:
+            return True
+        return self.rate > 0 and random.random() < self.rate
+
+
+class RedactedRequest(object):
+    def __init__(self, request, redactor):
+        self.request = request
+        self.redactor = redactor
+        self._data = None
+
+    def as_dict(self):
+        if self._data is None:
+            self._data = {
+                "method": self.request.method_name,
+                "args": self.redactor.redact(self.request.args),
+                "kwargs": self.redactor.redact(self.request.kwargs),
+            }
+        return self._data
+
+    def __str__(self):
+        return json.dumps(self.as_dict(), default=str, sort_keys=True)
+
+
+class RedactedResponse(object):
+    def __init__(self, response, redactor):
+        self.response = response
+        self.redactor = redactor
+        self._data = None
+
+    def as_dict(self):
+        if self._data is None:
+            response = self.response
+            self._data = {
+                "method": response.request.method_name,
+                "result": self.redactor.redact(response.result),
+                "envelope_sent": self.redactor.redact_xml(response.raw_envelope_sent),
+                "envelope_received": self.redactor.redact_xml(
+                    response.raw_envelope_received
+                ),
+            }
+        return self._data
+
+    def __str__(self):
+        return json.dumps(self.as_dict(), default=str, sort_keys=True)
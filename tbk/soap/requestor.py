@@ -1,6 +1,25 @@
 import logging
+import threading
 
-from .exceptions import SoapServerException, SoapClientException
+from ..concurrency import imap
+from .deadline import clock
+from .exceptions import (
+    AdmissionRejected,
+    InvalidSignatureResponse,
+    SoapRequestException,
+    SoapServerException,
+    SoapClientException,
+    DeadlineExceeded,
+    RequestorClosed,
+)
+from .redaction import (
+    LogSampler,
+    RedactedRequest,
+    RedactedResponse,
+    Redactor,
+    redact_loggers,
+)
+from .singleflight import SingleFlight, SingleFlightTimeout
 
 
 class SoapRequest(object):
@@ -28,11 +47,26 @@ class SoapRequest(object):
 
 
 class SoapResponse(object):
+    """Result of a request.
+
+    ``raw_envelope_sent`` and ``raw_envelope_received`` are the exact bytes
+    that went through the wire, ``envelope_sent`` and ``envelope_received``
+    decode them on access.
+    """
+
     def __init__(self, result, request, envelope_sent, envelope_received):
         self.result = result
         self.request = request
-        self.envelope_sent = envelope_sent
-        self.envelope_received = envelope_received
+        self.raw_envelope_sent = envelope_sent
+        self.raw_envelope_received = envelope_received
+
+    @property
+    def envelope_sent(self):
+        return _decode(self.raw_envelope_sent)
+
+    @property
+    def envelope_received(self):
+        return _decode(self.raw_envelope_received)
 
     def __getitem__(self, key):
         return self.result[key]
@@ -41,12 +75,80 @@ class SoapResponse(object):
         return str(self.result)
 
 
+def _decode(envelope):
+    if isinstance(envelope, bytes):
+        return envelope.decode("utf-8")
+    return envelope
+
+
+# errors raised once the request was posted, the failure is worth archiving
+SENT_ERRORS = (SoapServerException, SoapRequestException, InvalidSignatureResponse)
+
+
 class SoapRequestor(object):
-    def __init__(self, soap_client):
+    def __init__(
+        self,
+        soap_client,
+        audit_log=None,
+        idempotent_methods=(),
+        commerce_code=None,
+        rate_limiter=None,
+        redactor=None,
+        log_sampler=None,
+        admission_controller=None,
+        priority=None,
+        transaction_store=None,
+        bulkheads=None,
+    ):
         self.soap_client = soap_client
+        self.audit_log = audit_log
+        self.commerce_code = commerce_code
+        self.rate_limiter = rate_limiter
+        self.admission_controller = admission_controller
+        # default priority of the requests, e.g. LOW for background jobs
+        self.priority = priority
+        self.transaction_store = transaction_store
+        self.bulkheads = bulkheads
+        self.idempotent_methods = frozenset(idempotent_methods)
+        self.single_flight = SingleFlight()
+        self.redactor = redactor or Redactor()
+        redact_loggers(self.redactor)
+        self.log_sampler = log_sampler or LogSampler()
         self.logger = logging.getLogger(
             "tbk.soap.requestor.{}".format(self.__class__.__name__)
         )
+        self.closed = False
+        self._in_flight = {}
+        self._condition = threading.Condition()
+
+    @property
+    def in_flight(self):
+        """Requests sent and not answered yet."""
+        with self._condition:
+            return list(self._in_flight.values())
+
+    def close(self, drain_timeout=None):
+        """Refuse new requests, wait for the ones in flight and close the client.
+
+        Requests arriving after ``close`` raise ``RequestorClosed``. Requests
+        in flight get up to ``drain_timeout`` seconds (no limit by default) to
+        finish; those still running then are cut off when the connections are
+        closed and returned, so their outcome can be checked later.
+        """
+        expires_at = None if drain_timeout is None else clock() + drain_timeout
+        with self._condition:
+            self.closed = True
+            self.logger.info("Closing, %d requests in flight", len(self._in_flight))
+            while self._in_flight:
+                remaining = None if expires_at is None else expires_at - clock()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            cut_off = list(self._in_flight.values())
+        for request in cut_off:
+            self.logger.error("Request to method `%s` cut off", request.method_name)
+        self.soap_client.close()
+        return cut_off
 
     def get_enum_value(self, enum_name, value):
         try:
@@ -62,22 +164,186 @@ class SoapRequestor(object):
             self.logger.error("Cannot create instance of type `%s`", type_name)
             raise
 
+    def warmup(self, connections=1):
+        self.logger.info("Warming up %d connections", connections)
+        return self.soap_client.warmup(connections)
+
     def request(self, method_name, *args, **kwargs):
+        timeout = kwargs.pop("timeout", None)
+        deadline = kwargs.pop("deadline", None)
+        priority = kwargs.pop("priority", self.priority)
+        request = SoapRequest(method_name=method_name, args=args, kwargs=kwargs)
+        if self.closed:
+            self._refuse(request)
+        if deadline is not None:
+            if deadline.expired:
+                self.logger.error("Deadline exceeded for method `%s`", method_name)
+                raise DeadlineExceeded(
+                    "Deadline exceeded before request to `{}`".format(method_name),
+                    request,
+                )
+        if method_name in self.idempotent_methods:
+            # concurrent identical calls share the response of the first one
+            wait_timeout = None if deadline is None else deadline.remaining()
+            try:
+                return self.single_flight.do_within(
+                    str(request),
+                    wait_timeout,
+                    self._admit,
+                    request,
+                    timeout,
+                    deadline,
+                    priority,
+                )
+            except SingleFlightTimeout:
+                self.logger.error(
+                    "Deadline exceeded waiting for shared request to `%s`", method_name
+                )
+                raise DeadlineExceeded(
+                    "Deadline exceeded waiting for shared request to `{}`".format(
+                        method_name
+                    ),
+                    request,
+                )
+        return self._admit(request, timeout, deadline, priority)
+
+    def request_many(
+        self, calls, concurrency=8, ordered=False, deadline=None, request=None
+    ):
+        """Send ``calls`` concurrently over the connection pool of the client.
+
+        Calls are ``(method_name, args)`` or ``(method_name, args, kwargs)``
+        tuples, read lazily. Yield a ``tbk.concurrency.Outcome`` per call with
+        its ``SoapResponse`` or its error, as they complete or in input order
+        when ``ordered`` is true. ``deadline`` applies to every call without
+        its own. The transport ``pool_maxsize`` should be at least
+        ``concurrency``.
+
+        ``request`` replaces ``self.request`` to send the calls, e.g. with
+        the methods of a service.
+        """
+        request = request or self.request
+
+        def send(call):
+            method_name, args = call[0], call[1]
+            kwargs = dict(call[2]) if len(call) > 2 else {}
+            if deadline is not None:
+                kwargs.setdefault("deadline", deadline)
+            return request(method_name, *args, **kwargs)
+
+        return imap(send, calls, concurrency=concurrency, ordered=ordered)
+
+    def _store(self, response):
+        try:
+            self.transaction_store.record(response, self.commerce_code)
+        except Exception:
+            # the request succeeded, losing its local copy is not an error for it
+            self.logger.exception(
+                "Cannot store response of method `%s`", response.request.method_name
+            )
+
+    def _audit_failure(self, request, error):
+        if self.audit_log is None or not isinstance(error, SENT_ERRORS):
+            return
+        # the envelopes of the failed request are still those of this thread
+        response = SoapResponse(
+            result=None,
+            request=request,
+            envelope_sent=self.soap_client.get_last_sent_envelope(),
+            envelope_received=self.soap_client.get_last_received_envelope(),
+        )
+        try:
+            self.audit_log.record(response, error=error)
+        except Exception:
+            self.logger.exception(
+                "Cannot archive failed request to method `%s`", request.method_name
+            )
+
+    def _refuse(self, request):
+        self.logger.error(
+            "Request to method `%s` refused, requestor closed", request.method_name
+        )
+        raise RequestorClosed(
+            "Requestor closed, request to `{}` refused".format(request.method_name),
+            request,
+        )
+
+    def _admit(self, request, timeout, deadline, priority):
+        if self.bulkheads is None:
+            return self._admit_operation(request, timeout, deadline, priority)
+        wait_timeout = None if deadline is None else deadline.remaining()
+        if not self.bulkheads.acquire(self.commerce_code, timeout=wait_timeout):
+            self.logger.error("Bulkhead of commerce %s is full", self.commerce_code)
+            raise AdmissionRejected(
+                "Bulkhead of commerce {} is full".format(self.commerce_code), request
+            )
+        try:
+            return self._admit_operation(request, timeout, deadline, priority)
+        finally:
+            self.bulkheads.release(self.commerce_code)
+
+    def _admit_operation(self, request, timeout, deadline, priority):
+        if self.admission_controller is None:
+            return self._send(request, timeout, deadline)
+        method_name = request.method_name
+        wait_timeout = None if deadline is None else deadline.remaining()
+        if not self.admission_controller.acquire(
+            method_name, priority=priority, timeout=wait_timeout
+        ):
+            self.logger.error("Request to method `%s` not admitted", method_name)
+            raise AdmissionRejected(
+                "Request to `{}` not admitted".format(method_name), request
+            )
+        try:
+            return self._send(request, timeout, deadline)
+        finally:
+            self.admission_controller.release(method_name)
+
+    def _send(self, request, timeout, deadline):
+        method_name = request.method_name
+        if self.rate_limiter is not None:
+            wait_timeout = None if deadline is None else deadline.remaining()
+            if not self.rate_limiter.acquire(
+                self.commerce_code, method_name, timeout=wait_timeout
+            ):
+                self.logger.error(
+                    "Rate limit wait for `%s` exceeds deadline", method_name
+                )
+                raise DeadlineExceeded(
+                    "Rate limit wait for `{}` exceeds deadline".format(method_name),
+                    request,
+                )
+        if deadline is not None:
+            timeout = deadline.get_timeout(timeout)
+            if min(timeout) <= 0:
+                # the budget ran out while waiting for admission or rate limits
+                self.logger.error("Deadline exceeded for method `%s`", method_name)
+                raise DeadlineExceeded(
+                    "Deadline exceeded before request to `{}`".format(method_name),
+                    request,
+                )
+        with self._condition:
+            if self.closed:
+                # closed while waiting for admission, it was not sent yet
+                self._refuse(request)
+            self._in_flight[id(request)] = request
+        detailed = self.logger.isEnabledFor(logging.DEBUG) and self.log_sampler.sample()
         try:
-            timeout = kwargs.pop("timeout", None)
-            request = SoapRequest(method_name=method_name, args=args, kwargs=kwargs)
             self.logger.info("Starting request to method `%s`", method_name)
-            self.logger.debug(request)
+            if detailed:
+                self.logger.debug("Request %s", RedactedRequest(request, self.redactor))
             result, envelope_sent, envelope_received = self.soap_client.request(
                 request, timeout=timeout
             )
-        except SoapServerException:
+        except SoapServerException as error:
             self.logger.exception("SOAP server exception on method `%s`", method_name)
+            self._audit_failure(request, error)
             raise
-        except Exception:
+        except Exception as error:
             self.logger.exception(
                 "SOAP request method `%s` failed with unexpected exception", method_name
             )
+            self._audit_failure(request, error)
             raise
         else:
             response = SoapResponse(
@@ -87,5 +353,16 @@ class SoapRequestor(object):
                 envelope_received=envelope_received,
             )
             self.logger.info("Successful request to method `%s`", method_name)
-            self.logger.debug(response)
+            if detailed:
+                self.logger.debug(
+                    "Response %s", RedactedResponse(response, self.redactor)
+                )
+            if self.audit_log is not None:
+                self.audit_log.record(response)
+            if self.transaction_store is not None:
+                self._store(response)
             return response
+        finally:
+            with self._condition:
+                del self._in_flight[id(request)]
+                self._condition.notify_all()
@@ -0,0 +1,19 @@
+"""
+Schema modules generated by ``tbk.soap.codegen`` for ``StaticSoapClient``.
+
+Regenerate them when Transbank changes a WSDL, and register new ones in
+``SCHEMAS`` by the service name ending the WSDL url path.
+"""
+
+import importlib
+
+SCHEMAS = {"WSWebpayService": "webpay"}
+
+
+def get_schema(wsdl_url):
+    service_name = wsdl_url.split("?", 1)[0].rstrip("/").rsplit("/", 1)[-1]
+    try:
+        module_name = SCHEMAS[service_name]
+    except KeyError:
+        raise ValueError("There is no schema generated for {}".format(wsdl_url))
+    return importlib.import_module("{}.{}".format(__name__, module_name))
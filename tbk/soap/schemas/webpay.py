@@ -0,0 +1,225 @@
+"""
+Generated by ``python -m tbk.soap.codegen`` from WSWebpayService.wsdl, do not edit.
+"""
+
+from ..static_client import ComplexObject, Field, Operation
+
+TARGET_NAMESPACE = "http://service.wswebpay.webpay.transbank.com/"
+ADDRESS = "https://webpay3g.transbank.cl:443/WSWebpayTransaction/cxf/WSWebpayService"
+
+
+class acknowledgeTransaction(ComplexObject):
+    __slots__ = ("tokenInput",)
+    FIELDS = (Field("tokenInput", "string"),)
+
+
+class acknowledgeTransactionResponse(ComplexObject):
+    __slots__ = ()
+    FIELDS = ()
+
+
+class getTransactionResult(ComplexObject):
+    __slots__ = ("tokenInput",)
+    FIELDS = (Field("tokenInput", "string"),)
+
+
+class getTransactionResultResponse(ComplexObject):
+    __slots__ = ("return",)
+    FIELDS = (Field("return", "transactionResultOutput", required=False),)
+
+
+class transactionResultOutput(ComplexObject):
+    __slots__ = (
+        "accountingDate",
+        "buyOrder",
+        "cardDetail",
+        "detailOutput",
+        "sessionId",
+        "transactionDate",
+        "urlRedirection",
+        "VCI",
+    )
+    FIELDS = (
+        Field("accountingDate", "string", required=False),
+        Field("buyOrder", "string", required=False),
+        Field("cardDetail", "cardDetail", required=False),
+        Field("detailOutput", "wsTransactionDetailOutput", many=True, required=False),
+        Field("sessionId", "string", required=False),
+        Field("transactionDate", "dateTime", required=False),
+        Field("urlRedirection", "string", required=False),
+        Field("VCI", "string", required=False),
+    )
+
+
+class cardDetail(ComplexObject):
+    __slots__ = (
+        "cardNumber",
+        "cardExpirationDate",
+    )
+    FIELDS = (
+        Field("cardNumber", "string"),
+        Field("cardExpirationDate", "string"),
+    )
+
+
+class wsTransactionDetailOutput(ComplexObject):
+    __slots__ = (
+        "sharesAmount",
+        "sharesNumber",
+        "amount",
+        "commerceCode",
+        "buyOrder",
+        "authorizationCode",
+        "paymentTypeCode",
+        "responseCode",
+    )
+    FIELDS = (
+        Field("sharesAmount", "decimal", required=False),
+        Field("sharesNumber", "int", required=False),
+        Field("amount", "decimal"),
+        Field("commerceCode", "string"),
+        Field("buyOrder", "string"),
+        Field("authorizationCode", "string", required=False),
+        Field("paymentTypeCode", "string", required=False),
+        Field("responseCode", "int"),
+    )
+
+
+class initTransaction(ComplexObject):
+    __slots__ = ("wsInitTransactionInput",)
+    FIELDS = (Field("wsInitTransactionInput", "wsInitTransactionInput"),)
+
+
+class wsInitTransactionInput(ComplexObject):
+    __slots__ = (
+        "wSTransactionType",
+        "commerceId",
+        "buyOrder",
+        "sessionId",
+        "returnURL",
+        "finalURL",
+        "transactionDetails",
+        "wPMDetail",
+    )
+    FIELDS = (
+        Field("wSTransactionType", "string"),
+        Field("commerceId", "string", required=False),
+        Field("buyOrder", "string", required=False),
+        Field("sessionId", "string", required=False),
+        Field("returnURL", "anyURI"),
+        Field("finalURL", "anyURI"),
+        Field("transactionDetails", "wsTransactionDetail", many=True),
+        Field("wPMDetail", "wpmDetailInput", required=False),
+    )
+
+
+class wsTransactionDetail(ComplexObject):
+    __slots__ = (
+        "sharesAmount",
+        "sharesNumber",
+        "amount",
+        "commerceCode",
+        "buyOrder",
+    )
+    FIELDS = (
+        Field("sharesAmount", "decimal", required=False),
+        Field("sharesNumber", "int", required=False),
+        Field("amount", "decimal"),
+        Field("commerceCode", "string"),
+        Field("buyOrder", "string"),
+    )
+
+
+class wpmDetailInput(ComplexObject):
+    __slots__ = (
+        "serviceId",
+        "cardHolderId",
+        "cardHolderName",
+        "cardHolderLastName1",
+        "cardHolderLastName2",
+        "cardHolderMail",
+        "cellPhoneNumber",
+        "expirationDate",
+        "commerceMail",
+        "ufFlag",
+    )
+    FIELDS = (
+        Field("serviceId", "string"),
+        Field("cardHolderId", "string"),
+        Field("cardHolderName", "string"),
+        Field("cardHolderLastName1", "string"),
+        Field("cardHolderLastName2", "string"),
+        Field("cardHolderMail", "string"),
+        Field("cellPhoneNumber", "string"),
+        Field("expirationDate", "dateTime"),
+        Field("commerceMail", "string"),
+        Field("ufFlag", "boolean"),
+    )
+
+
+class initTransactionResponse(ComplexObject):
+    __slots__ = ("return",)
+    FIELDS = (Field("return", "wsInitTransactionOutput", required=False),)
+
+
+class wsInitTransactionOutput(ComplexObject):
+    __slots__ = (
+        "token",
+        "url",
+    )
+    FIELDS = (
+        Field("token", "string", required=False),
+        Field("url", "string", required=False),
+    )
+
+
+TYPES = {
+    "acknowledgeTransaction": acknowledgeTransaction,
+    "acknowledgeTransactionResponse": acknowledgeTransactionResponse,
+    "getTransactionResult": getTransactionResult,
+    "getTransactionResultResponse": getTransactionResultResponse,
+    "transactionResultOutput": transactionResultOutput,
+    "cardDetail": cardDetail,
+    "wsTransactionDetailOutput": wsTransactionDetailOutput,
+    "initTransaction": initTransaction,
+    "wsInitTransactionInput": wsInitTransactionInput,
+    "wsTransactionDetail": wsTransactionDetail,
+    "wpmDetailInput": wpmDetailInput,
+    "initTransactionResponse": initTransactionResponse,
+    "wsInitTransactionOutput": wsInitTransactionOutput,
+}
+
+ENUMS = {
+    "wsTransactionType": (
+        "TR_NORMAL_WS",
+        "TR_NORMAL_WS_WPM",
+        "TR_MALL_WS",
+    ),
+}
+
+OPERATIONS = {
+    "acknowledgeTransaction": Operation(
+        "acknowledgeTransaction",
+        "",
+        "acknowledgeTransaction",
+        acknowledgeTransaction,
+        "acknowledgeTransactionResponse",
+        acknowledgeTransactionResponse,
+    ),
+    "getTransactionResult": Operation(
+        "getTransactionResult",
+        "",
+        "getTransactionResult",
+        getTransactionResult,
+        "getTransactionResultResponse",
+        getTransactionResultResponse,
+    ),
+    "initTransaction": Operation(
+        "initTransaction",
+        "",
+        "initTransaction",
+        initTransaction,
+        "initTransactionResponse",
+        initTransactionResponse,
+    ),
+}
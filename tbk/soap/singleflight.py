@@ -0,0 +1,64 @@
+import threading
+
+
+class _Call(object):
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.shared = 0
+
+
+class SingleFlightTimeout(Exception):
+    """Raised to callers which gave up waiting for the call in flight."""
+
+
+class SingleFlight(object):
+    """Run a single call per key at a time.
+
+    Callers arriving while a call with the same key is in flight do not call
+    the function again, they wait for the running call and get its result (or
+    its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def __len__(self):
+        return len(self._calls)
+
+    def do(self, key, function, *args, **kwargs):
+        return self.do_within(key, None, function, *args, **kwargs)
+
+    def do_within(self, key, timeout, function, *args, **kwargs):
+        """Like ``do``, waiting at most ``timeout`` seconds for a call in flight.
+
+        Raise ``SingleFlightTimeout`` when it does not finish in time, the call
+        goes on for the caller running it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.shared += 1
+        if not leader:
+            if not call.event.wait(timeout):
+                with self._lock:
+                    call.shared -= 1
+                raise SingleFlightTimeout(key)
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function(*args, **kwargs)
+        except Exception as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
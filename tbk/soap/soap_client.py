@@ -27,3 +27,20 @@ class SoapClient(AbstractBaseClass):
     @abc.abstractmethod
     def request(self, request, timeout=None):
         raise NotImplementedError
+
+    def update_credentials(self, key_data, cert_data, tbk_cert_data, password=None):
+        raise NotImplementedError
+
+    def warmup(self, connections=1):
+        raise NotImplementedError
+
+    def get_last_sent_envelope(self):
+        """Return the envelope last sent by the current thread."""
+        return None
+
+    def get_last_received_envelope(self):
+        """Return the envelope last received by the current thread."""
+        return None
+
+    def close(self):
+        """Close the pooled connections of the client."""
@@ -0,0 +1,362 @@
+"""
+SOAP client running on schema modules generated ahead of time.
+
+``python -m tbk.soap.codegen`` compiles a WSDL into a module of request and
+response classes (see ``tbk.soap.schemas``). ``StaticSoapClient`` builds,
+signs and parses envelopes with them, so no WSDL is downloaded or parsed when
+a client is created::
+
+    >>> webpay = WebpayService(commerce, client_class=StaticSoapClient)
+"""
+
+import collections
+import datetime
+import decimal
+
+import isodate
+from lxml import etree
+
+from .exceptions import (
+    MethodDoesNotExist,
+    SoapRequestException,
+    SoapServerException,
+    TypeDoesNotExist,
+)
+from .schemas import get_schema
+from .soap_client import SoapClient
+from .transports import KeepAlive, get_transport_class
+from .utils import parse_tbk_error_message, string_types
+from .zeep_client import ZeepWsseSignature
+
+SOAP_NS = "http://schemas.xmlsoap.org/soap/envelope/"
+XSI_NS = "http://www.w3.org/2001/XMLSchema-instance"
+
+
+def parse_boolean(text):
+    return text.strip() in ("true", "1")
+
+
+PARSERS = {
+    "boolean": parse_boolean,
+    "byte": int,
+    "date": isodate.parse_date,
+    "dateTime": isodate.parse_datetime,
+    "decimal": decimal.Decimal,
+    "double": float,
+    "float": float,
+    "int": int,
+    "integer": int,
+    "long": int,
+    "short": int,
+}
+
+
+class Field(object):
+    __slots__ = ("name", "type_name", "many", "required")
+
+    def __init__(self, name, type_name, many=False, required=True):
+        self.name = name
+        self.type_name = type_name
+        self.many = many
+        self.required = required
+
+    def __repr__(self):
+        return "Field({!r}, {!r}, many={}, required={})".format(
+            self.name, self.type_name, self.many, self.required
+        )
+
+
+class ComplexObject(object):
+    """Base class of the generated types.
+
+    Values are given positionally in ``FIELDS`` order or by name, missing
+    ones are ``None`` (or an empty list for repeated fields).
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, *args, **kwargs):
+        if len(args) > len(self.FIELDS):
+            raise TypeError(
+                "{}() takes at most {} arguments ({} given)".format(
+                    self.__class__.__name__, len(self.FIELDS), len(args)
+                )
+            )
+        for field, value in zip(self.FIELDS, args):
+            if field.name in kwargs:
+                raise TypeError(
+                    "{}() got multiple values for argument {!r}".format(
+                        self.__class__.__name__, field.name
+                    )
+                )
+            kwargs[field.name] = value
+        for field in self.FIELDS:
+            setattr(
+                self, field.name, kwargs.pop(field.name, [] if field.many else None)
+            )
+        if kwargs:
+            raise TypeError(
+                "{}() got unexpected arguments {}".format(
+                    self.__class__.__name__, ", ".join(sorted(kwargs))
+                )
+            )
+
+    def __getitem__(self, name):
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(
+            self.__class__.__name__,
+            ", ".join(
+                "{}={!r}".format(name, getattr(self, name)) for name in self.__slots__
+            ),
+        )
+
+
+class Operation(object):
+    __slots__ = (
+        "name",
+        "soap_action",
+        "input_element",
+        "input_type",
+        "output_element",
+        "output_type",
+    )
+
+    def __init__(
+        self, name, soap_action, input_element, input_type, output_element, output_type
+    ):
+        self.name = name
+        self.soap_action = soap_action
+        self.input_element = input_element
+        self.input_type = input_type
+        self.output_element = output_element
+        self.output_type = output_type
+
+
+class StaticSoapClient(SoapClient):
+    """``SoapClient`` using a generated schema module instead of zeep's runtime
+    WSDL parsing.
+
+    ``schema`` defaults to the module generated for the service in
+    ``wsdl_url`` and ``address`` to ``wsdl_url`` without its query string.
+    """
+
+    def __init__(
+        self,
+        wsdl_url,
+        key_data,
+        cert_data,
+        tbk_cert_data,
+        password=None,
+        schema=None,
+        address=None,
+        transport_timeout=300,
+        pool_maxsize=10,
+        http_backend="requests",
+        keepalive_interval=None,
+        keepalive_connections=1,
+    ):
+        super(StaticSoapClient, self).__init__(
+            wsdl_url, key_data, cert_data, tbk_cert_data
+        )
+        self.schema = schema or get_schema(wsdl_url)
+        self.address = address or wsdl_url.split("?", 1)[0]
+        self.wsse = ZeepWsseSignature.init_from_data(
+            key_data, cert_data, tbk_cert_data, password=password
+        )
+        self.transport_timeout = transport_timeout
+        transport_class = get_transport_class(http_backend)
+        self.transport = transport_class(
+            timeout=self.transport_timeout, pool_maxsize=pool_maxsize
+        )
+        self.keepalive = None
+        if keepalive_interval is not None:
+            self.start_keepalive(keepalive_interval, keepalive_connections)
+
+    def warmup(self, connections=1):
+        return self.transport.warmup(self.address, connections)
+
+    def start_keepalive(self, interval=30, connections=1):
+        self.stop_keepalive()
+        self.keepalive = KeepAlive(self.transport, self.address, connections, interval)
+        self.keepalive.start()
+
+    def stop_keepalive(self):
+        if self.keepalive is not None:
+            self.keepalive.stop()
+            self.keepalive = None
+
+    def close(self):
+        self.stop_keepalive()
+        self.transport.close()
+
+    def update_credentials(self, key_data, cert_data, tbk_cert_data, password=None):
+        self.wsse.update_from_data(key_data, cert_data, tbk_cert_data, password)
+        self.logger.info("Credentials updated")
+
+    def create_object(self, type_name, *args, **kwargs):
+        try:
+            object_type = self.schema.TYPES[type_name]
+        except KeyError:
+            raise TypeDoesNotExist(type_name)
+        return object_type(*args, **kwargs)
+
+    def get_enum_value(self, enum_name, value):
+        try:
+            values = self.schema.ENUMS[enum_name]
+        except KeyError:
+            raise TypeDoesNotExist(enum_name)
+        if value not in values:
+            raise ValueError("Invalid value {!r} for {}".format(value, enum_name))
+        return value
+
+    def request(self, request, timeout=None):
+        operation = self.get_operation(request.method_name)
+        envelope = self.create_envelope(operation, request.args, request.kwargs)
+        headers = {
+            "SOAPAction": '"{}"'.format(operation.soap_action),
+            "Content-Type": 'text/xml; charset="utf-8"',
+        }
+        envelope, headers = self.wsse.apply(envelope, headers)
+        try:
+            with self.transport.settings(timeout=timeout or self.transport_timeout):
+                response = self.transport.post_xml(self.address, envelope, headers)
+            document = parse_xml(response.content)
+        except self.transport.errors as error:
+            self.logger.exception("Request exception")
+            raise SoapRequestException(error, request)
+        except etree.XMLSyntaxError as error:
+            self.logger.exception("Invalid response")
+            raise SoapRequestException(error, request)
+        self.wsse.verify(document)
+        body = document.find("{%s}Body" % SOAP_NS)
+        fault = body.find("{%s}Fault" % SOAP_NS)
+        if fault is not None or response.status_code != 200:
+            message = fault.findtext("faultstring") if fault is not None else ""
+            self.logger.error("Fault: %s", message)
+            error, code = parse_tbk_error_message(message or "")
+            raise SoapServerException(error, code, request)
+        result = self.parse_result(operation, body)
+        return result, self.transport.last_sent, self.transport.last_received
+
+    def get_last_sent_envelope(self):
+        return self.transport.last_sent
+
+    def get_last_received_envelope(self):
+        return self.transport.last_received
+
+    def get_operation(self, method_name):
+        try:
+            return self.schema.OPERATIONS[method_name]
+        except KeyError:
+            raise MethodDoesNotExist(method_name)
+
+    def create_envelope(self, operation, args, kwargs):
+        namespace = self.schema.TARGET_NAMESPACE
+        envelope = etree.Element("{%s}Envelope" % SOAP_NS, nsmap={"soap-env": SOAP_NS})
+        body = etree.SubElement(envelope, "{%s}Body" % SOAP_NS)
+        element = etree.SubElement(
+            body,
+            "{%s}%s" % (namespace, operation.input_element),
+            nsmap={"ns0": namespace},
+        )
+        render_object(element, operation.input_type(*args, **kwargs), self.schema)
+        return envelope
+
+    def parse_result(self, operation, body):
+        element = body.find(
+            "{%s}%s" % (self.schema.TARGET_NAMESPACE, operation.output_element)
+        )
+        if element is None:
+            return None
+        result = parse_object(element, operation.output_type, self.schema)
+        # single part responses are unwrapped, as zeep does
+        if not result:
+            return None
+        if len(result) == 1:
+            return next(iter(result.values()))
+        return result
+
+
+def parse_xml(content):
+    parser = etree.XMLParser(resolve_entities=False, no_network=True, huge_tree=False)
+    return etree.fromstring(content, parser=parser)
+
+
+def to_text(value):
+    if isinstance(value, string_types):
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def render_object(element, value, schema):
+    for field in value.FIELDS:
+        field_value = getattr(value, field.name)
+        if field.many and isinstance(field_value, (list, tuple)):
+            for item in field_value:
+                render_value(element, field, item, schema)
+        else:
+            render_value(element, field, field_value, schema)
+
+
+def render_value(parent, field, value, schema):
+    if value is None:
+        return
+    element = etree.SubElement(parent, field.name)
+    object_type = schema.TYPES.get(field.type_name)
+    if object_type is None:
+        element.text = to_text(value)
+        return
+    if isinstance(value, dict):
+        value = object_type(**value)
+    render_object(element, value, schema)
+
+
+def parse_object(element, object_type, schema):
+    children = collections.defaultdict(list)
+    for child in element:
+        if isinstance(child.tag, string_types):
+            children[etree.QName(child).localname].append(child)
+    result = collections.OrderedDict()
+    for field in object_type.FIELDS:
+        values = [parse_value(child, field, schema) for child in children[field.name]]
+        if field.many:
+            result[field.name] = values
+        else:
+            result[field.name] = values[0] if values else None
+    return result
+
+
+def parse_value(element, field, schema):
+    if element.get("{%s}nil" % XSI_NS) in ("true", "1"):
+        return None
+    object_type = schema.TYPES.get(field.type_name)
+    if object_type is not None:
+        return parse_object(element, object_type, schema)
+    if element.text is None:
+        return None
+    parser = PARSERS.get(field.type_name)
+    if parser is None:
+        return element.text
+    try:
+        return parser(element.text)
+    except (TypeError, ValueError, decimal.InvalidOperation, isodate.ISO8601Error):
+        return None
@@ -0,0 +1,138 @@
+"""
+Local SQLite store of transaction results, indexed by buy order and token.
+
+    >>> store = TransactionStore("/var/lib/tbk/transactions.db")
+    >>> webpay = WebpayService(commerce, requestor_kwargs={"transaction_store": store})
+    ...
+    >>> store.lookup(buy_order="12345")
+
+``SoapRequestor`` records the responses of ``STORED_METHODS`` as they arrive,
+so support tools can find what Transbank answered without calling it again.
+Only results are kept, never request arguments.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from .utils import get_response_identifiers
+
+STORED_METHODS = frozenset(
+    [
+        "initTransaction",
+        "getTransactionResult",
+        "authorize",
+        "capture",
+        "nullify",
+        "initCompleteTransaction",
+    ]
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    commerce_code TEXT,
+    method TEXT NOT NULL,
+    buy_order TEXT,
+    token TEXT,
+    created_at REAL NOT NULL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_buy_order
+    ON transactions (buy_order, commerce_code);
+CREATE INDEX IF NOT EXISTS transactions_token ON transactions (token);
+"""
+
+COLUMNS = ("commerce_code", "method", "buy_order", "token", "created_at", "result")
+
+
+class TransactionStore(object):
+    """Results stored in the SQLite database at ``path``.
+
+    A single connection is shared by every thread. The database runs in WAL
+    mode without syncing each commit, a crash may lose the last records but
+    never corrupts the file.
+    """
+
+    def __init__(self, path=":memory:", methods=STORED_METHODS):
+        self.path = path
+        self.methods = frozenset(methods)
+        self.logger = logging.getLogger("tbk.soap.store")
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(SCHEMA)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM transactions"
+            ).fetchone()[0]
+
+    def record(self, response, commerce_code=None):
+        """Store ``response`` if its operation is stored, return whether it was."""
+        method_name = response.request.method_name
+        if method_name not in self.methods:
+            return False
+        buy_order, token = get_response_identifiers(response)
+        row = (
+            commerce_code,
+            method_name,
+            None if buy_order is None else str(buy_order),
+            token,
+            time.time(),
+            json.dumps(response.result, default=str),
+        )
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO transactions ({}) VALUES (?, ?, ?, ?, ?, ?)".format(
+                    ", ".join(COLUMNS)
+                ),
+                row,
+            )
+        return True
+
+    def lookup(self, buy_order=None, token=None, commerce_code=None, method=None):
+        """Return the records matching every given value, oldest first.
+
+        Records are dicts with the ``COLUMNS`` keys, ``result`` decoded.
+        """
+        if buy_order is None and token is None:
+            raise ValueError("buy_order or token is required")
+        conditions = []
+        values = []
+        for column, value in (
+            ("buy_order", None if buy_order is None else str(buy_order)),
+            ("token", token),
+            ("commerce_code", commerce_code),
+            ("method", method),
+        ):
+            if value is not None:
+                conditions.append("{} = ?".format(column))
+                values.append(value)
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT {} FROM transactions WHERE {} ORDER BY id".format(
+                    ", ".join(COLUMNS), " AND ".join(conditions)
+                ),
+                values,
+            ).fetchall()
+        records = []
+        for row in rows:
+            record = dict(zip(COLUMNS, row))
+            record["result"] = json.loads(record["result"])
+            records.append(record)
+        return records
+
+    def latest(self, buy_order=None, token=None, commerce_code=None, method=None):
+        """Return the last matching record or ``None``."""
+        records = self.lookup(buy_order, token, commerce_code, method)
+        return records[-1] if records else None
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,284 @@
+"""
+HTTP backends for ``ZeepSoapClient``.
+
+Every transport posts SOAP operations with its own HTTP library while WSDL
+and XSD documents are still loaded through zeep's ``requests`` session. All of
+them keep the exact bytes of the last envelopes sent and received per thread.
+
+Backends are selected by name with the ``http_backend`` argument of the client
+(which can also be given to ``create_soap_requestor``):
+
+* ``requests``: ``requests.Session`` as used by zeep (default).
+* ``urllib3``: a bare ``urllib3.PoolManager``, skipping the ``requests``
+  layer.
+* ``httpx``: an ``httpx.Client``, multiplexing requests over HTTP/2 when the
+  ``h2`` package is installed (``pip install python-tbk[httpx]``).
+
+A transport class or a callable returning a transport (like
+``tbk.soap.cassette.Cassette.transport``) can be given instead of a name.
+"""
+
+import contextlib
+import logging
+import threading
+
+import urllib3
+import zeep.transports
+import zeep.wsdl.utils
+from requests import RequestException
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+_UNSET = object()
+
+
+class HttpResponse(object):
+    """Minimal response object with the attributes zeep reads from responses."""
+
+    def __init__(self, status_code, headers, content, encoding=None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.encoding = encoding
+
+
+class RequestsTransport(zeep.transports.Transport):
+
+    errors = (RequestException,)
+
+    def __init__(self, timeout=300, pool_maxsize=10, verify=True, **kwargs):
+        self._local = threading.local()
+        super(RequestsTransport, self).__init__(timeout=timeout, **kwargs)
+        self.session.verify = verify
+        # keep enough pooled connections for concurrent requests
+        self.session.mount(
+            "https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        )
+
+    @property
+    def operation_timeout(self):
+        """Timeout of the operations, as set by ``settings`` in this thread."""
+        return getattr(self._local, "timeout", self._operation_timeout)
+
+    @operation_timeout.setter
+    def operation_timeout(self, timeout):
+        self._operation_timeout = timeout
+
+    @contextlib.contextmanager
+    def settings(self, timeout=None):
+        # zeep sets the timeout on the shared transport, concurrent requests
+        # would use the timeout of each other
+        previous = getattr(self._local, "timeout", _UNSET)
+        self._local.timeout = timeout
+        try:
+            yield
+        finally:
+            if previous is _UNSET:
+                del self._local.timeout
+            else:
+                self._local.timeout = previous
+
+    @property
+    def last_sent(self):
+        return getattr(self._local, "last_sent", None)
+
+    @property
+    def last_received(self):
+        return getattr(self._local, "last_received", None)
+
+    def post_xml(self, address, envelope, headers):
+        message = zeep.wsdl.utils.etree_to_string(envelope)
+        self._local.last_sent = message
+        self._local.last_received = None
+        response = self.post(address, message, headers)
+        self._local.last_received = response.content
+        return response
+
+    def ping(self, address, timeout=10):
+        """Send a HEAD request, return the response still holding its connection."""
+        return self.session.head(
+            address, timeout=timeout, allow_redirects=False, stream=True
+        )
+
+    def release(self, response):
+        """Return the connection of a ``ping`` response to the pool."""
+        response.content
+        response.close()
+
+    def warmup(self, address, connections=1, timeout=10):
+        """Open up to ``connections`` pooled connections to ``address``.
+
+        Pings are sent concurrently and their connections are only returned
+        to the pool once all of them finished, so each one needs its own
+        connection. The TCP and TLS handshakes are then already done for the
+        next requests. Return the number of successful pings.
+        """
+        from ..concurrency import imap
+
+        responses = []
+        for outcome in imap(
+            lambda _: self.ping(address, timeout),
+            range(connections),
+            concurrency=connections,
+        ):
+            if outcome.ok:
+                responses.append(outcome.result)
+            else:
+                self.logger.warning("Cannot warm up %s: %r", address, outcome.error)
+        for response in responses:
+            if response is not None:
+                self.release(response)
+        return len(responses)
+
+    def close(self):
+        self.session.close()
+
+
+class KeepAlive(object):
+    """Warm up the connections of a transport every ``interval`` seconds.
+
+    The interval should be shorter than the idle timeout of the server so
+    pooled connections are refreshed before being closed.
+    """
+
+    def __init__(self, transport, address, connections=1, interval=30):
+        self.transport = transport
+        self.address = address
+        self.connections = connections
+        self.interval = interval
+        self.logger = logging.getLogger("tbk.soap.transports.KeepAlive")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="tbk-keepalive")
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.transport.warmup(self.address, self.connections)
+            except Exception:
+                self.logger.exception("Keep alive of %s failed", self.address)
+
+
+class Urllib3Transport(RequestsTransport):
+    def __init__(self, timeout=300, pool_maxsize=10, verify=True, **kwargs):
+        super(Urllib3Transport, self).__init__(
+            timeout=timeout, pool_maxsize=pool_maxsize, verify=verify, **kwargs
+        )
+        self.errors = (urllib3.exceptions.HTTPError,)
+        self.pool_manager = urllib3.PoolManager(
+            maxsize=pool_maxsize,
+            block=False,
+            cert_reqs="CERT_REQUIRED" if verify else "CERT_NONE",
+            retries=False,
+        )
+
+    def post(self, address, message, headers):
+        timeout = self.operation_timeout
+        if isinstance(timeout, tuple):
+            timeout = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        elif timeout is not None:
+            timeout = urllib3.Timeout(total=None, connect=timeout, read=timeout)
+        response = self.pool_manager.request(
+            "POST",
+            address,
+            body=message,
+            headers=dict(self.session.headers, **headers),
+            timeout=timeout,
+            redirect=False,
+        )
+        return HttpResponse(response.status, response.headers, response.data)
+
+    def ping(self, address, timeout=10):
+        return self.pool_manager.request(
+            "HEAD", address, timeout=timeout, redirect=False, preload_content=False
+        )
+
+    def release(self, response):
+        response.read()
+        response.release_conn()
+
+    def close(self):
+        super(Urllib3Transport, self).close()
+        self.pool_manager.clear()
+
+
+class HttpxTransport(RequestsTransport):
+    def __init__(self, timeout=300, pool_maxsize=10, verify=True, http2=True, **kwargs):
+        if httpx is None:
+            raise ImportError(HTTPX_REQUIRED)
+        try:
+            import h2  # noqa
+        except ImportError:
+            http2 = False
+
+        super(HttpxTransport, self).__init__(
+            timeout=timeout, pool_maxsize=pool_maxsize, verify=verify, **kwargs
+        )
+        self.errors = (httpx.HTTPError,)
+        self.httpx_client = httpx.Client(
+            http2=http2,
+            verify=verify,
+            limits=httpx.Limits(
+                max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize
+            ),
+            headers=dict(self.session.headers),
+        )
+
+    def post(self, address, message, headers):
+        timeout = self.operation_timeout
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        response = self.httpx_client.post(
+            address, content=message, headers=headers, timeout=timeout
+        )
+        return HttpResponse(
+            response.status_code, response.headers, response.content, response.encoding
+        )
+
+    def ping(self, address, timeout=10):
+        return self.httpx_client.send(
+            self.httpx_client.build_request("HEAD", address, timeout=timeout),
+            stream=True,
+        )
+
+    def release(self, response):
+        response.read()
+        response.close()
+
+    def close(self):
+        super(HttpxTransport, self).close()
+        self.httpx_client.close()
+
+
+HTTPX_REQUIRED = "httpx backend requires `pip install python-tbk[httpx]`"
+
+TRANSPORTS = {
+    "requests": RequestsTransport,
+    "urllib3": Urllib3Transport,
+    "httpx": HttpxTransport,
+}
+
+
+def get_transport_class(http_backend):
+    """Return the transport class (or factory) named by ``http_backend``."""
+    if callable(http_backend):
+        return http_backend
+    try:
+        transport_class = TRANSPORTS[http_backend]
+    except KeyError:
+        raise ValueError("Invalid http backend {}".format(http_backend))
+    if transport_class is HttpxTransport and httpx is None:
+        raise ImportError(HTTPX_REQUIRED)
+    return transport_class
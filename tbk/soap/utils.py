@@ -3,6 +3,11 @@ import re
 import xmlsec
 from lxml import etree
 
+try:
+    string_types = (str, unicode)  # noqa
+except NameError:
+    string_types = (str,)
+
 
 def parse_tbk_error_message(raw_message):
     message_match = re.search(r"<!--(.+?)-->", raw_message)
@@ -38,3 +43,33 @@ def xml_to_string(tree):
 
 def create_xml_element(tag_name, nsmap=None):
     return etree.Element(tag_name, nsmap=nsmap)
+
+
+def get_field(obj, names):
+    for name in names:
+        try:
+            value = obj[name]
+        except (KeyError, IndexError, TypeError, AttributeError):
+            continue
+        if value is not None:
+            return value
+    return None
+
+
+def get_response_identifiers(response):
+    """Return the ``(buy_order, token)`` pair a response refers to.
+
+    Both values are looked up in the result and in the request arguments, any
+    of them may be ``None`` when the operation does not carry it.
+    """
+    request = response.request
+    sources = [response.result] + list(request.args) + list(request.kwargs.values())
+    buy_order = token = None
+    for source in sources:
+        if buy_order is None:
+            buy_order = get_field(source, ("buyOrder", "buyorder"))
+        if token is None:
+            token = get_field(source, ("token",))
+    if token is None and request.args and isinstance(request.args[0], string_types):
+        token = request.args[0]
+    return buy_order, token
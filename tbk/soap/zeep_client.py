@@ -1,11 +1,12 @@
 import zeep
+import zeep.cache
 import zeep.plugins
 import zeep.helpers
 import zeep.exceptions
 import zeep.transports
-from requests import RequestException
 
 from .soap_client import SoapClient
+from .transports import KeepAlive, get_transport_class
 from .wsse import sign_envelope, verify_envelope
 from .exceptions import (
     InvalidSignatureResponse,
@@ -14,7 +15,7 @@ from .exceptions import (
     TypeDoesNotExist,
     SoapRequestException,
 )
-from .utils import load_key_from_data, parse_tbk_error_message, xml_to_string
+from .utils import load_key_from_data, parse_tbk_error_message
 
 
 class ZeepSoapClient(SoapClient):
@@ -26,6 +27,11 @@ class ZeepSoapClient(SoapClient):
         tbk_cert_data,
         password=None,
         transport_timeout=300,
+        pool_maxsize=10,
+        http_backend="requests",
+        keepalive_interval=None,
+        keepalive_connections=1,
+        wsdl_cache=None,
     ):
         super(ZeepSoapClient, self).__init__(
             wsdl_url, key_data, cert_data, tbk_cert_data
@@ -34,11 +40,41 @@ class ZeepSoapClient(SoapClient):
             key_data, cert_data, tbk_cert_data, password=password
         )
         self.transport_timeout = transport_timeout
-        self.transport = zeep.transports.Transport(timeout=self.transport_timeout)
-        self.history = zeep.plugins.HistoryPlugin()
-        self.client = zeep.Client(
-            wsdl_url, wsse=self.wsse, transport=self.transport, plugins=[self.history]
+        transport_class = get_transport_class(http_backend)
+        self.transport = transport_class(
+            timeout=self.transport_timeout,
+            pool_maxsize=pool_maxsize,
+            cache=None if wsdl_cache is None else ZeepDocumentCache(wsdl_cache),
         )
+        self.client = zeep.Client(wsdl_url, wsse=self.wsse, transport=self.transport)
+        self.keepalive = None
+        if keepalive_interval is not None:
+            self.start_keepalive(keepalive_interval, keepalive_connections)
+
+    @property
+    def address(self):
+        return self.client.service._binding_options["address"]
+
+    def warmup(self, connections=1):
+        return self.transport.warmup(self.address, connections)
+
+    def start_keepalive(self, interval=30, connections=1):
+        self.stop_keepalive()
+        self.keepalive = KeepAlive(self.transport, self.address, connections, interval)
+        self.keepalive.start()
+
+    def stop_keepalive(self):
+        if self.keepalive is not None:
+            self.keepalive.stop()
+            self.keepalive = None
+
+    def close(self):
+        self.stop_keepalive()
+        self.transport.close()
+
+    def update_credentials(self, key_data, cert_data, tbk_cert_data, password=None):
+        self.wsse.update_from_data(key_data, cert_data, tbk_cert_data, password)
+        self.logger.info("Credentials updated")
 
     def create_object(self, type_name, *args, **kwargs):
         try:
@@ -61,7 +97,7 @@ class ZeepSoapClient(SoapClient):
             self.logger.exception("Fault")
             error, code = parse_tbk_error_message(fault.message)
             raise SoapServerException(error, code, request)
-        except RequestException as error:
+        except self.transport.errors as error:
             self.logger.exception("Request exception")
             raise SoapRequestException(error, request)
         else:
@@ -77,22 +113,48 @@ class ZeepSoapClient(SoapClient):
             raise MethodDoesNotExist(method_name)
 
     def get_last_sent_envelope(self):
-        return xml_to_string(self.history.last_sent["envelope"])
+        return self.transport.last_sent
 
     def get_last_received_envelope(self):
-        return xml_to_string(self.history.last_received["envelope"])
+        return self.transport.last_received
+
+
+class ZeepDocumentCache(zeep.cache.Base):
+    """Keep the WSDL and XSD documents loaded by zeep in a ``tbk.cache`` backend.
+
+    Documents are still parsed by every client, only downloads are saved.
+    """
+
+    def __init__(self, cache, ttl=None):
+        self.cache = cache
+        self.ttl = ttl
+
+    def add(self, url, content):
+        self.cache.set(("zeep", url), content, self.ttl)
+
+    def get(self, url):
+        return self.cache.get(("zeep", url))
 
 
 class ZeepWsseSignature(object):
     def __init__(self, key, tbk_cert):
-        self.key = key
-        self.tbk_cert = tbk_cert
+        # both keys are swapped together with a single assignment
+        self.keys = (key, tbk_cert)
+
+    @property
+    def key(self):
+        return self.keys[0]
+
+    @property
+    def tbk_cert(self):
+        return self.keys[1]
 
     @classmethod
     def init_from_data(cls, key_data, cert_data, tbk_cert_data, password=None):
-        key = load_key_from_data(key_data, cert_data, password)
-        tbk_cert = load_key_from_data(tbk_cert_data, key_format="CERT_PEM")
-        return cls(key, tbk_cert)
+        return cls(*load_keys(key_data, cert_data, tbk_cert_data, password))
+
+    def update_from_data(self, key_data, cert_data, tbk_cert_data, password=None):
+        self.keys = load_keys(key_data, cert_data, tbk_cert_data, password)
 
     def apply(self, envelope, headers):
         sign_envelope(envelope, self.key)
@@ -102,3 +164,9 @@ class ZeepWsseSignature(object):
         if not verify_envelope(envelope, self.tbk_cert):
             raise InvalidSignatureResponse(envelope)
         return envelope
+
+
+def load_keys(key_data, cert_data, tbk_cert_data, password=None):
+    key = load_key_from_data(key_data, cert_data, password)
+    tbk_cert = load_key_from_data(tbk_cert_data, key_format="CERT_PEM")
+    return key, tbk_cert
@@ -0,0 +1,262 @@
+"""
+Run service calls on a pool of processes.
+
+Services hold a zeep client, xmlsec keys and an HTTP session, none of which can
+be pickled. ``ServiceSpec`` describes a service with plain values instead:
+each worker process builds the service the first time it gets a spec and keeps
+it for the next calls, so only the spec, the arguments and the result cross
+the process boundary::
+
+    >>> commerce = CommerceSpec(
+    ...     "597020000541", "commerce.key", "commerce.crt", "tbk.pem", CERTIFICATION
+    ... )
+    >>> webpay = ServiceSpec("webpay", commerce)
+    >>> with ServicePool(processes=4) as pool:
+    ...     result = pool.submit(webpay, "get_transaction_result", token).result()
+    ...     outcomes = list(pool.batch(webpay, "get_transaction_result", tokens))
+
+Workers return the ``result`` of responses, not the ``SoapResponse``.
+"""
+
+import collections
+import logging
+import os
+import pickle
+import threading
+
+from .commerce import Commerce
+from .concurrency import Outcome
+from .services import SERVICES
+from .soap.requestor import SoapRequest
+
+
+class CommerceSpec(object):
+    """Picklable reference to a commerce, its credentials are read by workers."""
+
+    def __init__(
+        self,
+        commerce_code,
+        key_file,
+        cert_file,
+        tbk_cert_file,
+        environment,
+        key_password=None,
+    ):
+        self.commerce_code = commerce_code
+        self.key_file = key_file
+        self.cert_file = cert_file
+        self.tbk_cert_file = tbk_cert_file
+        self.environment = environment
+        self.key_password = key_password
+
+    @property
+    def key(self):
+        return (
+            self.commerce_code,
+            self.key_file,
+            self.cert_file,
+            self.tbk_cert_file,
+            self.environment,
+            self.key_password,
+        )
+
+    def create(self):
+        return Commerce.init_from_files(*self.key)
+
+    def __reduce__(self):
+        return self.__class__, self.key
+
+    def __eq__(self, other):
+        return isinstance(other, CommerceSpec) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return "<CommerceSpec {} {}>".format(self.commerce_code, self.environment)
+
+
+class ServiceSpec(object):
+    """Picklable description of a service.
+
+    ``service`` is a name of ``tbk.services.SERVICES``. ``requestor_kwargs``
+    and ``client_kwargs`` are passed to the service and must hold picklable
+    and hashable values, e.g. timeouts or a ``http_backend`` name.
+    """
+
+    def __init__(self, service, commerce, requestor_kwargs=None, client_kwargs=None):
+        if service not in SERVICES:
+            raise ValueError("Invalid service {}".format(service))
+        self.service = service
+        self.commerce = commerce
+        self.requestor_kwargs = dict(requestor_kwargs or {})
+        self.client_kwargs = dict(client_kwargs or {})
+
+    @property
+    def key(self):
+        return (
+            self.service,
+            self.commerce.key,
+            tuple(sorted(self.requestor_kwargs.items())),
+            tuple(sorted(self.client_kwargs.items())),
+        )
+
+    def create(self):
+        return SERVICES[self.service](
+            self.commerce.create(),
+            requestor_kwargs=self.requestor_kwargs,
+            **self.client_kwargs
+        )
+
+    def __reduce__(self):
+        return (
+            self.__class__,
+            (self.service, self.commerce, self.requestor_kwargs, self.client_kwargs),
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, ServiceSpec) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return "<ServiceSpec {} {!r}>".format(self.service, self.commerce)
+
+
+_services = {}
+_services_pid = None
+_services_lock = threading.Lock()
+
+
+def get_service(spec):
+    """Return the service of ``spec`` built by this process."""
+    global _services_pid
+    with _services_lock:
+        if _services_pid != os.getpid():
+            # forked workers must not share the connections of their parent
+            _services.clear()
+            _services_pid = os.getpid()
+        service = _services.get(spec)
+        if service is None:
+            logging.getLogger("tbk.workers").info(
+                "Creating %r in process %s", spec, _services_pid
+            )
+            service = _services[spec] = spec.create()
+        return service
+
+
+class WorkerError(Exception):
+    """Stands for an exception of a worker that cannot be pickled."""
+
+    def __init__(self, error_class, message):
+        super(WorkerError, self).__init__(
+            "{}: {}".format(error_class, message) if message else error_class
+        )
+        self.error_class = error_class
+        self.message = message
+
+    def __reduce__(self):
+        return self.__class__, (self.error_class, self.message)
+
+
+def get_portable_error(error):
+    request = getattr(error, "request", None)
+    if isinstance(request, SoapRequest):
+        # arguments are zeep objects and may hold card data
+        error.request = SoapRequest(request.method_name, (), {})
+    try:
+        pickle.dumps(error, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return WorkerError(error.__class__.__name__, str(error))
+    return error
+
+
+def call(spec, method_name, args=(), kwargs=None):
+    """Call ``method_name`` of the service of ``spec``, return the result."""
+    try:
+        service = get_service(spec)
+        response = getattr(service, method_name)(*args, **(kwargs or {}))
+    except Exception as error:
+        raise get_portable_error(error)
+    return response.result
+
+
+def call_chunk(spec, method_name, items):
+    """Call ``method_name`` for every item, return ``(result, error)`` pairs."""
+    outcomes = []
+    for item in items:
+        args, kwargs = get_arguments(item)
+        try:
+            outcomes.append((call(spec, method_name, args, kwargs), None))
+        except Exception as error:
+            outcomes.append((None, error))
+    return outcomes
+
+
+def get_arguments(item):
+    if isinstance(item, dict):
+        return (), item
+    if isinstance(item, tuple):
+        return item, {}
+    return (item,), {}
+
+
+class ServicePool(object):
+    """Send service calls to a ``concurrent.futures.ProcessPoolExecutor``."""
+
+    def __init__(self, processes=None, executor=None):
+        if executor is None:
+            try:
+                from concurrent.futures import ProcessPoolExecutor
+            except ImportError:
+                raise ImportError("ServicePool requires `pip install futures`")
+            executor = ProcessPoolExecutor(processes)
+        self.executor = executor
+
+    def submit(self, spec, method_name, *args, **kwargs):
+        """Return a future of the result of the service ``method_name``."""
+        return self.executor.submit(call, spec, method_name, args, kwargs)
+
+    def batch(self, spec, method_name, items, chunksize=16, window=64):
+        """Call ``method_name`` for every item like ``TBKWebService.batch``.
+
+        Items are sent to workers in chunks of ``chunksize``, at most ``window``
+        chunks are pending at any time. Yield an ``Outcome`` per item in input
+        order.
+        """
+        pending = collections.deque()
+        items = iter(items)
+        index = 0
+        while True:
+            while len(pending) < window:
+                chunk = []
+                for item in items:
+                    chunk.append(item)
+                    if len(chunk) >= chunksize:
+                        break
+                if not chunk:
+                    break
+                future = self.executor.submit(call_chunk, spec, method_name, chunk)
+                pending.append((chunk, future))
+            if not pending:
+                return
+            chunk, future = pending.popleft()
+            for item, (result, error) in zip(chunk, future.result()):
+                yield Outcome(index, item, result=result, error=error)
+                index += 1
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,173 @@
+import threading
+import unittest
+
+from tbk.acknowledger import Acknowledger
+from tbk.services import WebpayService
+from tbk.soap.deadline import Deadline
+from tbk.soap.exceptions import (
+    DeadlineExceeded,
+    SoapRequestException,
+    SoapServerException,
+)
+
+from .utils import mock
+
+
+class AcknowledgerTest(unittest.TestCase):
+    def setUp(self):
+        self.service = mock.Mock(spec=WebpayService)
+        self.acknowledger = Acknowledger(self.service, workers=2, retry_delay=0.01)
+
+    def start(self):
+        self.acknowledger.start()
+        self.addCleanup(self.acknowledger.stop, 5)
+
+    def test_submit(self):
+        self.start()
+
+        acknowledgement = self.acknowledger.submit("token")
+
+        self.assertTrue(acknowledgement.wait(5))
+        self.assertTrue(acknowledgement.ok)
+        self.assertEqual(1, acknowledgement.attempts)
+        self.assertEqual(
+            self.service.acknowledge_transaction.return_value, acknowledgement.result
+        )
+        self.service.acknowledge_transaction.assert_called_once_with(
+            "token", deadline=acknowledgement.deadline
+        )
+        self.assertEqual(1, self.acknowledger.stats()["acknowledged"])
+
+    def test_earliest_deadline_first(self):
+        acknowledger = Acknowledger(self.service, workers=1)
+        late = acknowledger.submit("late", Deadline(20))
+        early = acknowledger.submit("early", Deadline(10))
+        default = acknowledger.submit("default")
+
+        acknowledger.start()
+        acknowledger.stop(5)
+
+        self.assertTrue(all(item.ok for item in (late, early, default)))
+        self.assertEqual(
+            ["early", "late", "default"],
+            [
+                call[0][0]
+                for call in self.service.acknowledge_transaction.call_args_list
+            ],
+        )
+
+    def test_retry(self):
+        self.service.acknowledge_transaction.side_effect = [
+            SoapRequestException("connection error", None),
+            SoapRequestException("connection error", None),
+            "acknowledged",
+        ]
+        self.start()
+
+        acknowledgement = self.acknowledger.submit("token")
+
+        self.assertTrue(acknowledgement.wait(5))
+        self.assertTrue(acknowledgement.ok)
+        self.assertEqual(3, acknowledgement.attempts)
+        self.assertEqual("acknowledged", acknowledgement.result)
+        self.assertEqual(2, self.acknowledger.stats()["retried"])
+
+    def test_retry_past_deadline(self):
+        self.service.acknowledge_transaction.side_effect = SoapRequestException(
+            "connection error", None
+        )
+        self.acknowledger.retry_delay = 1
+        self.start()
+
+        acknowledgement = self.acknowledger.submit("token", Deadline(0.5))
+
+        self.assertTrue(acknowledgement.wait(5))
+        self.assertTrue(acknowledgement.missed)
+        self.assertFalse(acknowledgement.ok)
+        self.assertEqual(1, acknowledgement.attempts)
+        self.assertEqual(1, self.acknowledger.stats()["deadline_misses"])
+
+    def test_deadline_exceeded(self):
+        self.service.acknowledge_transaction.side_effect = DeadlineExceeded(
+            "deadline exceeded", None
+        )
+        self.start()
+
+        acknowledgement = self.acknowledger.submit("token")
+
+        self.assertTrue(acknowledgement.wait(5))
+        self.assertTrue(acknowledgement.missed)
+        self.assertEqual(1, self.acknowledger.stats()["deadline_misses"])
+
+    def test_expired_in_queue(self):
+        self.start()
+
+        acknowledgement = self.acknowledger.submit("token", Deadline(0))
+
+        self.assertTrue(acknowledgement.wait(5))
+        self.assertTrue(acknowledgement.missed)
+        self.assertEqual(0, acknowledgement.attempts)
+        self.service.acknowledge_transaction.assert_not_called()
+
+    def test_server_error_is_not_retried(self):
+        error = SoapServerException("Invalid token", 274, None)
+        self.service.acknowledge_transaction.side_effect = error
+        self.start()
+
+        acknowledgement = self.acknowledger.submit("token")
+
+        self.assertTrue(acknowledgement.wait(5))
+        self.assertIs(error, acknowledgement.error)
+        self.assertFalse(acknowledgement.missed)
+        self.assertEqual(1, acknowledgement.attempts)
+        self.assertEqual(1, self.acknowledger.stats()["failed"])
+
+    def test_queue_full(self):
+        acknowledger = Acknowledger(self.service, maxsize=2)
+
+        self.assertIsNotNone(acknowledger.submit("first"))
+        self.assertIsNotNone(acknowledger.submit("second"))
+        self.assertIsNone(acknowledger.submit("third"))
+        self.assertEqual(2, len(acknowledger))
+        self.assertEqual(
+            {
+                "queued": 2,
+                "in_flight": 0,
+                "acknowledged": 0,
+                "failed": 0,
+                "retried": 0,
+                "rejected": 1,
+                "deadline_misses": 0,
+            },
+            acknowledger.stats(),
+        )
+
+    def test_stop(self):
+        release = threading.Event()
+        self.service.acknowledge_transaction.side_effect = lambda *a, **k: release.wait(
+            5
+        )
+        acknowledger = Acknowledger(self.service, workers=1)
+        acknowledger.start()
+        first = acknowledger.submit("first")
+        second = acknowledger.submit("second")
+
+        waited = []
+        waiter = threading.Thread(target=lambda: waited.append(second.wait()))
+        waiter.start()
+
+        pending = acknowledger.stop(timeout=0.1)
+        # waiters of abandoned tokens are woken up
+        waiter.join(5)
+        release.set()
+
+        self.assertEqual([second], pending)
+        self.assertEqual([False], waited)
+        self.assertTrue(second.abandoned)
+        self.assertFalse(second.ok)
+        self.assertTrue(first.wait(5))
+        self.assertFalse(first.abandoned)
+        self.assertFalse(second.done)
+        self.assertEqual(0, len(acknowledger))
+        with self.assertRaises(RuntimeError):
+            acknowledger.submit("third")
@@ -0,0 +1,129 @@
+import threading
+import time
+import unittest
+
+from tbk.soap.admission import CRITICAL, LOW, NORMAL, AdmissionController
+
+
+class AdmissionControllerTest(unittest.TestCase):
+    def acquire_in_thread(self, controller, method_name, priority=None, timeout=5):
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(
+                controller.acquire(method_name, priority=priority, timeout=timeout)
+            )
+        )
+        thread.start()
+        return thread, results
+
+    def wait_for_queued(self, controller, count):
+        for _ in range(500):
+            if controller.stats()["queued"] == count:
+                return
+            time.sleep(0.01)
+        self.fail("requests did not queue")
+
+    def test_unlimited(self):
+        controller = AdmissionController()
+
+        self.assertTrue(all(controller.acquire("method") for _ in range(100)))
+        self.assertEqual(100, controller.running)
+
+    def test_limit(self):
+        controller = AdmissionController(limit=2)
+
+        self.assertTrue(controller.acquire("method"))
+        self.assertTrue(controller.acquire("other"))
+        self.assertFalse(controller.acquire("method"))
+        controller.release("other")
+        self.assertTrue(controller.acquire("method"))
+        self.assertEqual(
+            {
+                "running": 2,
+                "queued": 0,
+                "admitted": 3,
+                "rejected": 1,
+                "shed": 0,
+                "timed_out": 0,
+            },
+            controller.stats(),
+        )
+
+    def test_method_limit(self):
+        controller = AdmissionController(limit=3, limits={"method": 1})
+
+        self.assertTrue(controller.acquire("method"))
+        self.assertFalse(controller.acquire("method"))
+        self.assertTrue(controller.acquire("other"))
+
+    def test_queue(self):
+        controller = AdmissionController(limit=1, queue_size=1)
+        controller.acquire("method")
+
+        thread, results = self.acquire_in_thread(controller, "method")
+        self.wait_for_queued(controller, 1)
+        controller.release("method")
+        thread.join()
+
+        self.assertEqual([True], results)
+        self.assertEqual(1, controller.running)
+
+    def test_queue_timeout(self):
+        controller = AdmissionController(limit=1, queue_size=1)
+        controller.acquire("method")
+
+        self.assertFalse(controller.acquire("method", timeout=0.01))
+        self.assertFalse(controller.acquire("method", timeout=0))
+        self.assertEqual(0, controller.stats()["queued"])
+        self.assertEqual(1, controller.stats()["timed_out"])
+        self.assertEqual(1, controller.stats()["rejected"])
+
+    def test_queue_by_priority(self):
+        controller = AdmissionController(
+            limit=1, queue_size=3, priorities={"critical": CRITICAL}
+        )
+        controller.acquire("method")
+        low, low_results = self.acquire_in_thread(controller, "method", LOW)
+        self.wait_for_queued(controller, 1)
+        normal, normal_results = self.acquire_in_thread(controller, "method")
+        self.wait_for_queued(controller, 2)
+        critical, critical_results = self.acquire_in_thread(controller, "critical")
+        self.wait_for_queued(controller, 3)
+
+        controller.release("method")
+        critical.join()
+        self.assertEqual([True], critical_results)
+        self.assertEqual([], normal_results + low_results)
+        controller.release("critical")
+        normal.join()
+        self.assertEqual([True], normal_results)
+        controller.release("method")
+        low.join()
+        self.assertEqual([True], low_results)
+
+    def test_shed_lower_priority(self):
+        controller = AdmissionController(limit=1, queue_size=1)
+        controller.acquire("method")
+        low, low_results = self.acquire_in_thread(controller, "method", LOW)
+        self.wait_for_queued(controller, 1)
+
+        self.assertFalse(controller.acquire("method", priority=LOW, timeout=1))
+        critical, critical_results = self.acquire_in_thread(
+            controller, "method", CRITICAL
+        )
+        low.join()
+        self.assertEqual([False], low_results)
+        self.wait_for_queued(controller, 1)
+        controller.release("method")
+        critical.join()
+
+        self.assertEqual([True], critical_results)
+        self.assertEqual(1, controller.stats()["shed"])
+        self.assertEqual(1, controller.stats()["rejected"])
+
+    def test_get_priority(self):
+        controller = AdmissionController(priorities={"critical": CRITICAL})
+
+        self.assertEqual(CRITICAL, controller.get_priority("critical"))
+        self.assertEqual(NORMAL, controller.get_priority("method"))
+        self.assertEqual(LOW, controller.get_priority("critical", LOW))
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from tbk.soap import SoapRequest, SoapResponse
+from tbk.soap.audit import EnvelopeAuditLog
+from tbk.soap.exceptions import SoapServerException
+from tbk.soap.redaction import Redactor
+
+from .utils import mock
+
+
+class EnvelopeAuditLogTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_response(self, method_name, args, result, sent="<sent/>"):
+        return SoapResponse(
+            result=result,
+            request=SoapRequest(method_name=method_name, args=args, kwargs={}),
+            envelope_sent=sent,
+            envelope_received="<received/>",
+        )
+
+    def test_record_and_lookup(self):
+        audit_log = EnvelopeAuditLog(self.directory)
+        audit_log.record(
+            self.create_response(
+                "getTransactionResult", ("token-1",), {"buyOrder": "order-1"}
+            )
+        )
+        audit_log.record(
+            self.create_response(
+                "acknowledgeTransaction", ("token-1",), None, sent="<ack/>"
+            )
+        )
+        audit_log.record(
+            self.create_response("initTransaction", (), {"token": "token-2"})
+        )
+        audit_log.close()
+
+        self.assertEqual(3, audit_log.written)
+        records = list(audit_log.lookup(token="token-1"))
+        self.assertEqual(
+            ["getTransactionResult", "acknowledgeTransaction"],
+            [record["method"] for record in records],
+        )
+        self.assertEqual("<ack/>", records[1]["envelope_sent"])
+        records = list(audit_log.lookup(buy_order="order-1"))
+        self.assertEqual(1, len(records))
+        self.assertEqual("token-1", records[0]["token"])
+
+    def test_record_redacted_failure(self):
+        redactor = Redactor()
+        threads = set()
+
+        def redact_xml(envelope):
+            threads.add(threading.current_thread().name)
+            return Redactor.redact_xml(redactor, envelope)
+
+        redactor.redact_xml = redact_xml
+        audit_log = EnvelopeAuditLog(self.directory, redactor=redactor)
+        response = self.create_response(
+            "authorize",
+            ("token-1",),
+            None,
+            sent="<authorize><buyOrder>order-1</buyOrder><cvv>123</cvv></authorize>",
+        )
+        audit_log.record(response, error=SoapServerException("Invalid", 21, None))
+        audit_log.close()
+
+        record = list(audit_log.lookup(token="token-1"))[0]
+        self.assertNotIn("123", record["envelope_sent"])
+        self.assertIn("<cvv>********</cvv>", record["envelope_sent"])
+        self.assertIn("SoapServerException", record["error"])
+        # envelopes are redacted by the writer, not by the request thread
+        self.assertEqual({"tbk-envelope-audit-log"}, threads)
+        self.assertEqual(
+            {"recorded": 1, "dropped": 0, "written": 1, "queued": 0},
+            audit_log.stats(),
+        )
+
+    def test_rotation(self):
+        audit_log = EnvelopeAuditLog(self.directory, max_bytes=1)
+        for number in range(3):
+            audit_log.record(
+                self.create_response(
+                    "getTransactionResult", ("token-{}".format(number),), {}
+                )
+            )
+        audit_log.close()
+
+        archives = [name for name in os.listdir(self.directory) if ".jsonl.gz" in name]
+        self.assertEqual(3, len(archives))
+        self.assertEqual(1, len(list(audit_log.lookup(token="token-2"))))
+
+    def test_drop_when_full(self):
+        release = threading.Event()
+        response = self.create_response("getTransactionResult", ("token",), {})
+        with mock.patch.object(
+            EnvelopeAuditLog, "_write", side_effect=lambda batch: release.wait()
+        ):
+            audit_log = EnvelopeAuditLog(self.directory, max_queue_size=1)
+            results = [audit_log.record(response) for _ in range(3)]
+            release.set()
+            audit_log.close()
+
+        self.assertIn(False, results)
+        self.assertEqual(results.count(False), audit_log.dropped)
+        self.assertEqual(audit_log.dropped, audit_log.stats()["dropped"])
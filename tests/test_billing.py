@@ -0,0 +1,193 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from tbk.billing import (
+    AUTHORIZED,
+    FAILED,
+    NOT_SENT,
+    REJECTED,
+    SKIPPED,
+    STARTED,
+    UNCERTAIN,
+    BillingRunner,
+    CheckpointJournal,
+)
+from tbk.services import OneClickPaymentService
+from tbk.soap import SoapResponse
+from tbk.soap.exceptions import (
+    AdmissionRejected,
+    DeadlineExceeded,
+    RequestorClosed,
+    SoapRequestException,
+    SoapServerException,
+)
+
+from .utils import mock
+
+
+class BillingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "billing.journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read_journal(self):
+        with open(self.path) as journal:
+            return [json.loads(line) for line in journal]
+
+
+class CheckpointJournalTest(BillingTestCase):
+    def test_append_and_load(self):
+        journal = CheckpointJournal(self.path)
+        journal.append("1", STARTED, durable=True)
+        journal.append("1", AUTHORIZED, authorization_code="1213")
+        journal.append(2, STARTED, durable=True)
+        journal.close()
+        self.assertEqual("1213", self.read_journal()[1]["authorization_code"])
+
+        with open(self.path, "a") as file:
+            file.write('{"buy_order": "3", "sta')
+
+        journal = CheckpointJournal(self.path)
+        journal.append("4", STARTED)
+        journal.close()
+        self.assertEqual({"1": AUTHORIZED, "2": STARTED, "4": STARTED}, journal.states)
+        journal = CheckpointJournal(self.path)
+        journal.close()
+        self.assertEqual({"1": AUTHORIZED, "2": STARTED, "4": STARTED}, journal.states)
+
+    def test_group_commit(self):
+        journal = CheckpointJournal(self.path, fsync_every=1000, fsync_interval=0.01)
+        for buy_order in range(50):
+            journal.append(buy_order, STARTED)
+        journal.append("last", STARTED, durable=True)
+        journal.close()
+
+        self.assertLess(journal.fsyncs, 5)
+        self.assertEqual(51, len(journal.states))
+
+    @mock.patch("tbk.billing.os.fsync", side_effect=OSError(5, "I/O error"))
+    def test_sync_error(self, fsync):
+        journal = CheckpointJournal(self.path)
+
+        self.assertRaises(IOError, journal.append, "1", STARTED, durable=True)
+        self.assertRaises(IOError, journal.append, "2", STARTED)
+        journal.close()
+        self.assertFalse(journal._thread.is_alive())
+
+    def test_durable_timeout(self):
+        released = threading.Event()
+        with mock.patch(
+            "tbk.billing.os.fsync", side_effect=lambda fd: released.wait(5)
+        ):
+            journal = CheckpointJournal(self.path, durable_timeout=0.05)
+            try:
+                self.assertRaises(IOError, journal.append, "1", STARTED, durable=True)
+            finally:
+                released.set()
+                journal.close()
+
+        self.assertEqual({"1": STARTED}, journal.states)
+
+
+class BillingRunnerTest(BillingTestCase):
+    def setUp(self):
+        super(BillingRunnerTest, self).setUp()
+        self.service = mock.Mock(spec=OneClickPaymentService)
+        self.service.authorize.side_effect = self.authorize
+        self.errors = {}
+
+    def authorize(self, buy_order, tbk_user, username, amount):
+        if buy_order in self.errors:
+            raise self.errors[buy_order]
+        return mock.Mock(
+            spec=SoapResponse,
+            result={
+                "responseCode": 0 if amount < 1000 else -1,
+                "authorizationCode": "1213",
+                "transactionId": 1,
+            },
+        )
+
+    def charges(self, *buy_orders):
+        return [
+            {
+                "buy_order": buy_order,
+                "tbk_user": "user",
+                "username": "name",
+                "amount": 100,
+            }
+            for buy_order in buy_orders
+        ]
+
+    def run_billing(self, charges):
+        journal = CheckpointJournal(self.path, fsync_interval=0.001)
+        try:
+            results = BillingRunner(self.service, journal, concurrency=4).run(charges)
+            return dict((result.buy_order, result.status) for result in results)
+        finally:
+            journal.close()
+
+    def test_run(self):
+        charges = self.charges("1", "2", "3", "4")
+        charges[1]["amount"] = 5000
+        self.errors["3"] = SoapServerException("Invalid user", 1, None)
+        self.errors["4"] = SoapRequestException("timeout", None)
+
+        statuses = self.run_billing(charges)
+
+        self.assertEqual(
+            {"1": AUTHORIZED, "2": REJECTED, "3": FAILED, "4": UNCERTAIN}, statuses
+        )
+        records = self.read_journal()
+        self.assertEqual(8, len(records))
+        self.assertEqual(
+            [STARTED, AUTHORIZED],
+            [record["state"] for record in records if record["buy_order"] == "1"],
+        )
+
+    def test_resume(self):
+        self.errors["2"] = DeadlineExceeded("deadline", None)
+        self.run_billing(self.charges("1", "2"))
+        journal = CheckpointJournal(self.path)
+        journal.append("3", STARTED, durable=True)
+        journal.close()
+        del self.errors["2"]
+        self.service.authorize.reset_mock()
+
+        statuses = self.run_billing(self.charges("1", "2", "3", "4"))
+
+        self.assertEqual(
+            {"1": SKIPPED, "2": AUTHORIZED, "3": UNCERTAIN, "4": AUTHORIZED}, statuses
+        )
+        self.assertEqual(
+            ["2", "4"],
+            sorted(call[0][0] for call in self.service.authorize.call_args_list),
+        )
+
+    def test_not_sent(self):
+        self.errors["1"] = AdmissionRejected("overloaded", None)
+        self.errors["2"] = RequestorClosed("closed", None)
+        self.errors["3"] = DeadlineExceeded("deadline", None)
+
+        statuses = self.run_billing(self.charges("1", "2", "3"))
+
+        self.assertEqual({"1": NOT_SENT, "2": NOT_SENT, "3": NOT_SENT}, statuses)
+
+    def test_duplicated_buy_order(self):
+        statuses = []
+        journal = CheckpointJournal(self.path)
+        runner = BillingRunner(self.service, journal, concurrency=4)
+        for result in runner.run(self.charges("1", "1", "1")):
+            statuses.append(result.status)
+        journal.close()
+
+        self.assertEqual(1, self.service.authorize.call_count)
+        self.assertEqual([AUTHORIZED, SKIPPED, SKIPPED], sorted(statuses))
+        self.assertNotIn(NOT_SENT, statuses)
@@ -0,0 +1,91 @@
+import threading
+import time
+import unittest
+
+from tbk.soap.bulkhead import Bulkheads
+
+from .utils import mock
+
+
+class BulkheadsTest(unittest.TestCase):
+    def test_share(self):
+        bulkheads = Bulkheads(capacity=10, share=2, limit=2)
+
+        self.assertTrue(bulkheads.acquire("first"))
+        self.assertTrue(bulkheads.acquire("first"))
+        self.assertFalse(bulkheads.acquire("first", timeout=0))
+        self.assertTrue(bulkheads.acquire("second"))
+
+    def test_capacity(self):
+        bulkheads = Bulkheads(capacity=2, share=2)
+
+        self.assertTrue(bulkheads.acquire("first"))
+        self.assertTrue(bulkheads.acquire("second"))
+        self.assertFalse(bulkheads.acquire("third", timeout=0))
+        bulkheads.release("first")
+        self.assertTrue(bulkheads.acquire("third", timeout=0))
+
+    def test_borrow_keeps_share_of_active_commerces(self):
+        bulkheads = Bulkheads(capacity=4, share=1)
+        bulkheads.acquire("second")
+        bulkheads.release("second")
+
+        self.assertTrue(all(bulkheads.acquire("first", timeout=0) for _ in range(3)))
+        self.assertFalse(bulkheads.acquire("first", timeout=0))
+        self.assertTrue(bulkheads.acquire("second", timeout=0))
+
+        stats = bulkheads.stats()
+        self.assertEqual(3, stats["first"]["in_flight"])
+        self.assertEqual(2, stats["first"]["borrowed"])
+        self.assertEqual(1, stats["first"]["rejected"])
+        self.assertEqual(0.25, stats["first"]["saturation"])
+        self.assertEqual(0, stats["second"]["borrowed"])
+
+    @mock.patch("tbk.soap.bulkhead.clock", return_value=100.0)
+    def test_borrow_idle_share(self, clock):
+        bulkheads = Bulkheads(capacity=2, share=1, idle_after=60)
+        bulkheads.acquire("second")
+        bulkheads.release("second")
+        bulkheads.acquire("first")
+
+        self.assertFalse(bulkheads.acquire("first", timeout=0))
+        clock.return_value = 160.0
+        self.assertTrue(bulkheads.acquire("first", timeout=0))
+
+    def test_shares(self):
+        bulkheads = Bulkheads(capacity=10, share=1, limit=1, shares={"big": 3})
+
+        self.assertEqual(3, bulkheads.get_share("big"))
+        self.assertTrue(all(bulkheads.acquire("big", timeout=0) for _ in range(3)))
+        self.assertTrue(bulkheads.acquire("small", timeout=0))
+        self.assertFalse(bulkheads.acquire("small", timeout=0))
+
+    def test_wait(self):
+        bulkheads = Bulkheads(capacity=1, share=1)
+        bulkheads.acquire("first")
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(bulkheads.acquire("second", timeout=5))
+        )
+        thread.start()
+        for _ in range(500):
+            if bulkheads.stats()["second"]["waiting"]:
+                break
+            time.sleep(0.01)
+
+        bulkheads.release("first")
+        thread.join()
+
+        self.assertEqual([True], results)
+        stats = bulkheads.stats()["second"]
+        self.assertEqual(1, stats["waited"])
+        self.assertGreater(stats["max_wait"], 0)
+        self.assertEqual(1.0, stats["saturation"])
+
+    def test_wait_timeout(self):
+        bulkheads = Bulkheads(capacity=1, share=1)
+        bulkheads.acquire("first")
+
+        self.assertFalse(bulkheads.acquire("second", timeout=0.01))
+        self.assertEqual(0, bulkheads.stats()["second"]["waiting"])
+        self.assertEqual(1, bulkheads.stats()["second"]["rejected"])
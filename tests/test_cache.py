@@ -0,0 +1,133 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from tbk.cache import FileCache, RedisCache, TTLCache, make_key
+
+from .utils import FakeRedis, mock
+
+
+@mock.patch("tbk.cache.clock", return_value=100.0)
+class TTLCacheTest(unittest.TestCase):
+    def test_get_set(self, clock):
+        cache = TTLCache(ttl=10)
+        cache.set("key", "value")
+
+        self.assertEqual("value", cache.get("key"))
+        self.assertIsNone(cache.get("missing"))
+        self.assertEqual({"hits": 1, "misses": 1, "size": 1}, cache.stats())
+
+    def test_expiration(self, clock):
+        cache = TTLCache(ttl=10)
+        cache.set("key", "value")
+
+        clock.return_value = 110.0
+        self.assertIsNone(cache.get("key"))
+        self.assertEqual(0, len(cache))
+
+    def test_lru_eviction(self, clock):
+        cache = TTLCache(maxsize=2)
+        cache.set("first", 1)
+        cache.set("second", 2)
+        cache.get("first")
+        cache.set("third", 3)
+
+        self.assertEqual(1, cache.get("first"))
+        self.assertIsNone(cache.get("second"))
+        self.assertEqual(3, cache.get("third"))
+
+    def test_delete(self, clock):
+        cache = TTLCache()
+        cache.set("key", "value")
+        cache.delete("key")
+
+        self.assertIsNone(cache.get("key"))
+
+
+class MakeKeyTest(unittest.TestCase):
+    def test_make_key(self):
+        self.assertEqual(make_key(("token", 1)), make_key(["token", 1]))
+        self.assertNotEqual(make_key(("token", 1)), make_key(("token", "1")))
+        self.assertEqual(40, len(make_key(("token",))))
+
+
+@mock.patch("tbk.cache.time.time", return_value=100.0)
+class FileCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_get_set(self, time):
+        cache = FileCache(self.directory, ttl=10)
+        cache.set(("key",), {"result": [1, 2]})
+
+        self.assertEqual({"result": [1, 2]}, cache.get(("key",)))
+        self.assertEqual({"result": [1, 2]}, FileCache(self.directory).get(("key",)))
+        self.assertIsNone(cache.get(("missing",)))
+        self.assertEqual({"hits": 1, "misses": 1}, cache.stats())
+
+    def test_expiration(self, time):
+        cache = FileCache(self.directory, ttl=10)
+        cache.set(("key",), "value")
+        cache.set(("other",), "value", ttl=20)
+
+        time.return_value = 110.0
+        self.assertIsNone(cache.get(("key",)))
+        self.assertEqual("value", cache.get(("other",)))
+        self.assertEqual(1, len(os.listdir(self.directory)))
+
+    def test_delete_and_clear(self, time):
+        cache = FileCache(self.directory)
+        cache.set(("key",), "value")
+        cache.set(("other",), "value")
+
+        cache.delete(("key",))
+        cache.delete(("missing",))
+        self.assertIsNone(cache.get(("key",)))
+        cache.clear()
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_corrupted_entry(self, time):
+        cache = FileCache(self.directory)
+        with open(cache.get_path(("key",)), "wb") as file:
+            file.write(b"corrupted")
+
+        self.assertEqual("default", cache.get(("key",), "default"))
+
+
+class RedisCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeRedis()
+
+    def test_get_set(self):
+        cache = RedisCache(self.client, ttl=10)
+        cache.set(("key",), {"result": [1, 2]})
+
+        self.assertEqual({"result": [1, 2]}, cache.get(("key",)))
+        self.assertEqual({"result": [1, 2]}, RedisCache(self.client).get(("key",)))
+        self.assertIsNone(cache.get(("missing",)))
+        self.assertEqual({"hits": 1, "misses": 1}, cache.stats())
+        self.assertTrue(all(name.startswith("tbk:") for name in self.client.data))
+
+    def test_expiration(self):
+        cache = RedisCache(self.client, ttl=10)
+        cache.set(("key",), "value")
+        cache.set(("other",), "value", ttl=0.5)
+
+        self.client.now = 5
+        self.assertEqual("value", cache.get(("key",)))
+        self.assertIsNone(cache.get(("other",)))
+
+    def test_delete_and_clear(self):
+        cache = RedisCache(self.client, prefix="app:")
+        other = RedisCache(self.client, prefix="other:")
+        cache.set(("key",), "value")
+        cache.set(("second",), "value")
+        other.set(("key",), "value")
+
+        cache.delete(("key",))
+        self.assertIsNone(cache.get(("key",)))
+        cache.clear()
+        self.assertIsNone(cache.get(("second",)))
+        self.assertEqual("value", other.get(("key",)))
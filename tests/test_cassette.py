@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests_mock
+from lxml import etree
+
+from tbk.soap.cassette import Cassette, CassetteMiss, CassetteTransport
+from tbk.soap.exceptions import InvalidSignatureResponse, SoapRequestException
+from tbk.soap.requestor import SoapRequest
+from tbk.soap.utils import load_key_from_data
+from tbk.soap.wsse import sign_envelope
+from tbk.soap.zeep_client import ZeepSoapClient
+
+from .utils import get_fixture_data, get_fixture_url, get_xml_envelope, mock
+
+ADDRESS = "https://webpay3g.transbank.cl:443/WSWebpayTransaction/cxf/WSWebpayService"
+
+
+def create_signed_response():
+    # signed with the commerce key so the commerce certificate verifies it
+    envelope = get_xml_envelope("bare.acknowledgeTransaction.response.xml")
+    sign_envelope(
+        envelope,
+        load_key_from_data(
+            get_fixture_data("597020000547.key"), get_fixture_data("597020000547.crt")
+        ),
+    )
+    return etree.tostring(envelope)
+
+
+def create_request(token):
+    return SoapRequest("acknowledgeTransaction", (token,), {})
+
+
+class CassetteTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "cassette.jsonl")
+
+    def create_client(self, cassette):
+        return ZeepSoapClient(
+            get_fixture_url("WsWebpayService.wsdl"),
+            get_fixture_data("597020000547.key"),
+            get_fixture_data("597020000547.crt"),
+            get_fixture_data("597020000547.crt"),
+            http_backend=cassette.transport,
+        )
+
+    def record(self):
+        client = self.create_client(Cassette(self.path, mode="record"))
+        with requests_mock.Mocker() as requests:
+            requests.register_uri("POST", ADDRESS, content=create_signed_response())
+            client.request(create_request("token"))
+            client.request(create_request("token"))
+        return requests
+
+    def read_lines(self):
+        with open(self.path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_record(self):
+        requests = self.record()
+
+        self.assertEqual(2, requests.call_count)
+        interactions = self.read_lines()
+        self.assertEqual(2, len(interactions))
+        self.assertEqual(interactions[0]["key"], interactions[1]["key"])
+        self.assertEqual(ADDRESS, interactions[0]["address"])
+        self.assertEqual(200, interactions[0]["status"])
+
+    def test_replay(self):
+        self.record()
+        client = self.create_client(Cassette(self.path))
+        self.assertIsInstance(client.transport, CassetteTransport)
+
+        # no http mock: any request reaching the network would fail
+        for _ in range(3):
+            result, sent, received = client.request(create_request("token"))
+            self.assertIsNone(result)
+            self.assertIn(b"acknowledgeTransactionResponse", received)
+            self.assertIn(b"Signature", sent)
+
+    def test_replay_verifies_signature(self):
+        self.record()
+        with open(self.path) as file:
+            content = file.read()
+        with open(self.path, "w") as file:
+            file.write(content.replace("TransactionResponse", "TransactionResponsf"))
+        client = self.create_client(Cassette(self.path))
+
+        with self.assertRaises(InvalidSignatureResponse):
+            client.request(create_request("token"))
+
+    def test_replay_miss(self):
+        self.record()
+        client = self.create_client(Cassette(self.path))
+
+        with self.assertRaises(SoapRequestException) as context:
+            client.request(create_request("other"))
+
+        self.assertIsInstance(context.exception.error, CassetteMiss)
+
+    @mock.patch("tbk.soap.cassette.time.sleep")
+    def test_replay_latency(self, sleep):
+        self.record()
+        elapsed = self.read_lines()[0]["elapsed"]
+        client = self.create_client(Cassette(self.path, latency=2.0))
+
+        client.request(create_request("token"))
+
+        sleep.assert_called_once_with(elapsed * 2.0)
+
+    def test_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            Cassette(self.path, mode="invalid")
@@ -0,0 +1,132 @@
+from __future__ import unicode_literals
+
+import io
+import json
+import unittest
+
+from tbk import cli
+from tbk.services import CommerceIntegrationService
+from tbk.soap import SoapResponse
+
+from .utils import mock
+
+
+class OperationTest(unittest.TestCase):
+    def test_parse(self):
+        operation = cli.Operation.parse(
+            3, '{"service": "oneclick", "method": "remove_user", "args": ["u", "n"]}'
+        )
+
+        self.assertEqual("oneclick", operation.service_name)
+        self.assertEqual("remove_user", operation.method_name)
+        self.assertEqual(["u", "n"], operation.args)
+        self.assertEqual({}, operation.kwargs)
+
+    def test_parse_default_service(self):
+        operation = cli.Operation.parse(
+            1, '{"method": "capture"}', default_service="commerce_integration"
+        )
+
+        self.assertEqual("commerce_integration", operation.service_name)
+
+    def test_parse_invalid(self):
+        for line in (
+            "not json",
+            "[]",
+            '{"service": "unknown", "method": "capture"}',
+            '{"service": "webpay", "method": "capture"}',
+            '{"service": "webpay", "method": "get_wsdl_url_for_environment"}',
+            '{"service": "webpay", "method": "__init__"}',
+        ):
+            with self.assertRaises(cli.InvalidOperation):
+                cli.Operation.parse(1, line)
+
+
+class RunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.service = mock.Mock(spec=CommerceIntegrationService)
+        self.service.capture.return_value = mock.Mock(
+            spec=SoapResponse, result={"token": "token"}
+        )
+        self.service.nullify.side_effect = ValueError("nullify failed")
+        self.service_class = mock.Mock(
+            spec=CommerceIntegrationService, return_value=self.service
+        )
+        patcher = mock.patch.dict(
+            cli.SERVICES, {"commerce_integration": self.service_class}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_run(self):
+        runner = cli.Runner(mock.Mock(), concurrency=2, rate=100)
+        lines = [
+            '{"service": "commerce_integration", "method": "capture",'
+            ' "kwargs": {"authorization_code": "1", "capture_amount": 10,'
+            ' "buy_order": "o"}}',
+            "\n",
+            '{"service": "commerce_integration", "method": "nullify",'
+            ' "args": ["1", 10, "o", 10]}',
+            "{",
+        ]
+
+        results = sorted(runner.run(lines), key=lambda result: result["line"])
+
+        self.assertEqual([1, 3, 4], [result["line"] for result in results])
+        self.assertEqual([True, False, False], [result["ok"] for result in results])
+        self.assertEqual({"token": "token"}, results[0]["result"])
+        self.service.capture.assert_called_once_with(
+            authorization_code="1", capture_amount=10, buy_order="o"
+        )
+        self.service_class.assert_called_once_with(
+            runner.commerce, requestor_kwargs=runner.requestor_kwargs
+        )
+        self.assertIn("rate_limiter", runner.requestor_kwargs)
+        self.assertEqual(2, len(runner.latencies))
+
+    @mock.patch("tbk.cli.Commerce")
+    def test_main(self, commerce_class):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        input_path = self.id() + ".jsonl"
+        with mock.patch("tbk.cli.argparse.FileType") as file_type:
+            file_type.return_value.return_value = io.StringIO(
+                '{"method": "capture", "args": ["1", 10, "o"]}\n'
+            )
+            exit_code = cli.main(
+                [
+                    "--commerce-code=597020000541",
+                    "--key-file=key",
+                    "--cert-file=cert",
+                    "--tbk-cert-file=tbk",
+                    "--service=commerce_integration",
+                    input_path,
+                ],
+                stdout=stdout,
+                stderr=stderr,
+            )
+
+        self.assertEqual(0, exit_code)
+        self.assertTrue(json.loads(stdout.getvalue())["ok"])
+        summary = json.loads(stderr.getvalue())
+        self.assertEqual(1, summary["operations"])
+        self.assertEqual(0, summary["errors"])
+        commerce_class.init_from_files.assert_called_once_with(
+            "597020000541", "key", "cert", "tbk", "DEVELOPMENT", key_password=None
+        )
+
+
+class SummarizeTest(unittest.TestCase):
+    def test_summarize(self):
+        summary = cli.summarize(100, 2, 4.0, [float(value) for value in range(100)])
+
+        self.assertEqual(25.0, summary["throughput"])
+        self.assertEqual(50.0, summary["latency"]["p50"])
+        self.assertEqual(98.0, summary["latency"]["p99"])
+        self.assertEqual(99.0, summary["latency"]["max"])
+
+    def test_summarize_empty(self):
+        summary = cli.summarize(0, 0, 0, [])
+
+        self.assertIsNone(summary["throughput"])
+        self.assertIsNone(summary["latency"]["p50"])
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from tbk.commerce import Commerce, CredentialsWatcher
+from tbk.soap.soap_client import SoapClient
+
+from .utils import mock, get_fixture_filepath
+
+
+class CommerceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.files = []
+        for filename in ("597020000547.key", "597020000547.crt", "tbk.pem"):
+            path = os.path.join(self.directory, filename)
+            shutil.copy(get_fixture_filepath(filename), path)
+            self.files.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def rewrite(self, path, data):
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def read(self, filename):
+        with open(get_fixture_filepath(filename), "rb") as file:
+            return file.read()
+
+
+class CommerceTest(CommerceTestCase):
+    def test_init_from_files(self):
+        commerce = Commerce.init_from_files(
+            "597020000547", *(self.files + ["DEVELOPMENT"])
+        )
+
+        with open(self.files[0], "rb") as key_file:
+            self.assertEqual(key_file.read(), commerce.key_data)
+        self.assertIsNone(commerce.credentials_watcher)
+
+    def test_init_from_files_watched(self):
+        commerce = Commerce.init_from_files(
+            "597020000547", *(self.files + ["DEVELOPMENT"]), watch_interval=60
+        )
+        self.addCleanup(commerce.credentials_watcher.stop)
+
+        self.assertIsInstance(commerce.credentials_watcher, CredentialsWatcher)
+        self.assertIs(commerce, commerce.credentials_watcher.commerce)
+
+
+class CredentialsWatcherTest(CommerceTestCase):
+    def setUp(self):
+        super(CredentialsWatcherTest, self).setUp()
+        self.commerce = Commerce.init_from_files(
+            "597020000547", *(self.files + ["DEVELOPMENT"]), key_password="secret"
+        )
+        self.watcher = CredentialsWatcher(self.commerce, *self.files)
+        self.client = mock.Mock(spec=SoapClient)
+        self.watcher.subscribe(self.client)
+
+    def test_check_unchanged(self):
+        self.assertFalse(self.watcher.check())
+        self.client.update_credentials.assert_not_called()
+
+    def test_check_changed(self):
+        new_tbk_cert = self.read("597020000547.crt")
+        self.rewrite(self.files[2], new_tbk_cert)
+
+        # the change is loaded once the files are found unchanged
+        self.assertFalse(self.watcher.check())
+        self.client.update_credentials.assert_not_called()
+        self.assertTrue(self.watcher.check())
+        self.assertFalse(self.watcher.check())
+
+        self.client.update_credentials.assert_called_once_with(
+            self.commerce.key_data,
+            self.commerce.cert_data,
+            new_tbk_cert,
+            password="secret",
+        )
+        self.assertEqual(new_tbk_cert, self.commerce.tbk_cert_data)
+        self.assertEqual(1, self.watcher.reloads)
+
+    def test_check_rotation_in_progress(self):
+        self.rewrite(self.files[2], self.read("597020000547.crt"))
+        self.assertFalse(self.watcher.check())
+        self.rewrite(self.files[2], self.read("597020000547.crt") + b"\n")
+
+        self.assertFalse(self.watcher.check())
+        self.client.update_credentials.assert_not_called()
+        self.assertTrue(self.watcher.check())
+
+    def test_check_mismatched_pair(self):
+        # a new certificate written before its key
+        self.rewrite(self.files[1], self.read("tbk.pem"))
+
+        self.assertFalse(self.watcher.check())
+        self.assertFalse(self.watcher.check())
+
+        self.client.update_credentials.assert_not_called()
+        self.assertEqual(self.read("597020000547.crt"), self.commerce.cert_data)
+        self.assertEqual(0, self.watcher.reloads)
+
+    def test_check_broken_key(self):
+        self.rewrite(self.files[0], b"broken key")
+
+        self.assertFalse(self.watcher.check())
+        self.assertFalse(self.watcher.check())
+
+        self.client.update_credentials.assert_not_called()
+        self.assertNotEqual(b"broken key", self.commerce.key_data)
+
+    def test_check_rejected(self):
+        new_tbk_cert = self.read("597020000547.crt")
+        old_tbk_cert = self.commerce.tbk_cert_data
+        other_client = mock.Mock(spec=SoapClient)
+        other_client.update_credentials.side_effect = [ValueError("rejected"), None]
+        self.watcher._clients.clear()
+        self.watcher.subscribe(self.client)
+        self.watcher.subscribe(other_client)
+        self.rewrite(self.files[2], new_tbk_cert)
+        self.watcher.check()
+
+        self.assertFalse(self.watcher.check())
+
+        # the client updated before the failure got the previous credentials back
+        updated = [
+            call[0][2]
+            for client in (self.client, other_client)
+            for call in client.update_credentials.call_args_list
+        ]
+        self.assertEqual(old_tbk_cert, self.commerce.tbk_cert_data)
+        self.assertEqual(updated.count(new_tbk_cert), updated.count(old_tbk_cert) + 1)
+
+        self.assertTrue(self.watcher.check())
+        self.assertEqual(new_tbk_cert, self.commerce.tbk_cert_data)
+
+    def test_start_stop(self):
+        self.watcher.interval = 0.01
+        self.rewrite(self.files[2], self.read("597020000547.crt"))
+
+        self.watcher.start()
+        for _ in range(100):
+            if self.watcher.reloads:
+                break
+            self.watcher._stop.wait(0.01)
+        self.watcher.stop()
+
+        self.assertEqual(1, self.watcher.reloads)
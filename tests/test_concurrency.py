@@ -0,0 +1,76 @@
+import threading
+import time
+import unittest
+
+from tbk.concurrency import imap
+
+
+class IMapTest(unittest.TestCase):
+    def test_results(self):
+        outcomes = list(imap(lambda item: item * 2, range(20), concurrency=4))
+
+        self.assertEqual(
+            list(range(0, 40, 2)), sorted(outcome.result for outcome in outcomes)
+        )
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+
+    def test_ordered(self):
+        def slow_first(item):
+            if item == 0:
+                time.sleep(0.05)
+            return item
+
+        outcomes = imap(slow_first, range(10), concurrency=4, ordered=True)
+
+        self.assertEqual(list(range(10)), [outcome.result for outcome in outcomes])
+
+    def test_errors_per_item(self):
+        def function(item):
+            if item % 2:
+                raise ValueError(item)
+            return item
+
+        outcomes = sorted(imap(function, range(6)), key=lambda outcome: outcome.index)
+
+        self.assertEqual([True, False] * 3, [outcome.ok for outcome in outcomes])
+        self.assertIsInstance(outcomes[1].error, ValueError)
+        self.assertEqual(1, outcomes[1].item)
+
+    def test_concurrency(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def function(item):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        list(imap(function, range(30), concurrency=3))
+
+        self.assertEqual(3, running[1])
+
+    def test_lazy_input(self):
+        consumed = []
+
+        def items():
+            for item in range(1000):
+                consumed.append(item)
+                yield item
+
+        outcomes = imap(lambda item: item, items(), concurrency=2, window=4)
+        next(outcomes)
+        time.sleep(0.05)
+        outcomes.close()
+
+        self.assertLess(len(consumed), 10)
+
+    def test_input_error(self):
+        def items():
+            yield 1
+            raise KeyError("broken input")
+
+        with self.assertRaises(KeyError):
+            list(imap(lambda item: item, items()))
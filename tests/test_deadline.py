@@ -0,0 +1,31 @@
+import unittest
+
+from tbk.soap.deadline import Deadline
+
+from .utils import mock
+
+
+@mock.patch("tbk.soap.deadline.clock")
+class DeadlineTest(unittest.TestCase):
+    def test_remaining(self, clock):
+        clock.return_value = 100.0
+        deadline = Deadline(10)
+
+        clock.return_value = 104.0
+        self.assertEqual(6.0, deadline.remaining())
+        self.assertFalse(deadline.expired)
+
+        clock.return_value = 111.0
+        self.assertEqual(0.0, deadline.remaining())
+        self.assertTrue(deadline.expired)
+
+    def test_get_timeout(self, clock):
+        clock.return_value = 100.0
+        deadline = Deadline(10, connect_timeout=2)
+
+        clock.return_value = 101.0
+        self.assertEqual((2, 9.0), deadline.get_timeout())
+        self.assertEqual((2, 5), deadline.get_timeout(5))
+
+        clock.return_value = 109.5
+        self.assertEqual((0.5, 0.5), deadline.get_timeout())
@@ -0,0 +1,120 @@
+import unittest
+
+import requests_mock
+
+from tbk.commerce import Commerce
+from tbk.diagnostics import (
+    Footprint,
+    footprint,
+    is_available,
+    request_footprint,
+    service_footprint,
+)
+from tbk.services import WebpayService
+from tbk.soap import create_soap_requestor
+from tbk.soap.static_client import StaticSoapClient
+
+from .test_static_client import TRANSACTION_RESULT_RESPONSE
+from .utils import get_fixture_data, get_fixture_url, mock
+
+# agreed limits in bytes, raise them only knowingly. Measured on CPython 3.11:
+# zeep service 150 KiB, static service 15 KiB, request peak 40 KiB and
+# retained 15 KiB; the headroom absorbs other allocators and python versions
+ZEEP_SERVICE_BUDGET = 1024 * 1024
+STATIC_SERVICE_BUDGET = 128 * 1024
+REQUEST_PEAK_BUDGET = 512 * 1024
+REQUEST_RETAINED_BUDGET = 128 * 1024
+
+
+@unittest.skipUnless(is_available(), "tracemalloc is not available")
+class FootprintTest(unittest.TestCase):
+    def test_retained(self):
+        report = footprint(bytearray, 1024 * 1024)
+
+        self.assertIsInstance(report, Footprint)
+        self.assertGreaterEqual(report.retained, 1024 * 1024)
+        self.assertGreaterEqual(report.peak, 1024 * 1024)
+        self.assertTrue(report.statistics)
+
+    def test_peak(self):
+        report = footprint(lambda: len(bytearray(1024 * 1024)))
+
+        self.assertLess(report.retained, 64 * 1024)
+        self.assertGreaterEqual(report.peak, 1024 * 1024)
+
+    def test_as_dict(self):
+        report = Footprint(10, 20, [("file.py", 10)])
+
+        self.assertEqual(
+            {"retained": 10, "peak": 20, "statistics": [("file.py", 10)]},
+            report.as_dict(),
+        )
+
+
+@unittest.skipUnless(is_available(), "tracemalloc is not available")
+class BudgetTest(unittest.TestCase):
+    """Fail when a change makes services or requests more expensive."""
+
+    def setUp(self):
+        self.commerce = Commerce(
+            "597020000547",
+            get_fixture_data("597020000547.key"),
+            get_fixture_data("597020000547.crt"),
+            get_fixture_data("tbk.pem"),
+            "PRODUCTION",
+        )
+        self.wsdl_url = get_fixture_url("WsWebpayService.wsdl")
+
+    def measure(self, measurement, *args, **kwargs):
+        # the first call pays for imports and caches
+        measurement(*args, **kwargs)
+        return measurement(*args, **kwargs)
+
+    def create_zeep_service(self):
+        return WebpayService(
+            self.commerce,
+            soap_requestor=create_soap_requestor(self.wsdl_url, self.commerce),
+        )
+
+    def test_zeep_service(self):
+        report = self.measure(footprint, self.create_zeep_service)
+
+        self.assertLess(report.retained, ZEEP_SERVICE_BUDGET, report.statistics)
+
+    def test_static_service(self):
+        report = self.measure(
+            service_footprint,
+            WebpayService,
+            self.commerce,
+            client_class=StaticSoapClient,
+        )
+
+        self.assertLess(report.retained, STATIC_SERVICE_BUDGET, report.statistics)
+
+    def test_static_service_lighter(self):
+        zeep_report = self.measure(footprint, self.create_zeep_service)
+        static_report = self.measure(
+            service_footprint,
+            WebpayService,
+            self.commerce,
+            client_class=StaticSoapClient,
+        )
+
+        self.assertLess(static_report.retained * 2, zeep_report.retained)
+
+    @mock.patch("tbk.soap.zeep_client.verify_envelope", return_value=True)
+    def test_request(self, __):
+        for service in (
+            self.create_zeep_service(),
+            WebpayService(self.commerce, client_class=StaticSoapClient),
+        ):
+            with requests_mock.Mocker() as requests:
+                requests.register_uri(
+                    "POST", requests_mock.ANY, content=TRANSACTION_RESULT_RESPONSE
+                )
+                report = self.measure(
+                    request_footprint, service, "get_transaction_result", "token"
+                )
+
+            self.assertLess(report.peak, REQUEST_PEAK_BUDGET, report.statistics)
+            self.assertLess(report.retained, REQUEST_RETAINED_BUDGET, report.statistics)
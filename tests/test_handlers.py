@@ -0,0 +1,289 @@
+import io
+import threading
+import unittest
+from wsgiref.util import setup_testing_defaults
+
+from tbk.handlers import (
+    Response,
+    ReturnOutcome,
+    WebpayReturnHandler,
+    WSGIAdapter,
+    parse_form,
+)
+from tbk.services import WebpayService
+from tbk.soap.exceptions import SoapRequestException, SoapServerException
+
+from .utils import mock
+
+try:
+    import asyncio
+    from tbk.asgi import ASGIAdapter
+except (ImportError, SyntaxError):  # pragma: no cover
+    asyncio = None
+
+RESULT = {
+    "buyOrder": "12345",
+    "urlRedirection": "https://webpay3gint.transbank.cl/webpayserver/voucher.cgi",
+    "detailOutput": [{"responseCode": 0, "amount": 1000}],
+}
+
+
+class WebpayReturnHandlerTest(unittest.TestCase):
+    def setUp(self):
+        self.service = mock.Mock(spec=WebpayService)
+        self.service.get_transaction_result.return_value = mock.Mock(result=RESULT)
+        self.handler = WebpayReturnHandler(self.service)
+
+    def test_handle_return(self):
+        response = self.handler.handle_return({"token_ws": "token"})
+
+        self.assertEqual(200, response.status)
+        self.assertIn(b'action="https://webpay3gint.transbank.cl/', response.body)
+        self.assertIn(b'name="token_ws" value="token"', response.body)
+        self.service.get_transaction_result.assert_called_once_with("token")
+        self.service.acknowledge_transaction.assert_called_once_with("token")
+
+    def test_handle_return_repeated(self):
+        first = self.handler.finish("token")
+        second = self.handler.finish("token")
+
+        self.assertIs(first, second)
+        self.assertTrue(first.approved)
+        self.assertEqual(1, self.service.get_transaction_result.call_count)
+        self.assertEqual(1, self.service.acknowledge_transaction.call_count)
+
+    def test_handle_return_concurrent(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def get_transaction_result(token):
+            started.set()
+            release.wait(5)
+            return mock.Mock(result=RESULT)
+
+        self.service.get_transaction_result.side_effect = get_transaction_result
+        outcomes = []
+        threads = [
+            threading.Thread(
+                target=lambda: outcomes.append(self.handler.finish("token"))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(5, len(outcomes))
+        self.assertEqual(1, len(set(map(id, outcomes))))
+        self.assertEqual(1, self.service.acknowledge_transaction.call_count)
+
+    def test_handle_return_rejected(self):
+        self.service.get_transaction_result.return_value = mock.Mock(
+            result=dict(RESULT, detailOutput=[{"responseCode": -1}])
+        )
+
+        response = self.handler.handle_return({"token_ws": "token"})
+
+        self.assertIn(b"Payment rejected", response.body)
+
+    def test_handle_return_error(self):
+        error = SoapServerException("Invalid token", 274, None)
+        self.service.acknowledge_transaction.side_effect = error
+
+        outcome = self.handler.finish("token")
+
+        self.assertIs(error, outcome.error)
+        self.assertFalse(outcome.acknowledged)
+        self.assertFalse(outcome.approved)
+        self.assertEqual(RESULT, outcome.result)
+
+    def test_handle_return_connection_error(self):
+        self.service.get_transaction_result.side_effect = [
+            SoapRequestException("timeout", None),
+            mock.Mock(result=RESULT),
+        ]
+
+        response = self.handler.handle_return({"token_ws": "token"})
+        outcome = self.handler.finish("token")
+
+        self.assertIn(b"Payment pending", response.body)
+        self.assertTrue(outcome.approved)
+        self.assertEqual(2, self.service.get_transaction_result.call_count)
+
+    def test_handle_return_aborted(self):
+        response = self.handler.handle_return(
+            {"TBK_TOKEN": "token", "TBK_ORDEN_COMPRA": "12345"}
+        )
+
+        self.assertIn(b"Payment cancelled", response.body)
+        self.service.get_transaction_result.assert_not_called()
+
+    def test_handle_missing_token(self):
+        self.assertEqual(400, self.handler.handle_return({}).status)
+        self.assertEqual(400, self.handler.handle_final({}).status)
+
+    def test_handle_final(self):
+        render_final = mock.Mock(return_value=Response(body="final"))
+        handler = WebpayReturnHandler(self.service, render_final=render_final)
+        outcome = handler.finish("token")
+
+        response = handler.handle_final({"token_ws": "token"})
+
+        self.assertEqual(b"final", response.body)
+        render_final.assert_called_once_with(outcome)
+
+    def test_handle_final_unknown_token(self):
+        response = self.handler.handle_final({"token_ws": "token"})
+
+        self.assertIn(b"Payment pending", response.body)
+        self.assertNotIn(b"rejected", response.body)
+        self.service.get_transaction_result.assert_not_called()
+
+
+class ReturnOutcomeTest(unittest.TestCase):
+    def test_approved(self):
+        self.assertTrue(ReturnOutcome("token", RESULT, acknowledged=True).approved)
+        self.assertFalse(ReturnOutcome("token", RESULT).approved)
+        self.assertFalse(ReturnOutcome("token", aborted=True).approved)
+        self.assertIsNone(ReturnOutcome("token").buy_order)
+
+    def test_definitive(self):
+        self.assertTrue(ReturnOutcome("token", RESULT, acknowledged=True).definitive)
+        self.assertTrue(ReturnOutcome("token", aborted=True).definitive)
+        self.assertTrue(
+            ReturnOutcome("token", error=SoapServerException("", 274, None)).definitive
+        )
+        self.assertFalse(
+            ReturnOutcome("token", error=SoapRequestException("", None)).definitive
+        )
+        self.assertFalse(ReturnOutcome("token").definitive)
+
+
+class ParseFormTest(unittest.TestCase):
+    def test_parse_form(self):
+        self.assertEqual(
+            {"token_ws": "token", "other": "1"},
+            parse_form(b"token_ws=token&token_ws=other", "other=1&token_ws=query"),
+        )
+
+
+class WSGIAdapterTest(unittest.TestCase):
+    def call(self, app, method="POST", body=b""):
+        environ = {
+            "REQUEST_METHOD": method,
+            "CONTENT_LENGTH": str(len(body)),
+            "CONTENT_TYPE": "application/x-www-form-urlencoded",
+            "wsgi.input": io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        start_response = mock.Mock()
+        body = b"".join(app(environ, start_response))
+        return start_response.call_args[0], body
+
+    def test_call(self):
+        handle = mock.Mock(return_value=Response(body="done"))
+
+        (status, headers), body = self.call(WSGIAdapter(handle), body=b"token_ws=abc")
+
+        handle.assert_called_once_with({"token_ws": "abc"})
+        self.assertEqual("200 OK", status)
+        self.assertEqual([("Content-Type", "text/html; charset=utf-8")], headers)
+        self.assertEqual(b"done", body)
+
+    def test_method_not_allowed(self):
+        handle = mock.Mock()
+
+        (status, _), _ = self.call(WSGIAdapter(handle), method="PUT")
+
+        self.assertEqual("405 Method Not Allowed", status)
+        handle.assert_not_called()
+
+
+@unittest.skipIf(asyncio is None, "asyncio is not available")
+class ASGIAdapterTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.sent = []
+
+    def tearDown(self):
+        self.loop.close()
+
+    def call(self, app, messages, method="POST"):
+        # plain callables returning futures keep this module valid python 2
+        messages = list(messages)
+
+        def receive():
+            return self.resolved(messages.pop(0))
+
+        def send(message):
+            self.sent.append(message)
+            return self.resolved(None)
+
+        scope = {"type": "http", "method": method, "query_string": b""}
+        return self.loop.create_task(app(scope, receive, send))
+
+    def resolved(self, value):
+        future = self.loop.create_future()
+        future.set_result(value)
+        return future
+
+    def test_call(self):
+        handle = mock.Mock(return_value=Response(body="done"))
+        app = ASGIAdapter(handle, max_workers=2)
+
+        self.loop.run_until_complete(
+            self.call(
+                app,
+                [
+                    {"type": "http.request", "body": b"token_", "more_body": True},
+                    {"type": "http.request", "body": b"ws=abc"},
+                ],
+            )
+        )
+        app.executor.shutdown()
+
+        handle.assert_called_once_with({"token_ws": "abc"})
+        self.assertEqual(
+            [
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"text/html; charset=utf-8")],
+                },
+                {"type": "http.response.body", "body": b"done"},
+            ],
+            self.sent,
+        )
+
+    def test_method_not_allowed(self):
+        handle = mock.Mock()
+        app = ASGIAdapter(handle, max_workers=1)
+
+        self.loop.run_until_complete(self.call(app, [], method="PUT"))
+        app.executor.shutdown()
+
+        self.assertEqual(405, self.sent[0]["status"])
+        handle.assert_not_called()
+
+    def test_concurrent_requests_do_not_block_the_loop(self):
+        barrier = threading.Barrier(3)
+
+        def handle(form):
+            # all three calls must be running at the same time
+            barrier.wait(5)
+            return Response(body=form["token_ws"])
+
+        app = ASGIAdapter(handle, max_workers=3)
+        tasks = [
+            self.call(app, [{"type": "http.request", "body": b"token_ws=" + token}])
+            for token in (b"a", b"b", b"c")
+        ]
+
+        self.loop.run_until_complete(asyncio.wait(tasks))
+        app.executor.shutdown()
+
+        bodies = [m["body"] for m in self.sent if m["type"] == "http.response.body"]
+        self.assertEqual([b"a", b"b", b"c"], sorted(bodies))
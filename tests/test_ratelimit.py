@@ -0,0 +1,77 @@
+import unittest
+
+from tbk.soap.ratelimit import RateLimiter, TokenBucket
+
+from .utils import mock
+
+
+@mock.patch("tbk.soap.ratelimit.time.sleep")
+@mock.patch("tbk.soap.ratelimit.clock", return_value=100.0)
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_wait(self, clock, sleep):
+        bucket = TokenBucket(rate=2, capacity=2)
+
+        self.assertEqual([0.0, 0.0, 0.5, 1.0], [bucket.reserve() for _ in range(4)])
+
+    def test_refill(self, clock, sleep):
+        bucket = TokenBucket(rate=2, capacity=2)
+        bucket.reserve()
+        bucket.reserve()
+
+        clock.return_value = 101.0
+        self.assertEqual(0.0, bucket.reserve())
+        self.assertEqual(0.0, bucket.reserve())
+        self.assertEqual(0.5, bucket.reserve())
+
+    def test_acquire_sleeps(self, clock, sleep):
+        bucket = TokenBucket(rate=4, capacity=1)
+
+        self.assertTrue(bucket.acquire())
+        self.assertTrue(bucket.acquire())
+
+        sleep.assert_called_once_with(0.25)
+        self.assertEqual(0.25, bucket.stats()["max_wait"])
+
+    def test_acquire_timeout(self, clock, sleep):
+        bucket = TokenBucket(rate=1, capacity=1)
+        bucket.acquire()
+
+        self.assertFalse(bucket.acquire(timeout=0.5))
+        self.assertTrue(bucket.acquire(timeout=1))
+        self.assertEqual(1, bucket.rejected)
+
+    def test_acquire_async(self, clock, sleep):
+        import asyncio
+
+        bucket = TokenBucket(rate=1000, capacity=1)
+        bucket.reserve()
+
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertTrue(loop.run_until_complete(bucket.acquire_async()))
+            self.assertFalse(loop.run_until_complete(bucket.acquire_async(0)))
+        finally:
+            loop.close()
+        sleep.assert_not_called()
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_no_limit(self):
+        limiter = RateLimiter()
+
+        self.assertIsNone(limiter.get_bucket("code", "authorize"))
+        self.assertTrue(limiter.acquire("code", "authorize"))
+
+    def test_buckets(self):
+        limiter = RateLimiter(
+            rate=10,
+            rates={(None, "authorize"): 5, ("special", None): (50, 100)},
+        )
+
+        default = limiter.get_bucket("code", "initTransaction")
+        self.assertEqual(10, default.rate)
+        self.assertIs(default, limiter.get_bucket("code", "capture"))
+        self.assertIsNot(default, limiter.get_bucket("other", "capture"))
+        self.assertEqual(5, limiter.get_bucket("code", "authorize").rate)
+        special = limiter.get_bucket("special", "authorize")
+        self.assertEqual((50, 100), (special.rate, special.capacity))
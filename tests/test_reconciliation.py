@@ -0,0 +1,65 @@
+import io
+import json
+import unittest
+
+from tbk.reconciliation import CSVWriter, JSONLinesWriter, Reconciliation
+from tbk.services import WebpayService
+from tbk.soap import SoapResponse
+
+from .utils import mock
+
+
+class ReconciliationTest(unittest.TestCase):
+    def setUp(self):
+        self.service = mock.Mock(spec=WebpayService)
+        self.service.get_transaction_result.side_effect = self.get_transaction_result
+
+    def get_transaction_result(self, token, deadline=None):
+        if token == "invalid":
+            raise ValueError("invalid token")
+        return mock.Mock(
+            spec=SoapResponse,
+            result={
+                "buyOrder": "order-{}".format(token),
+                "detailOutput": [{"responseCode": 0, "amount": 1000}],
+            },
+        )
+
+    def test_run(self):
+        reconciliation = Reconciliation(self.service, concurrency=2)
+
+        records = list(
+            reconciliation.run(
+                ["1", {"token": "2", "buy_order": "order-2"}, "invalid"], ordered=True
+            )
+        )
+
+        self.assertEqual(["1", "2", "invalid"], [record.token for record in records])
+        self.assertEqual([True, True, False], [record.ok for record in records])
+        self.assertEqual([None, True, None], [record.matches for record in records])
+        self.assertEqual(0, records[0].as_row()["response_code"])
+
+    def test_write_json_lines(self):
+        output = io.StringIO()
+        reconciliation = Reconciliation(self.service, concurrency=2)
+
+        summary = reconciliation.write(
+            [{"token": "1", "buy_order": "other"}, "2", "invalid"],
+            JSONLinesWriter(output),
+        )
+
+        self.assertEqual({"total": 3, "ok": 2, "errors": 1, "mismatches": 1}, summary)
+        rows = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual({"1", "2", "invalid"}, set(row["token"] for row in rows))
+
+    def test_write_csv(self):
+        output = io.StringIO()
+        reconciliation = Reconciliation(self.service, timeout=10)
+
+        reconciliation.write(["1"], CSVWriter(output))
+
+        lines = output.getvalue().splitlines()
+        self.assertEqual(",".join(CSVWriter.FIELDS), lines[0])
+        self.assertTrue(lines[1].startswith("1,,order-1,,ok,0,1000"))
+        _, kwargs = self.service.get_transaction_result.call_args
+        self.assertIsNotNone(kwargs["deadline"])
@@ -0,0 +1,181 @@
+import logging
+import unittest
+
+import zeep
+
+from tbk.soap.redaction import (
+    MASK,
+    LogSampler,
+    RedactedRequest,
+    RedactedResponse,
+    Redactor,
+)
+from tbk.soap.requestor import SoapRequest, SoapRequestor, SoapResponse
+from tbk.soap.schemas import webpay
+from tbk.soap.soap_client import SoapClient
+from tbk.soap.transports import RequestsTransport
+
+from .utils import StubServer, get_fixture_url, mock
+
+
+class RedactorTest(unittest.TestCase):
+    def setUp(self):
+        self.redactor = Redactor()
+
+    def test_redact(self):
+        value = {
+            "cardDetail": {"cardNumber": "4051885600446623", "cvv": 123},
+            "details": [{"amount": 1000, "tbkUser": "user"}],
+            "buyOrder": "12345",
+        }
+
+        self.assertEqual(
+            {
+                "cardDetail": {"cardNumber": MASK, "cvv": MASK},
+                "details": [{"amount": 1000, "tbkUser": MASK}],
+                "buyOrder": "12345",
+            },
+            self.redactor.redact(value),
+        )
+        self.assertEqual(123, value["cardDetail"]["cvv"])
+
+    def test_redact_static_objects(self):
+        card_detail = webpay.cardDetail("4051885600446623", "12/20")
+
+        self.assertEqual(
+            [{"cardNumber": MASK, "cardExpirationDate": MASK}],
+            self.redactor.redact((card_detail,)),
+        )
+
+    def test_redact_zeep_objects(self):
+        client = zeep.Client(get_fixture_url("WsWebpayService.wsdl"))
+        card_detail = client.get_type("ns0:cardDetail")("4051885600446623", "12/20")
+
+        self.assertEqual(
+            {"cardNumber": MASK, "cardExpirationDate": MASK},
+            self.redactor.redact(card_detail),
+        )
+
+    def test_redact_custom_fields(self):
+        redactor = Redactor(fields=["buyOrder"], mask="-")
+
+        self.assertEqual(
+            {"buyOrder": "-", "cvv": 123}, redactor.redact({"buyOrder": 1, "cvv": 123})
+        )
+
+    def test_redact_xml(self):
+        envelope = (
+            b'<Envelope xmlns:ns0="urn:tbk"><ns0:card><cardNumber>4051885600446623'
+            b"</cardNumber><cvv>123</cvv><amount>1000</amount></ns0:card></Envelope>"
+        )
+
+        self.assertEqual(
+            '<Envelope xmlns:ns0="urn:tbk"><ns0:card><cardNumber>{0}</cardNumber>'
+            "<cvv>{0}</cvv><amount>1000</amount></ns0:card></Envelope>".format(MASK),
+            self.redactor.redact_xml(envelope),
+        )
+
+    def test_redact_xml_invalid(self):
+        self.assertEqual("<invalid xml>", self.redactor.redact_xml(b"<unclosed>"))
+        self.assertIsNone(self.redactor.redact_xml(None))
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self, logging.DEBUG)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class RawEnvelopeLoggingTest(unittest.TestCase):
+    def setUp(self):
+        zeep_logger = logging.getLogger("zeep.transports")
+        filters = list(zeep_logger.filters)
+        for log_filter in filters:
+            zeep_logger.removeFilter(log_filter)
+        self.addCleanup(setattr, zeep_logger, "filters", filters)
+        root = logging.getLogger()
+        self.addCleanup(root.setLevel, root.level)
+        root.setLevel(logging.DEBUG)
+        self.handler = RecordingHandler()
+        root.addHandler(self.handler)
+        self.addCleanup(root.removeHandler, self.handler)
+
+    def test_zeep_transport_envelopes(self):
+        SoapRequestor(mock.Mock(spec=SoapClient))
+        SoapRequestor(mock.Mock(spec=SoapClient))
+        transport = RequestsTransport()
+        self.addCleanup(transport.close)
+        received = b"<received><cardNumber>4051885600446623</cardNumber></received>"
+
+        with StubServer(received) as server:
+            transport.post(
+                server.url,
+                b"<sent><cvv>987</cvv><cardExpirationDate>1225</cardExpirationDate>"
+                b"</sent>",
+                {},
+            )
+
+        self.assertEqual(1, len(logging.getLogger("zeep.transports").filters))
+        messages = "\n".join(self.handler.messages)
+        self.assertIn("<cvv>{}</cvv>".format(MASK), messages)
+        self.assertIn("<cardNumber>{}</cardNumber>".format(MASK), messages)
+        for value in ("987", "1225", "4051885600446623"):
+            self.assertNotIn(value, messages)
+
+
+class LogSamplerTest(unittest.TestCase):
+    @mock.patch("tbk.soap.redaction.random.random", return_value=0.3)
+    def test_sample(self, random):
+        self.assertTrue(LogSampler(1).sample())
+        self.assertFalse(LogSampler(0).sample())
+        self.assertTrue(LogSampler(0.5).sample())
+        self.assertFalse(LogSampler(0.2).sample())
+        self.assertEqual(2, random.call_count)
+
+
+class RedactedRecordTest(unittest.TestCase):
+    def test_request(self):
+        redactor = mock.Mock(wraps=Redactor())
+        request = SoapRequest("authorize", ({"tbkUser": "user"},), {"amount": 1})
+
+        record = RedactedRequest(request, redactor)
+
+        redactor.redact.assert_not_called()
+        self.assertEqual(
+            {
+                "method": "authorize",
+                "args": [{"tbkUser": MASK}],
+                "kwargs": {"amount": 1},
+            },
+            record.as_dict(),
+        )
+        self.assertEqual(
+            '{"args": [{"tbkUser": "********"}], "kwargs": {"amount": 1}, '
+            '"method": "authorize"}',
+            str(record),
+        )
+
+    def test_response(self):
+        request = SoapRequest("getTransactionResult", ("token",), {})
+        response = SoapResponse(
+            {"cardDetail": {"cardNumber": "6623"}},
+            request,
+            b"<sent/>",
+            b"<received><cardNumber>6623</cardNumber></received>",
+        )
+
+        record = RedactedResponse(response, Redactor())
+
+        self.assertEqual(
+            {
+                "method": "getTransactionResult",
+                "result": {"cardDetail": {"cardNumber": MASK}},
+                "envelope_sent": "<sent/>",
+                "envelope_received": "<received><cardNumber>{}</cardNumber>"
+                "</received>".format(MASK),
+            },
+            record.as_dict(),
+        )
@@ -1,9 +1,22 @@
+import threading
 import unittest
 
 from tbk.commerce import Commerce
 from tbk.soap import SoapRequestor, SoapRequest, SoapResponse, create_soap_requestor
-from tbk.soap.exceptions import SoapClientException, SoapServerException
+from tbk.soap.admission import LOW, AdmissionController
+from tbk.soap.bulkhead import Bulkheads
+from tbk.soap.deadline import Deadline
+from tbk.soap.ratelimit import RateLimiter
+from tbk.soap.redaction import LogSampler
+from tbk.soap.exceptions import (
+    AdmissionRejected,
+    DeadlineExceeded,
+    RequestorClosed,
+    SoapClientException,
+    SoapServerException,
+)
 from tbk.soap.soap_client import SoapClient
+from tbk.soap.store import TransactionStore
 
 from .utils import mock
 
@@ -55,6 +68,14 @@ class SoapRequestorTest(unittest.TestCase):
             SoapClientException, requestor.create_object, "TypeName", "arg", kw="kw"
         )
 
+    def test_warmup(self):
+        requestor = SoapRequestor(self.soap_client)
+
+        result = requestor.warmup(2)
+
+        self.assertEqual(self.soap_client.warmup.return_value, result)
+        self.soap_client.warmup.assert_called_once_with(2)
+
     def test_request(self):
         request = self.soap_client.request
         mocked_result = mock.Mock()
@@ -82,6 +103,440 @@ class SoapRequestorTest(unittest.TestCase):
 
         self.assertEqual(expected_response, response)
 
+    def test_request_audit_log(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        audit_log = mock.Mock()
+
+        requestor = SoapRequestor(self.soap_client, audit_log=audit_log)
+        response = requestor.request("methodName", "arg")
+
+        audit_log.record.assert_called_once_with(response)
+
+    def test_request_audit_log_failure(self):
+        error = SoapServerException("Invalid token", 21, None)
+        self.soap_client.request.side_effect = error
+        self.soap_client.get_last_sent_envelope.return_value = "<sent/>"
+        self.soap_client.get_last_received_envelope.return_value = "<fault/>"
+        audit_log = mock.Mock()
+
+        requestor = SoapRequestor(self.soap_client, audit_log=audit_log)
+        with self.assertRaises(SoapServerException):
+            requestor.request("methodName", "arg")
+
+        response = audit_log.record.call_args[0][0]
+        audit_log.record.assert_called_once_with(response, error=error)
+        self.assertEqual("methodName", response.request.method_name)
+        self.assertEqual("<sent/>", response.envelope_sent)
+        self.assertEqual("<fault/>", response.envelope_received)
+
+    def test_request_audit_log_not_sent(self):
+        self.soap_client.request.side_effect = SoapClientException()
+        audit_log = mock.Mock()
+
+        requestor = SoapRequestor(self.soap_client, audit_log=audit_log)
+        with self.assertRaises(SoapClientException):
+            requestor.request("methodName", "arg")
+
+        audit_log.record.assert_not_called()
+
+    def test_request_transaction_store(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        transaction_store = mock.Mock(spec=TransactionStore)
+
+        requestor = SoapRequestor(
+            self.soap_client,
+            commerce_code="597020000541",
+            transaction_store=transaction_store,
+        )
+        response = requestor.request("methodName", "arg")
+
+        transaction_store.record.assert_called_once_with(response, "597020000541")
+
+    def test_request_transaction_store_error(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        transaction_store = mock.Mock(spec=TransactionStore)
+        transaction_store.record.side_effect = ValueError("disk full")
+
+        requestor = SoapRequestor(self.soap_client, transaction_store=transaction_store)
+        response = requestor.request("methodName", "arg")
+
+        self.assertEqual("methodName", response.request.method_name)
+
+    def test_request_logs_redacted(self):
+        self.soap_client.request.return_value = (
+            {"cardDetail": {"cardNumber": "6623"}},
+            b"<sent><cvv>123</cvv></sent>",
+            b"<received/>",
+        )
+        requestor = SoapRequestor(self.soap_client)
+
+        with mock.patch.object(requestor, "logger") as logger:
+            logger.isEnabledFor.return_value = True
+            requestor.request("methodName", {"cvv": "123", "amount": 1000})
+
+        request_record = logger.debug.call_args_list[0][0][1]
+        response_record = logger.debug.call_args_list[1][0][1]
+        self.assertNotIn("123", str(request_record))
+        self.assertIn("1000", str(request_record))
+        self.assertNotIn("6623", str(response_record))
+        self.assertNotIn("123", str(response_record))
+
+    def test_request_logs_sampled(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        log_sampler = mock.Mock(spec=LogSampler)
+        log_sampler.sample.return_value = False
+        requestor = SoapRequestor(self.soap_client, log_sampler=log_sampler)
+
+        with mock.patch.object(requestor, "logger") as logger:
+            logger.isEnabledFor.return_value = True
+            requestor.request("methodName", "arg")
+            logger.isEnabledFor.return_value = False
+            requestor.request("methodName", "arg")
+
+        logger.debug.assert_not_called()
+        self.assertEqual(1, log_sampler.sample.call_count)
+
+    def test_request_deadline(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        deadline = mock.Mock(spec=Deadline, expired=False)
+        deadline.get_timeout.return_value = (3, 5)
+
+        requestor = SoapRequestor(self.soap_client)
+        requestor.request("methodName", "arg", deadline=deadline, timeout=10)
+
+        deadline.get_timeout.assert_called_once_with(10)
+        self.soap_client.request.assert_called_once_with(mock.ANY, timeout=(3, 5))
+
+    def test_request_deadline_expired(self):
+        deadline = mock.Mock(spec=Deadline, expired=True)
+
+        requestor = SoapRequestor(self.soap_client)
+        with self.assertRaises(DeadlineExceeded) as ctx:
+            requestor.request("methodName", "arg", deadline=deadline)
+        self.assertEqual("methodName", ctx.exception.request.method_name)
+        self.soap_client.request.assert_not_called()
+
+    def test_request_many(self):
+        def request(soap_request, timeout=None):
+            if soap_request.args == ("fail",):
+                raise ValueError("fail")
+            return soap_request.args, "<sent/>", "<received/>"
+
+        self.soap_client.request.side_effect = request
+        deadline = mock.Mock(spec=Deadline, expired=False)
+        deadline.get_timeout.return_value = (1, 1)
+        other_deadline = mock.Mock(spec=Deadline, expired=False)
+        other_deadline.get_timeout.return_value = (2, 2)
+
+        requestor = SoapRequestor(self.soap_client)
+        outcomes = list(
+            requestor.request_many(
+                [
+                    ("methodName", ("first",)),
+                    ("methodName", ("fail",)),
+                    ("otherMethod", ("third",), {"deadline": other_deadline}),
+                ],
+                concurrency=2,
+                ordered=True,
+                deadline=deadline,
+            )
+        )
+
+        self.assertEqual([0, 1, 2], [outcome.index for outcome in outcomes])
+        self.assertEqual(("first",), outcomes[0].result.result)
+        self.assertEqual("methodName", outcomes[0].result.request.method_name)
+        self.assertIsInstance(outcomes[1].error, ValueError)
+        self.assertEqual(("third",), outcomes[2].result.result)
+        self.assertEqual(
+            [(1, 1), (1, 1), (2, 2)],
+            sorted(
+                call[1]["timeout"] for call in self.soap_client.request.call_args_list
+            ),
+        )
+
+    def test_request_idempotent_method(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+
+        requestor = SoapRequestor(self.soap_client, idempotent_methods=["methodName"])
+        with mock.patch.object(
+            requestor.single_flight,
+            "do_within",
+            wraps=requestor.single_flight.do_within,
+        ) as do_within:
+            response = requestor.request("methodName", "arg")
+            requestor.request("otherMethod", "arg")
+
+        do_within.assert_called_once_with(
+            "methodName(arg)", None, mock.ANY, mock.ANY, None, None, None
+        )
+        self.assertEqual(2, self.soap_client.request.call_count)
+        self.assertEqual("methodName", response.request.method_name)
+
+    def test_request_idempotent_method_follower_deadline(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def request(soap_request, timeout=None):
+            started.set()
+            release.wait(5)
+            return mock.Mock(), "<sent/>", "<received/>"
+
+        self.soap_client.request.side_effect = request
+        requestor = SoapRequestor(self.soap_client, idempotent_methods=["methodName"])
+        leader = threading.Thread(target=requestor.request, args=("methodName", "arg"))
+        leader.start()
+        started.wait(5)
+
+        try:
+            with self.assertRaises(DeadlineExceeded):
+                requestor.request("methodName", "arg", deadline=Deadline(0.05))
+        finally:
+            release.set()
+            leader.join()
+
+        self.assertEqual(1, self.soap_client.request.call_count)
+
+    def test_request_rate_limited(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        rate_limiter = mock.Mock(spec=RateLimiter)
+        rate_limiter.acquire.return_value = True
+
+        requestor = SoapRequestor(
+            self.soap_client, commerce_code="597020000541", rate_limiter=rate_limiter
+        )
+        requestor.request("methodName", "arg")
+
+        rate_limiter.acquire.assert_called_once_with(
+            "597020000541", "methodName", timeout=None
+        )
+
+    def test_request_rate_limit_exceeds_deadline(self):
+        rate_limiter = mock.Mock(spec=RateLimiter)
+        rate_limiter.acquire.return_value = False
+        deadline = mock.Mock(spec=Deadline, expired=False)
+        deadline.remaining.return_value = 2
+
+        requestor = SoapRequestor(self.soap_client, rate_limiter=rate_limiter)
+        with self.assertRaises(DeadlineExceeded):
+            requestor.request("methodName", "arg", deadline=deadline)
+
+        rate_limiter.acquire.assert_called_once_with(None, "methodName", timeout=2)
+        self.soap_client.request.assert_not_called()
+
+    def test_request_deadline_expired_while_rate_limited(self):
+        deadline = Deadline(10)
+
+        def acquire(commerce_code, method_name, timeout=None):
+            deadline.expires_at -= 20
+            return True
+
+        rate_limiter = mock.Mock(spec=RateLimiter)
+        rate_limiter.acquire.side_effect = acquire
+
+        requestor = SoapRequestor(self.soap_client, rate_limiter=rate_limiter)
+        with self.assertRaises(DeadlineExceeded):
+            requestor.request("methodName", "arg", deadline=deadline)
+
+        self.assertEqual(1, rate_limiter.acquire.call_count)
+        self.soap_client.request.assert_not_called()
+        self.assertEqual([], requestor.in_flight)
+
+    def test_request_admitted(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        admission_controller = mock.Mock(spec=AdmissionController)
+        admission_controller.acquire.return_value = True
+
+        requestor = SoapRequestor(
+            self.soap_client, admission_controller=admission_controller
+        )
+        requestor.request("methodName", "arg", priority=LOW)
+
+        admission_controller.acquire.assert_called_once_with(
+            "methodName", priority=LOW, timeout=None
+        )
+        admission_controller.release.assert_called_once_with("methodName")
+        self.assertEqual(1, self.soap_client.request.call_count)
+
+    def test_request_admitted_default_priority(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        admission_controller = mock.Mock(spec=AdmissionController)
+        admission_controller.acquire.return_value = True
+
+        requestor = SoapRequestor(
+            self.soap_client, admission_controller=admission_controller, priority=LOW
+        )
+        requestor.request("methodName", "arg")
+
+        admission_controller.acquire.assert_called_once_with(
+            "methodName", priority=LOW, timeout=None
+        )
+
+    def test_request_admitted_released_on_error(self):
+        self.soap_client.request.side_effect = ValueError("error")
+        admission_controller = mock.Mock(spec=AdmissionController)
+        admission_controller.acquire.return_value = True
+
+        requestor = SoapRequestor(
+            self.soap_client, admission_controller=admission_controller
+        )
+        with self.assertRaises(ValueError):
+            requestor.request("methodName", "arg")
+
+        admission_controller.release.assert_called_once_with("methodName")
+
+    def test_request_deadline_expired_while_admitted(self):
+        deadline = Deadline(10)
+
+        def acquire(method_name, priority=None, timeout=None):
+            deadline.expires_at -= 20
+            return True
+
+        admission_controller = mock.Mock(spec=AdmissionController)
+        admission_controller.acquire.side_effect = acquire
+
+        requestor = SoapRequestor(
+            self.soap_client, admission_controller=admission_controller
+        )
+        with self.assertRaises(DeadlineExceeded):
+            requestor.request("methodName", "arg", deadline=deadline)
+
+        admission_controller.release.assert_called_once_with("methodName")
+        self.soap_client.request.assert_not_called()
+
+    def test_request_not_admitted(self):
+        admission_controller = mock.Mock(spec=AdmissionController)
+        admission_controller.acquire.return_value = False
+        deadline = mock.Mock(spec=Deadline, expired=False)
+        deadline.remaining.return_value = 2
+
+        requestor = SoapRequestor(
+            self.soap_client, admission_controller=admission_controller
+        )
+        with self.assertRaises(AdmissionRejected) as ctx:
+            requestor.request("methodName", "arg", deadline=deadline)
+
+        self.assertEqual("methodName", ctx.exception.request.method_name)
+        admission_controller.acquire.assert_called_once_with(
+            "methodName", priority=None, timeout=2
+        )
+        admission_controller.release.assert_not_called()
+        self.soap_client.request.assert_not_called()
+
+    def test_request_bulkhead(self):
+        self.soap_client.request.return_value = (mock.Mock(), "<sent/>", "<received/>")
+        bulkheads = mock.Mock(spec=Bulkheads)
+        bulkheads.acquire.return_value = True
+
+        requestor = SoapRequestor(
+            self.soap_client, commerce_code="597020000541", bulkheads=bulkheads
+        )
+        requestor.request("methodName", "arg")
+
+        bulkheads.acquire.assert_called_once_with("597020000541", timeout=None)
+        bulkheads.release.assert_called_once_with("597020000541")
+
+    def test_request_deadline_expired_in_bulkhead(self):
+        deadline = Deadline(10)
+
+        def acquire(commerce_code, timeout=None):
+            deadline.expires_at -= 20
+            return True
+
+        bulkheads = mock.Mock(spec=Bulkheads)
+        bulkheads.acquire.side_effect = acquire
+
+        requestor = SoapRequestor(
+            self.soap_client, commerce_code="597020000541", bulkheads=bulkheads
+        )
+        with self.assertRaises(DeadlineExceeded):
+            requestor.request("methodName", "arg", deadline=deadline)
+
+        bulkheads.release.assert_called_once_with("597020000541")
+        self.soap_client.request.assert_not_called()
+
+    def test_request_bulkhead_full(self):
+        bulkheads = mock.Mock(spec=Bulkheads)
+        bulkheads.acquire.return_value = False
+        deadline = mock.Mock(spec=Deadline, expired=False)
+        deadline.remaining.return_value = 2
+
+        requestor = SoapRequestor(
+            self.soap_client, commerce_code="597020000541", bulkheads=bulkheads
+        )
+        with self.assertRaises(AdmissionRejected):
+            requestor.request("methodName", "arg", deadline=deadline)
+
+        bulkheads.acquire.assert_called_once_with("597020000541", timeout=2)
+        bulkheads.release.assert_not_called()
+        self.soap_client.request.assert_not_called()
+
+    def test_close(self):
+        requestor = SoapRequestor(self.soap_client)
+
+        self.assertEqual([], requestor.close(drain_timeout=1))
+        with self.assertRaises(RequestorClosed) as ctx:
+            requestor.request("methodName", "arg")
+
+        self.assertTrue(requestor.closed)
+        self.assertEqual("methodName", ctx.exception.request.method_name)
+        self.soap_client.close.assert_called_once_with()
+        self.soap_client.request.assert_not_called()
+
+    def test_close_drains_in_flight(self):
+        release = threading.Event()
+        responses = []
+        requestor = SoapRequestor(self.soap_client)
+        thread = self.start_blocked_request(requestor, release, responses)
+        threading.Timer(0.05, release.set).start()
+
+        cut_off = requestor.close(drain_timeout=5)
+        thread.join()
+
+        self.assertEqual([], cut_off)
+        self.assertEqual(1, len(responses))
+        self.assertEqual([], requestor.in_flight)
+        self.soap_client.close.assert_called_once_with()
+
+    def test_close_cuts_off_in_flight(self):
+        release = threading.Event()
+        requestor = SoapRequestor(self.soap_client)
+        thread = self.start_blocked_request(requestor, release, [])
+
+        cut_off = requestor.close(drain_timeout=0.05)
+        release.set()
+        thread.join()
+
+        self.assertEqual(["methodName"], [r.method_name for r in cut_off])
+        self.soap_client.close.assert_called_once_with()
+
+    def test_close_while_waiting_rate_limit(self):
+        rate_limiter = mock.Mock(spec=RateLimiter)
+        requestor = SoapRequestor(self.soap_client, rate_limiter=rate_limiter)
+
+        def close(*args, **kwargs):
+            requestor.closed = True
+            return True
+
+        rate_limiter.acquire.side_effect = close
+        with self.assertRaises(RequestorClosed):
+            requestor.request("methodName", "arg")
+
+        self.soap_client.request.assert_not_called()
+
+    def start_blocked_request(self, requestor, release, responses):
+        def send(request, timeout=None):
+            release.wait(5)
+            return mock.Mock(), "<sent/>", "<received/>"
+
+        self.soap_client.request.side_effect = send
+        thread = threading.Thread(
+            target=lambda: responses.append(requestor.request("methodName", "arg"))
+        )
+        thread.start()
+        while not requestor.in_flight:
+            release.wait(0.001)
+        return thread
+
     def test_request_server_exception(self):
         request = self.soap_client.request
         request.side_effect = SoapServerException(
@@ -115,6 +570,18 @@ class SoapRequestorTest(unittest.TestCase):
 
 
 class SoapResponseTest(unittest.TestCase):
+    def test_envelopes(self):
+        response = SoapResponse(
+            request=mock.Mock(spec=SoapRequest),
+            result=None,
+            envelope_sent=b"<sent>\xc3\xb1</sent>",
+            envelope_received=b"<received/>",
+        )
+
+        self.assertEqual(b"<sent>\xc3\xb1</sent>", response.raw_envelope_sent)
+        self.assertEqual("<sent>\xf1</sent>", response.envelope_sent)
+        self.assertEqual("<received/>", response.envelope_received)
+
     def test_get_item(self):
         request = mock.Mock(spec=SoapRequest)
         key = mock.Mock(spec=str)
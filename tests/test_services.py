@@ -1,7 +1,13 @@
 import unittest
 
 from tbk.commerce import Commerce
-from tbk.services import OneClickPaymentService, WebpayService
+from tbk.cache import TTLCache
+from tbk.services import (
+    CompleteWebpayService,
+    OneClickPaymentService,
+    WebpayService,
+)
+from tbk.soap.deadline import Deadline
 from tbk.soap.requestor import SoapRequestor
 from .utils import mock
 
@@ -19,15 +25,90 @@ class ServiceTestCase(unittest.TestCase):
         )
         self.service = self.service_class(self.commerce, self.soap_requestor)
 
+    def send_many(self):
+        """Run ``request_many`` of the requestor for real on the mocked requestor."""
+
+        def request_many(*args, **kwargs):
+            return SoapRequestor.request_many(self.soap_requestor, *args, **kwargs)
+
+        self.soap_requestor.request_many.side_effect = request_many
+
     def assert_result_and_request_with_input(
-        self, result, method_name, input_name, **input_kwargs
+        self, result, method_name, input_name, deadline=None, **input_kwargs
     ):
         self.assertEqual(self.soap_requestor.request.return_value, result)
         self.soap_requestor.create_object.assert_called_once_with(
             input_name, **input_kwargs
         )
         self.soap_requestor.request.assert_called_once_with(
-            method_name, self.soap_requestor.create_object.return_value
+            method_name,
+            self.soap_requestor.create_object.return_value,
+            deadline=deadline,
+        )
+
+
+class TBKWebServiceTest(ServiceTestCase):
+
+    service_class = WebpayService
+
+    def test_warmup(self):
+        result = self.service.warmup(connections=4)
+
+        self.assertEqual(self.soap_requestor.warmup.return_value, result)
+        self.soap_requestor.warmup.assert_called_once_with(4)
+
+    def test_close(self):
+        result = self.service.close(drain_timeout=10)
+
+        self.assertEqual(self.soap_requestor.close.return_value, result)
+        self.soap_requestor.close.assert_called_once_with(10)
+
+    def test_request_many(self):
+        calls = [("getTransactionResult", ("token",))]
+
+        result = self.service.request_many(calls, concurrency=4, ordered=True)
+
+        self.assertEqual(self.soap_requestor.request_many.return_value, result)
+        self.soap_requestor.request_many.assert_called_once_with(
+            calls, concurrency=4, ordered=True, deadline=None
+        )
+
+    def test_batch(self):
+        self.send_many()
+        self.soap_requestor.request.side_effect = [
+            "first",
+            ValueError("error"),
+            "third",
+        ]
+        deadline = mock.Mock(spec=Deadline)
+        item_deadline = mock.Mock(spec=Deadline)
+
+        outcomes = list(
+            self.service.batch(
+                "get_transaction_result",
+                ["first", {"token": "second", "deadline": item_deadline}, ("third",)],
+                concurrency=1,
+                ordered=True,
+                deadline=deadline,
+            )
+        )
+
+        self.assertEqual(["first", None, "third"], [o.result for o in outcomes])
+        self.assertIsInstance(outcomes[1].error, ValueError)
+        self.assertEqual(
+            [
+                mock.call("getTransactionResult", "first", deadline=deadline),
+                mock.call("getTransactionResult", "second", deadline=item_deadline),
+                mock.call("getTransactionResult", "third", deadline=deadline),
+            ],
+            self.soap_requestor.request.call_args_list,
+        )
+        self.soap_requestor.request_many.assert_called_once_with(
+            mock.ANY,
+            concurrency=1,
+            ordered=True,
+            deadline=deadline,
+            request=mock.ANY,
         )
 
 
@@ -95,6 +176,22 @@ class OneClickPaymentServiceTest(ServiceTestCase):
             buyorder=buyorder,
         )
 
+    def test_authorize_with_deadline(self):
+        deadline = mock.Mock(spec=Deadline)
+
+        result = self.service.authorize("order", "user", "username", 1000, deadline)
+
+        self.assert_result_and_request_with_input(
+            result=result,
+            method_name="authorize",
+            input_name="oneClickPayInput",
+            deadline=deadline,
+            buyOrder="order",
+            tbkUser="user",
+            username="username",
+            amount=1000,
+        )
+
     def test_remove_user(self):
         tbk_user = mock.MagicMock(spec=str)
         username = mock.MagicMock(spec=str)
@@ -113,3 +210,141 @@ class OneClickPaymentServiceTest(ServiceTestCase):
 class WebpayServiceTest(ServiceTestCase):
 
     service_class = WebpayService
+
+    def test_get_transaction_result(self):
+        token = mock.MagicMock(spec=str)
+        deadline = mock.Mock(spec=Deadline)
+
+        result = self.service.get_transaction_result(token, deadline=deadline)
+
+        self.assertEqual(self.soap_requestor.request.return_value, result)
+        self.soap_requestor.request.assert_called_once_with(
+            "getTransactionResult", token, deadline=deadline
+        )
+
+    def test_get_transaction_results(self):
+        self.send_many()
+        outcomes = list(self.service.get_transaction_results(["first", "second"]))
+
+        self.assertEqual(2, len(outcomes))
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        self.assertEqual(2, self.soap_requestor.request.call_count)
+
+    def test_get_transaction_result_cached(self):
+        cache = TTLCache()
+        service = WebpayService(
+            self.commerce, self.soap_requestor, caches={"getTransactionResult": cache}
+        )
+
+        first = service.get_transaction_result("token")
+        second = service.get_transaction_result("token")
+        service.get_transaction_result("other")
+
+        self.assertIs(first, second)
+        self.assertEqual(2, self.soap_requestor.request.call_count)
+        self.assertIs(
+            first,
+            cache.get((self.commerce.commerce_code, "getTransactionResult", "token")),
+        )
+
+    def test_acknowledge_transaction(self):
+        token = mock.MagicMock(spec=str)
+
+        result = self.service.acknowledge_transaction(token)
+
+        self.assertEqual(self.soap_requestor.request.return_value, result)
+        self.soap_requestor.request.assert_called_once_with(
+            "acknowledgeTransaction", token, deadline=None
+        )
+
+
+class CompleteWebpayServiceTest(ServiceTestCase):
+
+    service_class = CompleteWebpayService
+
+    def test_batch(self):
+        self.send_many()
+        outcomes = list(
+            self.service.batch(
+                "acknowledge_transaction", ["first", "second"], ordered=True
+            )
+        )
+
+        self.assertTrue(all(outcome.ok for outcome in outcomes))
+        self.soap_requestor.request.assert_has_calls(
+            [
+                mock.call("acknowledgeTransaction", "first", deadline=None),
+                mock.call("acknowledgeTransaction", "second", deadline=None),
+            ],
+            any_order=True,
+        )
+
+    def test_queryshare(self):
+        result = self.service.queryshare("token", "order", 3)
+
+        self.assert_result_and_request_with_input(
+            result=result,
+            method_name="queryShare",
+            input_name="wsCompleteQueryShareInput",
+            token="token",
+            buyOrder="order",
+            shareNumber=3,
+        )
+
+    def test_queryshare_cached(self):
+        self.service.queryshare_cache = TTLCache()
+
+        first = self.service.queryshare("token", "order", 3)
+        second = self.service.queryshare("token", "order", 3)
+        self.service.queryshare("token", "order", 6)
+
+        self.assertIs(first, second)
+        self.assertEqual(2, self.soap_requestor.request.call_count)
+        self.assertIs(self.service.queryshare_cache, self.service.caches["queryShare"])
+
+    def test_queryshare_cache_evicted(self):
+        self.service.queryshare_cache = TTLCache()
+
+        self.service.queryshare("token", "order", 3)
+        self.service.authorize("token", "order", 0, 1, 0)
+        self.service.queryshare("token", "order", 3)
+        self.service.queryshare("token", "order", 3)
+        self.service.acknowledge_transaction("token")
+        self.service.queryshare("token", "order", 3)
+
+        methods = [call[0][0] for call in self.soap_requestor.request.call_args_list]
+        self.assertEqual(
+            [
+                "queryShare",
+                "authorize",
+                "queryShare",
+                "acknowledgeTransaction",
+                "queryShare",
+            ],
+            methods,
+        )
+
+    def test_queryshare_cache_token_ttl(self):
+        cache = TTLCache(ttl=600)
+        service = CompleteWebpayService(
+            self.commerce, self.soap_requestor, queryshare_cache=cache, token_ttl=60
+        )
+        self.soap_requestor.request.return_value = mock.Mock(result={"token": "new"})
+
+        with mock.patch("tbk.services.clock", return_value=1000):
+            service.init_complete_transaction(1000, "order", "12/25", 123, "4051")
+        with mock.patch.object(cache, "set") as cache_set:
+            with mock.patch("tbk.services.clock", return_value=1050):
+                service.queryshare("new", "order", 3)
+                service.queryshare("other", "order", 3)
+
+        # the token issued by the service has 10 of its 60 seconds left
+        self.assertEqual([10, 60], [call[0][2] for call in cache_set.call_args_list])
+
+    def test_queryshare_cache_argument(self):
+        cache = TTLCache()
+        service = CompleteWebpayService(
+            self.commerce, self.soap_requestor, queryshare_cache=cache
+        )
+
+        self.assertEqual({"queryShare": cache}, service.caches)
@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+
+from tbk.soap.singleflight import SingleFlight, SingleFlightTimeout
+
+
+class SingleFlightTest(unittest.TestCase):
+    def run_concurrently(self, single_flight, function, count):
+        results = []
+        errors = []
+
+        def call():
+            try:
+                results.append(single_flight.do("key", function))
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def wait_for_followers(self, single_flight, count):
+        for _ in range(500):
+            calls = list(single_flight._calls.values())
+            if calls and calls[0].shared == count:
+                return
+            time.sleep(0.01)
+        self.fail("followers did not join the call")
+
+    def test_concurrent_calls_are_shared(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def function():
+            calls.append(1)
+            release.wait()
+            return object()
+
+        threads, results, errors = self.run_concurrently(single_flight, function, 5)
+        self.wait_for_followers(single_flight, 4)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual(5, len(results))
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(0, len(single_flight))
+
+    def test_errors_are_shared(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        def function():
+            release.wait()
+            raise ValueError("error")
+
+        threads, results, errors = self.run_concurrently(single_flight, function, 3)
+        self.wait_for_followers(single_flight, 2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(3, len(errors))
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+
+    def test_follower_timeout(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+
+        def function():
+            release.wait(5)
+            return "result"
+
+        threads, results, errors = self.run_concurrently(single_flight, function, 1)
+        self.wait_for_followers(single_flight, 0)
+        try:
+            self.assertRaises(
+                SingleFlightTimeout, single_flight.do_within, "key", 0.01, function
+            )
+            self.assertEqual(0, list(single_flight._calls.values())[0].shared)
+        finally:
+            release.set()
+            threads[0].join()
+
+        self.assertEqual(["result"], results)
+
+    def test_sequential_calls_are_not_shared(self):
+        single_flight = SingleFlight()
+
+        first = single_flight.do("key", object)
+        second = single_flight.do("key", object)
+
+        self.assertIsNot(first, second)
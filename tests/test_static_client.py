@@ -0,0 +1,223 @@
+import datetime
+import decimal
+import unittest
+
+import requests_mock
+import zeep
+from lxml import etree
+
+from tbk.soap import codegen
+from tbk.soap.exceptions import (
+    InvalidSignatureResponse,
+    MethodDoesNotExist,
+    SoapServerException,
+    TypeDoesNotExist,
+)
+from tbk.soap.requestor import SoapRequest
+from tbk.soap.schemas import get_schema, webpay
+from tbk.soap.static_client import StaticSoapClient
+from tbk.soap.zeep_client import ZeepSoapClient
+
+from .utils import get_fixture_data, get_fixture_url, mock
+
+ADDRESS = "https://webpay3g.transbank.cl/WSWebpayTransaction/cxf/WSWebpayService"
+
+TRANSACTION_RESULT_RESPONSE = b"""<soap:Envelope
+xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body>
+<ns2:getTransactionResultResponse
+xmlns:ns2="http://service.wswebpay.webpay.transbank.com/"><return>
+<accountingDate>1018</accountingDate><buyOrder>12341</buyOrder>
+<cardDetail><cardNumber>6623</cardNumber><cardExpirationDate/></cardDetail>
+<detailOutput><sharesNumber>0</sharesNumber><amount>10000.50</amount>
+<commerceCode>597020000541</commerceCode><buyOrder>12341</buyOrder>
+<authorizationCode>1213</authorizationCode><paymentTypeCode>VN</paymentTypeCode>
+<responseCode>0</responseCode></detailOutput>
+<sessionId>session</sessionId>
+<transactionDate>2019-10-18T12:30:00.123-03:00</transactionDate>
+<urlRedirection>https://webpay3gint.transbank.cl/webpayserver/voucher.cgi</urlRedirection>
+<VCI>TSY</VCI></return></ns2:getTransactionResultResponse></soap:Body>
+</soap:Envelope>"""
+
+FAULT_RESPONSE = b"""<soap:Envelope
+xmlns:soap="http://schemas.xmlsoap.org/soap/envelope/"><soap:Body><soap:Fault>
+<faultcode>soap:Server</faultcode>
+<faultstring>&lt;!-- Invalid amount(304) --&gt;</faultstring>
+</soap:Fault></soap:Body></soap:Envelope>"""
+
+
+def create_soap_request(method_name, *args, **kwargs):
+    return SoapRequest(method_name=method_name, args=args, kwargs=kwargs)
+
+
+class StaticSoapClientTest(unittest.TestCase):
+    def setUp(self):
+        self.client = StaticSoapClient(
+            ADDRESS + "?wsdl",
+            get_fixture_data("597020000547.key"),
+            get_fixture_data("597020000547.crt"),
+            get_fixture_data("tbk.pem"),
+        )
+
+    def test_init(self):
+        self.assertIs(webpay, self.client.schema)
+        self.assertEqual(ADDRESS, self.client.address)
+
+    def test_get_schema_not_generated(self):
+        with self.assertRaises(ValueError):
+            get_schema("https://example.com/cxf/UnknownService?wsdl")
+
+    def test_create_object(self):
+        detail = self.client.create_object(
+            "cardDetail", "1234", cardExpirationDate="12/20"
+        )
+
+        self.assertIsInstance(detail, webpay.cardDetail)
+        self.assertEqual("1234", detail.cardNumber)
+        self.assertEqual("12/20", detail["cardExpirationDate"])
+        self.assertEqual(webpay.cardDetail("1234", "12/20"), detail)
+
+    def test_create_object_defaults(self):
+        transaction_input = self.client.create_object("wsInitTransactionInput")
+
+        self.assertIsNone(transaction_input.buyOrder)
+        self.assertEqual([], transaction_input.transactionDetails)
+
+    def test_create_object_type_error(self):
+        with self.assertRaises(TypeDoesNotExist):
+            self.client.create_object("does_not_exist")
+
+    def test_create_object_arguments_error(self):
+        with self.assertRaises(TypeError):
+            self.client.create_object("cardDetail", does_not_exist="1234")
+        with self.assertRaises(TypeError):
+            self.client.create_object("cardDetail", "1", "2", "3")
+        with self.assertRaises(TypeError):
+            self.client.create_object("cardDetail", "1", cardNumber="1")
+
+    def test_get_enum_value(self):
+        for value in ("TR_NORMAL_WS", "TR_NORMAL_WS_WPM", "TR_MALL_WS"):
+            self.assertEqual(
+                value, self.client.get_enum_value("wsTransactionType", value)
+            )
+
+    def test_get_enum_value_errors(self):
+        with self.assertRaises(TypeDoesNotExist):
+            self.client.get_enum_value("does_not_exist", "TR_NORMAL_WS")
+        with self.assertRaises(ValueError):
+            self.client.get_enum_value("wsTransactionType", "TR_UNKNOWN")
+
+    def test_create_envelope_like_zeep(self):
+        zeep_client = zeep.Client(get_fixture_url("WsWebpayService.wsdl"))
+        arguments = {
+            "wSTransactionType": "TR_NORMAL_WS",
+            "commerceId": "597020000541",
+            "buyOrder": "12341",
+            "sessionId": "",
+            "returnURL": "http://127.0.0.1:5000/return",
+            "finalURL": "http://127.0.0.1:5000/final",
+            "transactionDetails": [
+                {
+                    "amount": decimal.Decimal("10000"),
+                    "commerceCode": "597020000541",
+                    "buyOrder": "12341",
+                }
+            ],
+        }
+        expected = zeep_client.create_message(
+            zeep_client.service,
+            "initTransaction",
+            zeep_client.get_type("ns0:wsInitTransactionInput")(**arguments),
+        )
+
+        envelope = self.client.create_envelope(
+            webpay.OPERATIONS["initTransaction"],
+            (self.client.create_object("wsInitTransactionInput", **arguments),),
+            {},
+        )
+
+        self.assertEqual(etree.tostring(expected), etree.tostring(envelope))
+
+    def test_request_wrong_method(self):
+        with self.assertRaises(MethodDoesNotExist):
+            self.client.request(create_soap_request("wrong_method_name", "token"))
+
+    @mock.patch("tbk.soap.zeep_client.verify_envelope", return_value=True)
+    def test_request_like_zeep(self, __):
+        zeep_client = ZeepSoapClient(
+            get_fixture_url("WsWebpayService.wsdl"),
+            get_fixture_data("597020000547.key"),
+            get_fixture_data("597020000547.crt"),
+            get_fixture_data("tbk.pem"),
+        )
+        request = create_soap_request("getTransactionResult", "token")
+
+        with requests_mock.Mocker() as requests:
+            requests.register_uri("POST", ADDRESS, content=TRANSACTION_RESULT_RESPONSE)
+            requests.register_uri(
+                "POST", zeep_client.address, content=TRANSACTION_RESULT_RESPONSE
+            )
+            result, last_sent, last_received = self.client.request(request)
+            sent = requests.last_request.body
+            expected, _, _ = zeep_client.request(request)
+
+        self.assertEqual(expected, result)
+        self.assertEqual(
+            decimal.Decimal("10000.50"), result["detailOutput"][0]["amount"]
+        )
+        self.assertIsInstance(result["transactionDate"], datetime.datetime)
+        self.assertIsNone(result["cardDetail"]["cardExpirationDate"])
+        self.assertEqual(sent, last_sent)
+        self.assertIn(b"<tokenInput>token</tokenInput>", last_sent)
+        self.assertEqual(TRANSACTION_RESULT_RESPONSE, last_received)
+
+    @requests_mock.Mocker()
+    @mock.patch("tbk.soap.zeep_client.verify_envelope", return_value=True)
+    def test_request_empty_response(self, requests, __):
+        requests.register_uri(
+            "POST",
+            ADDRESS,
+            content=get_fixture_data("acknowledgeTransaction.response.xml").encode(
+                "utf-8"
+            ),
+        )
+
+        with mock.patch("tbk.soap.zeep_client.sign_envelope") as signer:
+            result, _, _ = self.client.request(
+                create_soap_request("acknowledgeTransaction", "token")
+            )
+
+        self.assertIsNone(result)
+        self.assertEqual(1, signer.call_count)
+
+    @requests_mock.Mocker()
+    @mock.patch("tbk.soap.zeep_client.verify_envelope", return_value=True)
+    def test_request_server_exception(self, requests, __):
+        requests.register_uri("POST", ADDRESS, content=FAULT_RESPONSE, status_code=500)
+
+        with self.assertRaises(SoapServerException) as context:
+            self.client.request(create_soap_request("getTransactionResult", "token"))
+
+        self.assertEqual("Invalid amount", context.exception.error)
+        self.assertEqual(304, context.exception.code)
+
+    @requests_mock.Mocker()
+    def test_request_not_verified(self, requests):
+        requests.register_uri("POST", ADDRESS, content=TRANSACTION_RESULT_RESPONSE)
+
+        with mock.patch("tbk.soap.zeep_client.verify_envelope", return_value=False):
+            with self.assertRaises(InvalidSignatureResponse):
+                self.client.request(
+                    create_soap_request("getTransactionResult", "token")
+                )
+
+
+class CodegenTest(unittest.TestCase):
+    def test_generated_module_is_up_to_date(self):
+        with open(webpay.__file__.replace(".pyc", ".py")) as module:
+            expected = module.read()
+
+        source = codegen.generate(
+            get_fixture_url("WsWebpayService.wsdl"), source="WSWebpayService.wsdl"
+        )
+
+        self.assertEqual(expected, source)
@@ -0,0 +1,104 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from tbk.soap import SoapRequest, SoapResponse
+from tbk.soap.store import TransactionStore
+
+
+def create_response(method_name, args, result):
+    return SoapResponse(
+        result=result,
+        request=SoapRequest(method_name=method_name, args=args, kwargs={}),
+        envelope_sent="<sent/>",
+        envelope_received="<received/>",
+    )
+
+
+class TransactionStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.store = TransactionStore()
+        self.addCleanup(self.store.close)
+
+    def test_record_and_lookup(self):
+        self.store.record(
+            create_response(
+                "initTransaction",
+                ({"buyOrder": 12345},),
+                {"token": "token-1", "url": "https://webpay"},
+            ),
+            "597020000541",
+        )
+        self.store.record(
+            create_response(
+                "getTransactionResult",
+                ("token-1",),
+                {
+                    "buyOrder": "12345",
+                    "transactionDate": datetime.datetime(2018, 1, 1),
+                    "detailOutput": [{"responseCode": 0}],
+                },
+            ),
+            "597020000541",
+        )
+        self.store.record(
+            create_response("getTransactionResult", ("token-2",), {"buyOrder": "6"}),
+            "597020000541",
+        )
+
+        records = self.store.lookup(buy_order=12345)
+
+        self.assertEqual(3, len(self.store))
+        self.assertEqual(
+            ["initTransaction", "getTransactionResult"],
+            [record["method"] for record in records],
+        )
+        self.assertEqual("token-1", records[0]["token"])
+        self.assertEqual("597020000541", records[0]["commerce_code"])
+        self.assertEqual(
+            {
+                "buyOrder": "12345",
+                "transactionDate": "2018-01-01 00:00:00",
+                "detailOutput": [{"responseCode": 0}],
+            },
+            records[1]["result"],
+        )
+        self.assertEqual(records, self.store.lookup(token="token-1"))
+        self.assertEqual(
+            records[1:],
+            self.store.lookup(buy_order="12345", method="getTransactionResult"),
+        )
+        self.assertEqual(
+            [], self.store.lookup(buy_order="12345", commerce_code="other")
+        )
+        self.assertEqual(records[1], self.store.latest(token="token-1"))
+        self.assertIsNone(self.store.latest(token="missing"))
+
+    def test_record_stored_methods_only(self):
+        stored = self.store.record(
+            create_response("acknowledgeTransaction", ("token-1",), None)
+        )
+
+        self.assertFalse(stored)
+        self.assertEqual(0, len(self.store))
+
+    def test_lookup_requires_identifier(self):
+        with self.assertRaises(ValueError):
+            self.store.lookup(commerce_code="597020000541")
+
+    def test_persistent(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "transactions.db")
+        store = TransactionStore(path)
+        store.record(
+            create_response("nullify", ({"buyOrder": "1"},), {"token": "token-1"})
+        )
+        store.close()
+
+        store = TransactionStore(path)
+        self.addCleanup(store.close)
+
+        self.assertEqual("nullify", store.latest(buy_order="1")["method"])
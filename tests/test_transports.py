@@ -0,0 +1,177 @@
+import threading
+import time
+import unittest
+
+from tbk.soap.transports import (
+    HttpResponse,
+    HttpxTransport,
+    KeepAlive,
+    RequestsTransport,
+    Urllib3Transport,
+    get_transport_class,
+)
+
+from .utils import StubServer, get_xml_envelope, mock
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class TransportTestMixin(object):
+
+    transport_class = None
+
+    def setUp(self):
+        self.transport = self.transport_class(pool_maxsize=2)
+        self.addCleanup(self.transport.close)
+        self.envelope = get_xml_envelope("bare.acknowledgeTransaction.response.xml")
+
+    def test_post_xml(self):
+        with StubServer(b"<received/>") as server:
+            with self.transport.settings(timeout=(5, 10)):
+                response = self.transport.post_xml(
+                    server.url, self.envelope, {"SOAPAction": '""'}
+                )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(b"<received/>", response.content)
+        self.assertEqual("text/xml; charset=utf-8", response.headers["content-type"])
+        self.assertEqual([self.transport.last_sent], server.requests)
+        self.assertIn(b"acknowledgeTransactionResponse", self.transport.last_sent)
+        self.assertEqual(b"<received/>", self.transport.last_received)
+
+    def test_last_envelopes_per_thread(self):
+        with StubServer() as server:
+            self.transport.post_xml(server.url, self.envelope, {})
+
+        last_sent = []
+        thread = threading.Thread(
+            target=lambda: last_sent.append(self.transport.last_sent)
+        )
+        thread.start()
+        thread.join()
+
+        self.assertEqual([None], last_sent)
+        self.assertIsNotNone(self.transport.last_sent)
+
+    def test_timeout_per_thread(self):
+        entered = [threading.Event(), threading.Event()]
+        timeouts = {}
+
+        def post(address, message, headers):
+            for event in entered:
+                event.wait(5)
+            timeouts[threading.current_thread().name] = self.transport.operation_timeout
+            return HttpResponse(200, {}, b"<received/>")
+
+        def send(number):
+            with self.transport.settings(timeout=number + 1):
+                entered[number].set()
+                self.transport.post_xml("https://127.0.0.1", self.envelope, {})
+
+        with mock.patch.object(self.transport, "post", side_effect=post):
+            threads = [
+                threading.Thread(target=send, args=(number,), name=str(number))
+                for number in range(2)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual({"0": 1, "1": 2}, timeouts)
+        self.assertIsNone(self.transport.operation_timeout)
+
+    def test_warmup(self):
+        lock = threading.Lock()
+        ping = self.transport.ping
+
+        def serialized_ping(address, timeout):
+            # even pings which do not overlap get their own connection
+            with lock:
+                return ping(address, timeout)
+
+        with StubServer() as server:
+            with mock.patch.object(self.transport, "ping", side_effect=serialized_ping):
+                self.assertEqual(2, self.transport.warmup(server.url, connections=2))
+            self.assertEqual(2, server.connections)
+            self.transport.post_xml(server.url, self.envelope, {})
+
+            # the request reuses a pooled connection
+            self.assertEqual(2, server.connections)
+        self.assertEqual(1, len(server.requests))
+
+    def test_warmup_error(self):
+        with StubServer() as server:
+            url = server.url
+
+        self.assertEqual(0, self.transport.warmup(url, connections=2, timeout=1))
+
+    def test_connection_error(self):
+        with StubServer() as server:
+            url = server.url
+
+        with self.assertRaises(self.transport.errors):
+            with self.transport.settings(timeout=1):
+                self.transport.post_xml(url, self.envelope, {})
+
+
+class KeepAliveTest(unittest.TestCase):
+    def test_keepalive(self):
+        transport = RequestsTransport()
+        self.addCleanup(transport.close)
+        with StubServer() as server:
+            keepalive = KeepAlive(transport, server.url, connections=1, interval=0.01)
+            with mock.patch.object(
+                transport, "warmup", wraps=transport.warmup
+            ) as warmup:
+                keepalive.start()
+                while warmup.call_count < 2:
+                    time.sleep(0.01)
+                keepalive.stop()
+
+        warmup.assert_called_with(server.url, 1)
+        self.assertEqual(1, server.connections)
+        self.assertFalse(keepalive._thread.is_alive())
+
+
+class RequestsTransportTest(TransportTestMixin, unittest.TestCase):
+    transport_class = RequestsTransport
+
+
+class Urllib3TransportTest(TransportTestMixin, unittest.TestCase):
+    transport_class = Urllib3Transport
+
+    def test_response(self):
+        with StubServer() as server:
+            response = self.transport.post(server.url, b"<sent/>", {})
+
+        self.assertIsInstance(response, HttpResponse)
+
+
+@unittest.skipIf(httpx is None, "httpx is not installed")
+class HttpxTransportTest(TransportTestMixin, unittest.TestCase):
+    transport_class = HttpxTransport
+
+
+class GetTransportClassTest(unittest.TestCase):
+    def test_get_transport_class(self):
+        self.assertIs(RequestsTransport, get_transport_class("requests"))
+        self.assertIs(Urllib3Transport, get_transport_class("urllib3"))
+        self.assertIs(RequestsTransport, get_transport_class(RequestsTransport))
+        factory = mock.Mock()
+        self.assertIs(factory, get_transport_class(factory))
+        self.assertRaises(ValueError, get_transport_class, "invalid")
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_httpx(self):
+        self.assertIs(HttpxTransport, get_transport_class("httpx"))
+
+    @mock.patch("tbk.soap.transports.httpx", None)
+    def test_httpx_missing(self):
+        with self.assertRaises(ImportError) as context:
+            get_transport_class("httpx")
+
+        self.assertIn("python-tbk[httpx]", str(context.exception))
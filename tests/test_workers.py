@@ -0,0 +1,177 @@
+import pickle
+import unittest
+
+try:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+except ImportError:  # pragma: no cover
+    ProcessPoolExecutor = ThreadPoolExecutor = None
+
+from tbk import workers
+from tbk.environments import DEVELOPMENT
+from tbk.services import WebpayService
+from tbk.soap import SoapRequest, SoapResponse
+from tbk.soap.exceptions import SoapServerException
+from tbk.workers import (
+    CommerceSpec,
+    ServicePool,
+    ServiceSpec,
+    WorkerError,
+    get_portable_error,
+)
+
+from .utils import mock, get_fixture_filepath
+
+
+def create_commerce_spec(key_file="597020000547.key"):
+    return CommerceSpec(
+        "597020000547",
+        get_fixture_filepath(key_file),
+        get_fixture_filepath("597020000547.crt"),
+        get_fixture_filepath("tbk.pem"),
+        DEVELOPMENT,
+    )
+
+
+class SpecTest(unittest.TestCase):
+    def test_pickle(self):
+        spec = ServiceSpec(
+            "webpay", create_commerce_spec(), client_kwargs={"http_backend": "urllib3"}
+        )
+
+        unpickled = pickle.loads(pickle.dumps(spec, pickle.HIGHEST_PROTOCOL))
+
+        self.assertEqual(spec, unpickled)
+        self.assertEqual(hash(spec), hash(unpickled))
+        self.assertEqual({"http_backend": "urllib3"}, unpickled.client_kwargs)
+        self.assertNotEqual(spec, ServiceSpec("webpay", create_commerce_spec("other")))
+
+    def test_invalid_service(self):
+        self.assertRaises(ValueError, ServiceSpec, "unknown", create_commerce_spec())
+
+    def test_create_commerce(self):
+        commerce = create_commerce_spec().create()
+
+        self.assertEqual("597020000547", commerce.commerce_code)
+        self.assertEqual(DEVELOPMENT, commerce.environment)
+        self.assertIn(b"PRIVATE KEY", commerce.key_data)
+
+    @mock.patch.dict(workers.SERVICES, {"webpay": mock.Mock(spec=WebpayService)})
+    def test_create_service(self):
+        spec = ServiceSpec(
+            "webpay",
+            create_commerce_spec(),
+            requestor_kwargs={"idempotent_methods": ("getTransactionResult",)},
+            client_kwargs={"transport_timeout": 10},
+        )
+
+        service = spec.create()
+
+        service_class = workers.SERVICES["webpay"]
+        self.assertEqual(service_class.return_value, service)
+        commerce = service_class.call_args[0][0]
+        self.assertEqual("597020000547", commerce.commerce_code)
+        self.assertEqual(
+            {
+                "requestor_kwargs": {"idempotent_methods": ("getTransactionResult",)},
+                "transport_timeout": 10,
+            },
+            service_class.call_args[1],
+        )
+
+
+@unittest.skipIf(ThreadPoolExecutor is None, "requires futures")
+class WorkerTest(unittest.TestCase):
+    def setUp(self):
+        self.service = mock.Mock(spec=WebpayService)
+        self.service.get_transaction_result.side_effect = self.get_transaction_result
+        patcher = mock.patch.dict(
+            workers.SERVICES,
+            {"webpay": mock.Mock(spec=WebpayService, return_value=self.service)},
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(workers._services.clear)
+        self.spec = ServiceSpec("webpay", create_commerce_spec())
+
+    def get_transaction_result(self, token, deadline=None):
+        if token == "error":
+            raise SoapServerException(
+                "Invalid token", 21, SoapRequest("getTransactionResult", (token,), {})
+            )
+        return mock.Mock(spec=SoapResponse, result={"token": token})
+
+    def test_get_service(self):
+        service = workers.get_service(self.spec)
+
+        self.assertIs(service, workers.get_service(self.spec))
+        self.assertEqual(1, workers.SERVICES["webpay"].call_count)
+
+    def test_get_service_forked(self):
+        workers.get_service(self.spec)
+
+        with mock.patch("os.getpid", return_value=-1):
+            workers.get_service(self.spec)
+
+        self.assertEqual(2, workers.SERVICES["webpay"].call_count)
+
+    def test_submit(self):
+        with ServicePool(executor=ThreadPoolExecutor(2)) as pool:
+            future = pool.submit(self.spec, "get_transaction_result", "token")
+            error_future = pool.submit(
+                self.spec, "get_transaction_result", token="error"
+            )
+
+            self.assertEqual({"token": "token"}, future.result())
+            error = error_future.exception()
+        self.assertIsInstance(error, SoapServerException)
+        self.assertEqual(21, error.code)
+        self.assertEqual((), error.request.args)
+
+    def test_batch(self):
+        with ServicePool(executor=ThreadPoolExecutor(2)) as pool:
+            outcomes = list(
+                pool.batch(
+                    self.spec,
+                    "get_transaction_result",
+                    ["first", ("error",), {"token": "third"}, "fourth", "fifth"],
+                    chunksize=2,
+                    window=1,
+                )
+            )
+
+        self.assertEqual([0, 1, 2, 3, 4], [outcome.index for outcome in outcomes])
+        self.assertEqual(
+            ["first", None, "third", "fourth", "fifth"],
+            [outcome.result and outcome.result["token"] for outcome in outcomes],
+        )
+        self.assertIsInstance(outcomes[1].error, SoapServerException)
+
+    def test_portable_error(self):
+        error = SoapServerException(
+            "Invalid amount", 304, SoapRequest("authorize", (lambda: None,), {})
+        )
+
+        portable = pickle.loads(pickle.dumps(get_portable_error(error)))
+
+        self.assertIsInstance(portable, SoapServerException)
+        self.assertEqual(("Invalid amount", 304), (portable.error, portable.code))
+        self.assertEqual("authorize", portable.request.method_name)
+
+    def test_unpicklable_error(self):
+        error = ValueError(lambda: None)
+
+        portable = pickle.loads(pickle.dumps(get_portable_error(error)))
+
+        self.assertIsInstance(portable, WorkerError)
+        self.assertEqual("ValueError", portable.error_class)
+
+
+@unittest.skipIf(ProcessPoolExecutor is None, "requires futures")
+class ProcessPoolTest(unittest.TestCase):
+    def test_error_in_worker(self):
+        spec = ServiceSpec("webpay", create_commerce_spec("missing.key"))
+
+        with ServicePool(executor=ProcessPoolExecutor(1)) as pool:
+            error = pool.submit(spec, "get_transaction_result", "token").exception()
+
+        self.assertIsInstance(error, IOError)
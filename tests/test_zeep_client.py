@@ -5,6 +5,7 @@ import requests_mock
 import zeep.exceptions
 from requests import RequestException
 
+from tbk.cache import TTLCache
 from tbk.soap.requestor import SoapRequest
 from tbk.soap.soap_client import SoapClient
 from tbk.soap.exceptions import (
@@ -14,15 +15,16 @@ from tbk.soap.exceptions import (
     MethodDoesNotExist,
     SoapRequestException,
 )
+from tbk.soap.transports import RequestsTransport, Urllib3Transport
 from tbk.soap.utils import load_key_from_data
 from tbk.soap.wsse import sign_envelope, verify_envelope
-from tbk.soap.zeep_client import ZeepSoapClient, ZeepWsseSignature
+from tbk.soap.zeep_client import ZeepDocumentCache, ZeepSoapClient, ZeepWsseSignature
 
 from .utils import (
+    StubServer,
     mock,
     get_fixture_url,
     get_fixture_data,
-    assert_equal_xml,
     get_xml_envelope,
 )
 
@@ -43,6 +45,14 @@ class ZeepClientTest(unittest.TestCase):
     def test_init(self, __):
         self.assertIsInstance(self.zeep_client, SoapClient)
 
+    def test_update_credentials(self, __):
+        wsse = self.zeep_client.wsse
+        with mock.patch.object(wsse, "update_from_data") as update_from_data:
+            self.zeep_client.update_credentials("key", "cert", "tbk_cert", "password")
+
+        update_from_data.assert_called_once_with("key", "cert", "tbk_cert", "password")
+        self.assertIs(wsse, self.zeep_client.client.wsse)
+
     def test_get_enum_value(self, __):
         for value in ("TR_NORMAL_WS", "TR_NORMAL_WS_WPM", "TR_MALL_WS"):
             enum_value = self.zeep_client.get_enum_value("wsTransactionType", value)
@@ -189,13 +199,105 @@ class ZeepClientTest(unittest.TestCase):
             request = self.create_soap_request("acknowledgeTransaction", "token")
             result, last_sent, last_received = self.zeep_client.request(request)
             method.assert_called_once_with("token")
-        assert_equal_xml(expected_response, last_received)
-        assert_equal_xml(requests.last_request.text.encode("utf-8"), last_sent)
+        self.assertEqual(expected_response, last_received)
+        self.assertEqual(requests.last_request.body, last_sent)
 
     def create_soap_request(self, method_name, *args, **kwargs):
         return SoapRequest(method_name=method_name, args=args, kwargs=kwargs)
 
 
+class ZeepClientBackendTest(unittest.TestCase):
+    def test_http_backend(self):
+        client = ZeepSoapClient(
+            get_fixture_url("WsWebpayService.wsdl"),
+            get_fixture_data("597020000547.key"),
+            get_fixture_data("597020000547.crt"),
+            get_fixture_data("tbk.pem"),
+            http_backend="urllib3",
+        )
+
+        self.assertIsInstance(client.transport, Urllib3Transport)
+        self.assertIs(client.transport, client.client.transport)
+
+    def test_wsdl_cache(self):
+        cache = TTLCache()
+        wsdl_url = get_fixture_url("WsWebpayService.wsdl")
+        arguments = (
+            get_fixture_data("597020000547.key"),
+            get_fixture_data("597020000547.crt"),
+            get_fixture_data("tbk.pem"),
+        )
+
+        ZeepSoapClient(wsdl_url, *arguments, wsdl_cache=cache)
+        with mock.patch.object(
+            RequestsTransport, "_load_remote_data", side_effect=AssertionError
+        ):
+            client = ZeepSoapClient(wsdl_url, *arguments, wsdl_cache=cache)
+
+        self.assertIsInstance(client.transport.cache, ZeepDocumentCache)
+        self.assertIsNotNone(cache.get(("zeep", wsdl_url)))
+        self.assertGreaterEqual(cache.hits, 1)
+
+    def test_warmup(self):
+        client = ZeepSoapClient(
+            get_fixture_url("WsWebpayService.wsdl"),
+            get_fixture_data("597020000547.key"),
+            get_fixture_data("597020000547.crt"),
+            get_fixture_data("tbk.pem"),
+        )
+        self.addCleanup(client.close)
+        self.assertEqual(
+            "https://webpay3g.transbank.cl:443/WSWebpayTransaction/cxf/WSWebpayService",
+            client.address,
+        )
+
+        with StubServer() as server:
+            with mock.patch.object(
+                ZeepSoapClient, "address", mock.PropertyMock(return_value=server.url)
+            ):
+                self.assertEqual(3, client.warmup(connections=3))
+
+        # each ping opened its own pooled connection
+        self.assertEqual(3, server.connections)
+
+    def test_keepalive(self):
+        with mock.patch("tbk.soap.zeep_client.KeepAlive") as keepalive_class:
+            client = ZeepSoapClient(
+                get_fixture_url("WsWebpayService.wsdl"),
+                get_fixture_data("597020000547.key"),
+                get_fixture_data("597020000547.crt"),
+                get_fixture_data("tbk.pem"),
+                keepalive_interval=20,
+                keepalive_connections=4,
+            )
+        keepalive = keepalive_class.return_value
+
+        keepalive_class.assert_called_once_with(client.transport, client.address, 4, 20)
+        keepalive.start.assert_called_once_with()
+
+        client.stop_keepalive()
+
+        keepalive.stop.assert_called_once_with()
+        self.assertIsNone(client.keepalive)
+
+    def test_close(self):
+        with mock.patch("tbk.soap.zeep_client.KeepAlive") as keepalive_class:
+            client = ZeepSoapClient(
+                get_fixture_url("WsWebpayService.wsdl"),
+                get_fixture_data("597020000547.key"),
+                get_fixture_data("597020000547.crt"),
+                get_fixture_data("tbk.pem"),
+                keepalive_interval=20,
+            )
+
+        with mock.patch.object(client.transport, "close") as close:
+            client.close()
+
+        keepalive_class.return_value.stop.assert_called_once_with()
+        close.assert_called_once_with()
+        self.assertIsNone(client.keepalive)
+
+
 class ZeepWssePluginTest(unittest.TestCase):
     def setUp(self):
         signer_key_data = get_fixture_data("597020000547.key")
@@ -227,6 +329,18 @@ class ZeepWssePluginTest(unittest.TestCase):
 
         self.assertRaises(InvalidSignatureResponse, plugin.verify, self.signed_envelope)
 
+    def test_update_from_data(self):
+        plugin = ZeepWsseSignature(None, self.tbk_cert)
+
+        plugin.update_from_data(
+            get_fixture_data("597020000547.key"),
+            get_fixture_data("597020000547.crt"),
+            get_fixture_data("597020000547.crt"),
+        )
+
+        result_envelope, _ = plugin.apply(self.envelope, {})
+        plugin.verify(result_envelope)
+
     def test_do_not_verify_unsigned_response(self):
         plugin = ZeepWsseSignature(None, self.tbk_cert)
 
@@ -1,6 +1,14 @@
 from __future__ import unicode_literals
 
 import os
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # pragma: no cover
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
 
 try:
     from unittest import mock  # noqa
@@ -34,3 +42,99 @@ def assert_equal_xml(first, second):
 
 def get_xml_envelope(filename):
     return etree.fromstring(get_fixture_data(filename).encode("utf-8"))
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """Local HTTP server answering every POST with a fixed body.
+
+    ``connections`` counts the TCP connections accepted and ``requests`` keeps
+    the bodies received.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, response_body=b"<response/>"):
+        HTTPServer.__init__(self, ("127.0.0.1", 0), StubRequestHandler)
+        self.response_body = response_body
+        self.connections = 0
+        self.requests = []
+        self.thread = threading.Thread(target=self.serve_forever, args=(0.01,))
+        self.thread.daemon = True
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/service".format(self.server_address[1])
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+    def get_request(self):
+        self.connections += 1
+        return HTTPServer.get_request(self)
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests.append(body)
+        self.respond()
+
+    def do_HEAD(self):
+        self.respond(include_body=False)
+
+    def respond(self, include_body=True):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.server.response_body)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(self.server.response_body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeRedis(object):
+    """In process stand-in for the subset of ``redis.Redis`` used by the caches.
+
+    Expiration follows the ``now`` attribute, ``commands`` records the
+    commands received.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.commands = []
+        self.now = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            self.commands.append(("GET", name))
+            value, expires_at = self.data.get(name, (None, None))
+            if expires_at is not None and expires_at <= self.now:
+                del self.data[name]
+                return None
+            return value
+
+    def set(self, name, value, px=None):
+        with self._lock:
+            self.commands.append(("SET", name))
+            expires_at = None if px is None else self.now + px / 1000.0
+            self.data[name] = bytes(value), expires_at
+
+    def delete(self, *names):
+        with self._lock:
+            self.commands.append(("DEL",) + names)
+            return sum(1 for name in names if self.data.pop(name, None) is not None)
+
+    def scan_iter(self, match="*"):
+        prefix = match.rstrip("*")
+        return [name for name in list(self.data) if name.startswith(prefix)]